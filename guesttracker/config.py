@@ -29,6 +29,14 @@ else:
 
 
 p_temp = p_applocal / 'temp'
+
+# local sqlite stand-in db for offline profiling, set GT_DB_BACKEND=sqlite (default mssql)
+DB_BACKEND = os.getenv('GT_DB_BACKEND', 'mssql').lower()
+p_localdb = Path(os.getenv('GT_LOCAL_DB', p_applocal / 'localdb/guesttracker.db'))
+
+# manifest of imported plm/fault files, set GT_IMPORT_MANIFEST to share between machines (eg on p drive)
+p_import_manifest = Path(os.getenv('GT_IMPORT_MANIFEST', p_applocal / 'localdb/import_manifest.db'))
+
 p_ext = p_applocal / 'extensions'
 p_topfolder = Path(__file__).parent  # guesttracker
 p_root = p_topfolder.parent  # SMS
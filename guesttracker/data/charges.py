@@ -0,0 +1,195 @@
+from typing import *
+
+from guesttracker import config as cf
+from guesttracker import getlog
+from guesttracker.database import db
+from guesttracker.utils import dbmodel as dbm
+
+log = getlog(__name__)
+
+"""
+Pre-aggregated Charges summary tables, FolioSummary (per reservation/customer) and RevenueDaily
+(per charge day/account/package/kind)
+- kept current incrementally by triggers on Charges: each inserted/deleted row adds/subtracts its amounts from one
+    summary row, updates are a delete + insert, so the summaries never need a full rescan after migrate
+- read through queries.hba.FolioTotals/Revenue with use_summary=True
+- triggers are written for mssql (one set-based MERGE per statement) and the local sqlite stand-in (row triggers)
+
+Examples
+--------
+>>> from guesttracker.data import charges as chg
+>>> chg.migrate()  # create tables + triggers, backfill from all existing charges
+"""
+
+# summary table: (keys {col: expr}, measure cols), exprs use {t} for source table alias, {isnull}, {day}
+SUMMARIES = dict(
+    FolioSummary=(
+        dict(
+            reservation_id="{isnull}({t}.reservation_id, '')",
+            customer_id="{isnull}({t}.customer_id, '')"),
+        ('total_amount', 'total_tax1', 'total_tax2', 'discount')),
+    RevenueDaily=(
+        dict(
+            charge_day='{day}',
+            account_id="{isnull}({t}.account_id, '')",
+            package_id="{isnull}({t}.package_id, '')",
+            kind='{isnull}({t}.kind, -1)'),
+        ('quantity', 'total_amount', 'total_tax1', 'total_tax2', 'discount')))
+
+DIALECT = dict(
+    mssql=dict(isnull='ISNULL', day='CAST({t}.charge_date AS DATE)'),
+    sqlite=dict(isnull='IFNULL', day='date({t}.charge_date)'))
+
+TRIGGER_NAME = 'trg_Charges_Summary'
+
+
+def key_exprs(name: str, t: str, backend: str = None) -> Dict[str, str]:
+    """Summary key cols mapped to sql expressions on Charges table alias t
+
+    Parameters
+    ----------
+    name : str
+        summary table name
+    t : str
+        Charges table/alias in expression, eg 'c', 'inserted', 'NEW'
+    backend : str, optional
+        mssql | sqlite, default cf.DB_BACKEND
+
+    Returns
+    -------
+    Dict[str, str]
+    """
+    m = DIALECT[backend or cf.DB_BACKEND]
+    day = m['day'].format(t=t)
+
+    return {k: expr.format(t=t, isnull=m['isnull'], day=day) for k, expr in SUMMARIES[name][0].items()}
+
+
+def sql_backfill(name: str, backend: str = None) -> str:
+    """Single set-based INSERT ... SELECT GROUP BY to rebuild summary table from Charges"""
+    keys, measures = SUMMARIES[name]
+    isnull = DIALECT[backend or cf.DB_BACKEND]['isnull']
+    exprs = key_exprs(name=name, t='c', backend=backend)
+
+    cols = ', '.join([*keys, 'n_charges', *measures])
+    select = ', '.join([*exprs.values(), 'COUNT(*)', *[f'SUM({isnull}(c.{m}, 0))' for m in measures]])
+
+    return f'INSERT INTO {name} ({cols}) SELECT {select} FROM Charges c GROUP BY {", ".join(exprs.values())}'
+
+
+def _mssql_merge(name: str) -> str:
+    """MERGE net change of all inserted/deleted rows in the statement into summary table"""
+    keys, measures = SUMMARIES[name]
+
+    def _rows(t: str, sign: int) -> str:
+        exprs = [f'{expr} AS {k}' for k, expr in key_exprs(name=name, t=t, backend='mssql').items()]
+        vals = [f'{sign} * ISNULL({t}.{m}, 0) AS {m}' for m in measures]
+        return f'SELECT {", ".join(exprs)}, {sign} AS n_charges, {", ".join(vals)} FROM {t}'
+
+    sums = ', '.join(f'SUM(u.{c}) AS {c}' for c in ('n_charges', *measures))
+    cols = [*keys, 'n_charges', *measures]
+
+    return f"""
+    MERGE {name} WITH (HOLDLOCK) AS s
+    USING (
+        SELECT {', '.join(f'u.{k}' for k in keys)}, {sums}
+        FROM ({_rows('inserted', 1)} UNION ALL {_rows('deleted', -1)}) AS u
+        GROUP BY {', '.join(f'u.{k}' for k in keys)}) AS d
+    ON {' AND '.join(f's.{k} = d.{k}' for k in keys)}
+    WHEN MATCHED AND s.n_charges + d.n_charges = 0 THEN DELETE
+    WHEN MATCHED THEN UPDATE SET {', '.join(f's.{c} = s.{c} + d.{c}' for c in ('n_charges', *measures))}
+    WHEN NOT MATCHED BY TARGET THEN INSERT ({', '.join(cols)}) VALUES ({', '.join(f'd.{c}' for c in cols)});"""
+
+
+def _sqlite_upsert(name: str, t: str, sign: int) -> str:
+    """Add/subtract one NEW/OLD row to summary table, drop summary row when its last charge is removed"""
+    keys, measures = SUMMARIES[name]
+    exprs = key_exprs(name=name, t=t, backend='sqlite')
+
+    cols = [*keys, 'n_charges', *measures]
+    vals = [*exprs.values(), str(sign), *[f'{sign} * IFNULL({t}.{m}, 0)' for m in measures]]
+
+    sql = f"""
+    INSERT INTO {name} ({', '.join(cols)}) VALUES ({', '.join(vals)})
+    ON CONFLICT ({', '.join(keys)}) DO UPDATE SET
+        {', '.join(f'{c} = {c} + excluded.{c}' for c in ('n_charges', *measures))};"""
+
+    if sign < 0:
+        match = ' AND '.join(f'{k} = {expr}' for k, expr in exprs.items())
+        sql += f'\n    DELETE FROM {name} WHERE {match} AND n_charges = 0;'
+
+    return sql
+
+
+def sql_triggers(backend: str = None) -> List[str]:
+    """Statements to (re)create summary triggers on Charges for db backend"""
+    backend = backend or cf.DB_BACKEND
+    names = list(SUMMARIES)
+
+    if backend == 'mssql':
+        body = ''.join(_mssql_merge(name) for name in names)
+        return [f"""
+            CREATE OR ALTER TRIGGER {TRIGGER_NAME} ON Charges AFTER INSERT, UPDATE, DELETE AS
+            BEGIN
+                SET NOCOUNT ON;
+                IF NOT EXISTS (SELECT 1 FROM inserted) AND NOT EXISTS (SELECT 1 FROM deleted) RETURN;
+                {body}
+            END"""]
+
+    # sqlite, one row trigger per event
+    events = dict(
+        insert=[('NEW', 1)],
+        delete=[('OLD', -1)],
+        update=[('OLD', -1), ('NEW', 1)])
+
+    sqls = []
+    for event, rows in events.items():
+        trigger = f'{TRIGGER_NAME}_{event}'
+        body = ''.join(_sqlite_upsert(name=name, t=t, sign=sign) for t, sign in rows for name in names)
+
+        sqls.extend([
+            f'DROP TRIGGER IF EXISTS {trigger}',
+            f'CREATE TRIGGER {trigger} AFTER {event.upper()} ON Charges BEGIN {body}\nEND'])
+
+    return sqls
+
+
+def create_tables() -> None:
+    """Create summary tables if not exists"""
+    for name in SUMMARIES:
+        getattr(dbm, name).__table__.create(bind=db.engine, checkfirst=True)
+
+
+def create_triggers() -> bool:
+    """Create or replace summary triggers on Charges"""
+    for sql in sql_triggers():
+        db.safe_execute(sql)
+
+    return db.safe_commit()
+
+
+def backfill() -> bool:
+    """Rebuild summary tables from all Charges on the server, in one transaction
+
+    Returns
+    -------
+    bool
+        if transaction succeeded
+    """
+    for name in SUMMARIES:
+        db.safe_execute(f'DELETE FROM {name}')
+        db.safe_execute(sql_backfill(name=name))
+
+    result = db.safe_commit()
+    for name in SUMMARIES:
+        db.result_cache.invalidate(table=name)
+
+    log.info(f'Backfilled Charges summary tables: {list(SUMMARIES)}, success={result}')
+    return result
+
+
+def migrate() -> bool:
+    """Create summary tables + triggers and backfill from existing charges
+    - triggers are created first, so charges added during the backfill are counted by the rebuild"""
+    create_tables()
+    return create_triggers() and backfill()
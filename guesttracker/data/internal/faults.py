@@ -1,3 +1,4 @@
+import itertools
 from pathlib import Path
 from typing import *
 
@@ -7,43 +8,55 @@ from guesttracker import delta, dt
 from guesttracker import functions as f
 from guesttracker import getlog
 from guesttracker.data.internal import utils as utl
+from guesttracker.data.internal.parsers import parse_fault_header, parse_fault_times
 from guesttracker.database import db
 
 log = getlog(__name__)
 
 
+# rows before fault data, header has machine model/serial in rows 2-5
+n_header = 28
+cols = ['unit', 'code', 'time_from', 'time_to', 'faultcount', 'message']
+
+
+class FaultReadError(Exception):
+    """Fault file couldn't be read, stage is where it failed: header | unit | body | times"""
+
+    def __init__(self, p: Path, stage: str, msg: str):
+        super().__init__(f'{stage}: {msg}')
+        self.p, self.stage, self.msg = p, stage, msg
+
+    def to_dict(self) -> dict:
+        return dict(path=str(self.p), stage=self.stage, error=self.msg)
+
+
 def parse_fault_time(tstr):
     arr = tstr.split('|')
     t, tz = int(arr[0]), int(arr[1])
     return dt.fromtimestamp(t) + delta(seconds=tz)
 
 
-def unit_from_fault(p: Path, raise_errors: bool = True) -> Union[str, None]:
+def unit_from_fault(p: Path, raise_errors: bool = True, header: Dict[str, str] = None) -> Union[str, None]:
     """Get unit from faults.csv
 
     Parameters
     ----------
     p : Path
+    header : Dict[str, str], optional
+        already parsed header, default None (read from p)
 
     Returns
     -------
     Union[str, None]
         unit if fault file has serial
     """
-
-    s_head = pd \
-        .read_csv(p, usecols=(0, 1), skiprows=1, nrows=4, header=None) \
-        .set_index(0) \
-        .rename_axis('index').T \
-        .pipe(f.lower_cols) \
-        .apply(lambda x: x.str.strip()) \
-        .assign(model=lambda x: x.machine_model + x.machine_type_minor_variation_code) \
-        .rename(columns=dict(machine_serial_no='serial')) \
-        .T[1]
+    if header is None:
+        with open(p, 'r', encoding='utf-8') as file:
+            header = parse_fault_header(list(itertools.islice(file, 5)))
 
     unit = db.unit_from_serial(
-        serial=s_head['serial'],
-        model=s_head['model'])
+        serial=header['serial'],
+        model=header['model'])
 
     if unit is None and raise_errors:
         raise Exception('Couldn\'t get unit from fault header.')
@@ -51,33 +64,75 @@ def unit_from_fault(p: Path, raise_errors: bool = True) -> Union[str, None]:
     return unit
 
 
-def read_fault(p: Path, **kw) -> Union[pd.DataFrame, None]:
+def _read_fault(p: Path) -> pd.DataFrame:
+    """Read header + body from one file handle, raise FaultReadError with stage of failure"""
+    stage = 'header'
+
+    try:
+        with open(p, 'r', encoding='utf-8') as file:
+            header = parse_fault_header(list(itertools.islice(file, n_header)))
+
+            stage = 'unit'
+            unit = unit_from_fault(p=p, header=header)
+
+            # handle is at first fault row
+            stage = 'body'
+            df = pd.read_csv(file, header=None, usecols=(0, 1, 3, 5, 7, 8))
+
+        df.columns = cols
+
+        stage = 'times'
+        return df \
+            .assign(
+                unit=unit,
+                code=lambda x: x.code.str.replace('#', '', regex=False),
+                time_from=lambda x: parse_fault_times(x.time_from),
+                time_to=lambda x: parse_fault_times(x.time_to))
+
+    except Exception as e:
+        raise FaultReadError(p=p, stage=stage, msg=f'{type(e).__name__}: {e}') from e
+
+
+def read_fault(p: Path, raise_errors: bool = False, **kw) -> Union[pd.DataFrame, None]:
     """Return dataframe from fault.csv path
     - NOTE need to handle minesites other than forthills
 
     Parameters
     ----------
     p : Path
+    raise_errors : bool, optional
+        raise FaultReadError, or log + return None, default False
     """
-    newcols = ['unit', 'code', 'time_from', 'time_to', 'faultcount', 'message']
-
     try:
-        unit = unit_from_fault(p=p)
+        return _read_fault(p=p)
+    except FaultReadError as e:
+        if raise_errors:
+            raise
+
+        msg = f'Failed faults import, {e}: {p}'
+        log.warning(msg)
+        utl.write_import_fail(msg)
+        return None
 
-        df = pd \
-            .read_csv(p, header=None, skiprows=28, usecols=(0, 1, 3, 5, 7, 8))
 
-        df.columns = newcols
-        return df \
-            .assign(
-                unit=unit,
-                code=lambda x: x.code.str.replace('#', ''),
-                time_from=lambda x: x.time_from.apply(parse_fault_time),
-                time_to=lambda x: x.time_to.apply(parse_fault_time))
+def check_fault_files(lst: List[Path]) -> pd.DataFrame:
+    """Read fault files and return result per file, eg to find why files in import manifest failed
 
-    except:
-        log.warning(f'Failed faults import: {p}')
-        return None
+    Returns
+    -------
+    pd.DataFrame
+        path, unit, rows, stage, error (stage/error null if read ok)
+    """
+    data = []
+    for p in lst:
+        try:
+            df = _read_fault(p=p)
+            unit = df.unit.iloc[0] if len(df) > 0 else None
+            data.append(dict(path=str(p), unit=unit, rows=len(df), stage=None, error=None))
+        except FaultReadError as e:
+            data.append(dict(**e.to_dict(), unit=None, rows=0))
+
+    return pd.DataFrame(data, columns=['path', 'unit', 'rows', 'stage', 'error'])
 
 
 def combine_fault_header(m_list: dict) -> pd.DataFrame:
@@ -0,0 +1,317 @@
+import os
+import pickle
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import *
+
+from guesttracker import config as cf
+from guesttracker import delta, dt
+from guesttracker import functions as f
+from guesttracker import getlog
+
+log = getlog(__name__)
+
+"""Recursive search of unit download folders for plm/fault/dsc/tr3 files, used by data.internal.utils"""
+
+
+class DirCache():
+    """Persistent cache of single directory listings for FolderSearch, keyed by directory path + mtime
+    - a directory's mtime only changes when its direct children are added/removed/renamed, so its cached listing
+        (matched entries + subdirs) is reused while its own mtime is unchanged
+    - subdirs of a cached listing are still stat'd and searched, so files added deeper in an existing folder are found
+    - listings are stored before date filtering, the same cache serves any d_lower/max_depth
+    """
+
+    def __init__(self, name: str, p: Path = None):
+        self.p = p or cf.p_applocal / f'cache/foldersearch_{name}.pkl'
+        self.lock = threading.Lock()
+        self.entries = {}  # type: Dict[str, tuple]
+        self.n_hits = 0
+        self.changed = False
+
+        if self.p.exists():
+            try:
+                self.entries = pickle.loads(self.p.read_bytes())
+            except Exception as e:
+                log.warning(f'Failed to read folder search cache, starting empty: {self.p}, {e}')
+
+    def __getstate__(self) -> dict:
+        # sent to joblib worker processes with FolderSearch, lock can't be pickled
+        return {k: v for k, v in self.__dict__.items() if not k == 'lock'}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def get(self, p: str, mtime: float) -> Union[Tuple[List[Tuple[str, float]], List[str]], None]:
+        """Cached (found, subdirs) listing for directory, None if not cached or directory changed"""
+        entry = self.entries.get(p, None)
+        if entry is None or not entry[0] == mtime:
+            return None
+
+        with self.lock:
+            self.n_hits += 1
+
+        return entry[1:]
+
+    def put(self, p: str, mtime: float, found: List[Tuple[str, float]], subdirs: List[str]) -> None:
+        with self.lock:
+            self.entries[p] = (mtime, found, subdirs)
+            self.changed = True
+
+    def save(self) -> None:
+        """Merge with entries saved by other processes (eg other units) and replace file atomically"""
+        if not self.changed:
+            return
+
+        with self.lock:
+            try:
+                entries = pickle.loads(self.p.read_bytes()) if self.p.exists() else {}
+            except Exception:
+                entries = {}
+
+            entries |= self.entries
+            self.p.parent.mkdir(parents=True, exist_ok=True)
+
+            p_tmp = self.p.with_suffix(f'.{os.getpid()}.tmp')
+            p_tmp.write_bytes(pickle.dumps(entries, protocol=pickle.HIGHEST_PROTOCOL))
+            os.replace(p_tmp, self.p)
+            self.changed = False
+
+
+class FolderSearch():
+    """Class to recursively search folder paths for specific file types
+    - walks with os.scandir, reusing each DirEntry's stat for the date filter
+    - subtrees below fanout_depth are walked in parallel on a bounded thread pool (mostly waiting on network io)
+    """
+
+    # set up filepaths to exclude
+    fr = ['frdls', 'event', 'data']
+    base = ['stats', 'system', 'pic'] + fr
+    vhms = ['vhms', 'chk']
+    plm = ['plm']
+    ge = ['ge', 'dsc']
+    non_ge = base + ge
+
+    cfg = dict(
+        fault=dict(
+            find=r'fault0.*csv$',
+            exclude=non_ge + plm),
+        plm=dict(
+            find=r'haul.*csv$',
+            exclude=[r'\d{8}'] + non_ge + vhms),
+        dsc=dict(
+            find=r'dsc|\d{5}_\d{6}_\d{4}',
+            exclude=[r'^a\d{5}$'] + base + plm + vhms),
+        tr3=dict(
+            find=r'.*tr3$',
+            exclude=non_ge + plm + vhms),
+        ahs=dict(
+            find=r'^data\d*$|^dnevent|^sfevent',
+        ))
+
+    keys = list(cfg.keys())
+
+    def __init__(
+            self,
+            ftype: str,
+            max_depth: int = 6,
+            d_lower: dt = None,
+            n_workers: int = 8,
+            fanout_depth: int = 2,
+            use_cache: bool = False):
+        """
+        Parameters
+        ----------
+        ftype : str
+            file type to collect (dsc, fault | plm | tr3)
+        max_depth : int, optional
+            max depth to recurse, default 5
+        d_lower : dt, optional
+            date to filter file date created, default 2016-01-01
+        n_workers : int, optional
+            max threads walking subtrees, default 8
+        fanout_depth : int, optional
+            levels always scanned fresh, subtrees below are walked in parallel (and cached), default 2
+            eg downloads/2021/F301 - 2021-01-01 - DLS
+        use_cache : bool, optional
+            reuse listings of directories with unchanged mtime using DirCache, default False
+        """
+        if not ftype in self.keys:
+            raise ValueError(f'Incorrect ftype "{ftype}", must be in {self.keys}')
+
+        if d_lower is None:
+            d_lower = dt.now() + delta(days=-180)
+
+        cfg = self.cfg.get(ftype)
+        expr_exclude = self.make_re_exclude(lst=cfg.get('exclude'))
+        expr_find = cfg.get('find')
+        matcher = self.make_matcher(expr_find=expr_find, expr_exclude=expr_exclude)
+        ts_lower = d_lower.timestamp()
+        cache = DirCache(name=ftype) if use_cache else None
+
+        f.set_self(vars())
+
+    @staticmethod
+    def make_matcher(expr_find: str, expr_exclude: str = None) -> Pattern:
+        """Single compiled regex classifying a name, match.lastgroup is 'exclude' | 'find' (exclude checked first)
+        - each pattern is wrapped in a lookahead, so it behaves the same as re.search on the name
+        """
+        groups = [f'(?P<find>(?=.*?(?:{expr_find})))']
+        if not expr_exclude is None:
+            groups.insert(0, f'(?P<exclude>(?=.*?(?:{expr_exclude})))')
+
+        return re.compile('|'.join(groups), re.DOTALL)
+
+    def classify(self, name: str) -> Union[str, None]:
+        """Return 'exclude' | 'find' | None for lowercase file/folder name"""
+        m = self.matcher.match(name)
+        return m.lastgroup if not m is None else None
+
+    def should_exclude(self, name: str) -> bool:
+        """Check if folder name matches exclude pattern
+
+        Parameters
+        ----------
+        name : str
+            folder name to check
+
+        Returns
+        -------
+        bool
+            if folder matches exclude pattern
+        """
+        return self.classify(name) == 'exclude'
+
+    def scan(self, p: str) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+        """List single directory, return matched entries and subdirs to search deeper (not date filtered)
+
+        Returns
+        -------
+        Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]
+            found (path, mtime), subdirs (path, mtime)
+        """
+        found, subdirs = [], []
+
+        try:
+            with os.scandir(p) as it:
+                for entry in it:
+                    kind = self.classify(entry.name.lower())
+                    if kind == 'find':
+                        found.append((entry.path, entry.stat().st_mtime))
+                    elif kind is None and entry.is_dir():
+                        subdirs.append((entry.path, entry.stat().st_mtime))
+
+        except OSError as e:
+            log.warning(f'Failed to scan folder: {p}, {e}')
+
+        return found, subdirs
+
+    def list_dir(self, p: str, mtime: float) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+        """Scan directory, or reuse cached listing if its own mtime is unchanged
+        - subdirs of a cached listing are stat'd again, their contents may have changed
+        """
+        cache = self.cache
+        listing = cache.get(p=p, mtime=mtime) if not cache is None else None
+
+        if listing is None:
+            found, subdirs = self.scan(p=p)
+
+            if not cache is None:
+                cache.put(p=p, mtime=mtime, found=found, subdirs=[p_sub for p_sub, _ in subdirs])
+
+            return found, subdirs
+
+        found, lst_sub = listing
+        subdirs = []
+        for p_sub in lst_sub:
+            try:
+                subdirs.append((p_sub, os.stat(p_sub).st_mtime))
+            except OSError:
+                pass  # removed/moved, eg dsc folders moved by fix_dsc
+
+        return found, subdirs
+
+    def filter_date(self, lst: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """Enforce date greater than d_lower for files and folders"""
+        return [(p, mtime) for p, mtime in lst if mtime > self.ts_lower]
+
+    def walk(self, p: str, depth: int, mtime: float) -> List[Tuple[str, float]]:
+        """Search subtree serially, each directory validated against cache by its own mtime"""
+        found, subdirs = self.list_dir(p=p, mtime=mtime)
+        found = self.filter_date(found)
+
+        if depth < self.max_depth:
+            for p_sub, mtime_sub in self.filter_date(subdirs):
+                found.extend(self.walk(p=p_sub, depth=depth + 1, mtime=mtime_sub))
+
+        return found
+
+    def search(self, p: Path, depth: int = 0) -> list:
+        """Recurse folder and find matching files/folders
+
+        Parameters
+        ----------
+        p : Path
+            start path
+        depth : int, optional
+            current search depth, default 0
+
+        Returns
+        -------
+        list
+            list of all collected files, sorted so files in the same folder are adjacent
+        """
+        found = []
+        n_hits = self.cache.n_hits if not self.cache is None else 0
+
+        # levels above fanout_depth are scanned fresh, new folders (eg new year/download) are added here
+        level = [(str(p), depth)]
+        subtrees = []
+        while level:
+            next_level = []
+            for p_dir, d in level:
+                _found, subdirs = self.scan(p=p_dir)
+                found.extend(self.filter_date(_found))
+
+                if d >= self.max_depth:
+                    continue
+
+                for p_sub, mtime in self.filter_date(subdirs):
+                    if d + 1 < self.fanout_depth:
+                        next_level.append((p_sub, d + 1))
+                    else:
+                        subtrees.append((p_sub, d + 1, mtime))
+
+            level = next_level
+
+        if subtrees:
+            n_workers = max(min(self.n_workers, len(subtrees)), 1)
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                futures = [pool.submit(self.walk, p=p_sub, depth=d, mtime=mtime) for p_sub, d, mtime in subtrees]
+                for fut in futures:
+                    found.extend(fut.result())
+
+        if not self.cache is None:
+            n_hits = self.cache.n_hits - n_hits
+            log.info(f'FolderSearch {self.ftype}: {len(subtrees)} subtrees, {n_hits} folders unchanged (cached)')
+            self.cache.save()
+
+        return sorted(Path(p_found) for p_found, _ in found)
+
+    def make_re_exclude(self, lst: list) -> str:
+        """Make exclude regex expr for ftype
+
+        Parameters
+        ----------
+        lst : list
+            list to join
+
+        Returns
+        -------
+        str
+            exclude string item1|item2|...
+        """
+        return '|'.join(lst) if not lst is None else None
@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import *
+
+import pandas as pd
+
+from guesttracker import config as cf
+from guesttracker import dt
+from guesttracker import getlog
+
+log = getlog(__name__)
+
+"""
+Persistent manifest of imported plm/fault files, so nightly imports only open new or changed files
+- one row per file path: size, mtime, content hash, rows read, unit, status
+- files are skipped when size + mtime match the manifest, if only mtime changed (eg file copied/touched) the
+    content hash is compared before deciding to re-parse (hash is only computed on this path, not for every new file)
+- d_lower used when the file was read is stored, rows older than it were dropped, so a later run with an earlier
+    d_lower (eg backfill) reads the file again
+- stored in a small local sqlite db (cf.p_import_manifest), not the main db, so it works offline and doesn't
+    need a schema change on the server
+
+Examples
+--------
+>>> from guesttracker.data.internal.manifest import ImportManifest
+>>> manifest = ImportManifest()
+>>> lst = manifest.filter_new(lst=lst, ftype='plm')  # only new/changed files
+>>> manifest.forget(ftype='plm', unit='F301')  # force reprocessing unit's files next run
+"""
+
+# file was read (and imported if rows > 0), failed files are only retried when they change
+STATUS_IMPORTED = 'imported'
+STATUS_EMPTY = 'empty'
+STATUS_FAILED = 'failed'
+
+cols = ['path', 'ftype', 'size', 'mtime', 'hash', 'rows', 'unit', 'status', 'message', 'date_added', 'd_lower']
+
+
+def file_hash(p: Path, chunksize: int = 1 << 20) -> str:
+    """Blake2b hash of file contents, read in chunks"""
+    h = hashlib.blake2b(digest_size=16)
+
+    with open(p, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunksize), b''):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+class ImportManifest():
+    def __init__(self, p: Path = None):
+        """
+        Parameters
+        ----------
+        p : Path, optional
+            sqlite db file, default cf.p_import_manifest
+        """
+        p = Path(p or cf.p_import_manifest)
+        p.parent.mkdir(parents=True, exist_ok=True)
+
+        # file stats (+ hash if computed) captured when filtering, recorded after import so a file changed mid-run
+        # is read again
+        stats = {}  # type: Dict[str, Tuple[int, float, Union[str, None]]]
+        lock = threading.Lock()
+
+        self.p, self.stats, self.lock = p, stats, lock
+        self.create_table()
+
+    def __getstate__(self) -> dict:
+        # sent to joblib worker processes with FileProcessor, lock can't be pickled
+        return {k: v for k, v in self.__dict__.items() if not k == 'lock'}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """Short lived connection, committed on success and always closed"""
+        conn = sqlite3.connect(self.p, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create_table(self) -> None:
+        with self.connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ImportManifest (
+                    path TEXT PRIMARY KEY,
+                    ftype TEXT NOT NULL,
+                    size INTEGER,
+                    mtime REAL,
+                    hash TEXT,
+                    rows INTEGER,
+                    unit TEXT,
+                    status TEXT,
+                    message TEXT,
+                    date_added TEXT,
+                    d_lower TEXT)""")
+
+            # manifests created before d_lower was recorded
+            existing = [r[1] for r in conn.execute('PRAGMA table_info(ImportManifest)').fetchall()]
+            if not 'd_lower' in existing:
+                conn.execute('ALTER TABLE ImportManifest ADD COLUMN d_lower TEXT')
+
+            conn.execute('CREATE INDEX IF NOT EXISTS IX_ImportManifest_ftype_unit ON ImportManifest (ftype, unit)')
+
+    def get_records(self, ftype: str) -> Dict[str, tuple]:
+        """Manifest rows for ftype as {path: (size, mtime, hash, status, d_lower)}"""
+        with self.connect() as conn:
+            rows = conn.execute(
+                'SELECT path, size, mtime, hash, status, d_lower FROM ImportManifest WHERE ftype = ?',
+                (ftype, )).fetchall()
+
+        return {r[0]: r[1:] for r in rows}
+
+    def filter_new(self, lst: List[Path], ftype: str, force: bool = False, d_lower: dt = None) -> List[Path]:
+        """Filter files to only those not in manifest, changed since they were recorded, or recorded with a later
+        d_lower than this run's
+        - only stats files (and hashes if mtime changed), files are not parsed
+
+        Parameters
+        ----------
+        lst : List[Path]
+            collected files
+        ftype : str
+            plm | fault
+        force : bool, optional
+            return all files (recorded again after import), default False
+        d_lower : dt, optional
+            earliest row date this run imports, default None (all rows)
+
+        Returns
+        -------
+        List[Path]
+            new/changed files
+        """
+        m = {} if force else self.get_records(ftype=ftype)
+        s_lower = str(pd.Timestamp(d_lower)) if not d_lower is None else None
+        lst_new, touched = [], []
+        n_earlier = 0
+
+        for p in lst:
+            key = str(p)
+            try:
+                st = p.stat()
+            except OSError as e:
+                log.warning(f'Failed to stat file, skipping: {p}, {e}')
+                continue
+
+            rec = m.get(key, None)
+            hash_new = None
+
+            if rec is None:
+                lst_new.append(p)
+            else:
+                size, mtime, hash_, status, rec_lower = rec
+
+                if size == st.st_size and not mtime == st.st_mtime:
+                    # same size but touched, compare contents
+                    hash_new = file_hash(p)
+
+                if not size == st.st_size or not (mtime == st.st_mtime or hash_new == hash_):
+                    lst_new.append(p)
+                elif not status == STATUS_FAILED and not rec_lower is None \
+                        and (s_lower is None or s_lower < rec_lower):
+                    lst_new.append(p)  # rows before recorded d_lower were dropped
+                    n_earlier += 1
+                elif not mtime == st.st_mtime:
+                    touched.append((st.st_mtime, key))  # same contents, only update mtime
+
+            with self.lock:
+                self.stats[key] = (st.st_size, st.st_mtime, hash_new)
+
+        if touched:
+            with self.connect() as conn:
+                conn.executemany('UPDATE ImportManifest SET mtime = ? WHERE path = ?', touched)
+
+        n_skip = len(lst) - len(lst_new)
+        log.info(
+            f'Import manifest, ftype={ftype}: {len(lst_new)} new/changed files '
+            + f'({n_earlier} read again for earlier d_lower), {n_skip} skipped')
+        return lst_new
+
+    def make_record(
+            self,
+            p: Path,
+            ftype: str,
+            df: Union[pd.DataFrame, None],
+            message: str = None,
+            d_lower: dt = None) -> dict:
+        """Create manifest record for file from its parse result
+        - hash only stored if computed by filter_new, file isn't read again here
+
+        Parameters
+        ----------
+        p : Path
+        ftype : str
+        df : Union[pd.DataFrame, None]
+            parsed file, None if read failed
+        message : str, optional
+            error message for failed files, default None
+        d_lower : dt, optional
+            rows before d_lower were dropped from df before import, default None
+
+        Returns
+        -------
+        dict
+        """
+        key = str(p)
+        with self.lock:
+            size, mtime, hash_ = self.stats.get(key, (None, None, None))
+
+        if size is None:
+            st = p.stat()
+            size, mtime = st.st_size, st.st_mtime
+
+        if df is None:
+            status, rows, unit = STATUS_FAILED, 0, None
+        else:
+            rows = len(df)
+            status = STATUS_IMPORTED if rows > 0 else STATUS_EMPTY
+            unit = df['unit'].iloc[0] if rows > 0 and 'unit' in df.columns else None
+
+        return dict(
+            path=key,
+            ftype=ftype,
+            size=size,
+            mtime=mtime,
+            hash=hash_,
+            rows=rows,
+            unit=unit,
+            status=status,
+            message=message,
+            date_added=dt.now().isoformat(' ', timespec='seconds'),
+            d_lower=str(pd.Timestamp(d_lower)) if not d_lower is None else None)
+
+    def record_many(self, records: List[dict]) -> int:
+        """Insert or replace manifest records, call only after rows are committed to db
+
+        Returns
+        -------
+        int
+            records written
+        """
+        if not records:
+            return 0
+
+        vals = [tuple(m.get(c, None) for c in cols) for m in records]
+        sql = f'INSERT OR REPLACE INTO ImportManifest ({", ".join(cols)}) VALUES ({", ".join("?" * len(cols))})'
+
+        with self.connect() as conn:
+            conn.executemany(sql, vals)
+
+        return len(vals)
+
+    def record(self, p: Path, ftype: str, df: Union[pd.DataFrame, None], **kw) -> None:
+        self.record_many([self.make_record(p=p, ftype=ftype, df=df, **kw)])
+
+    def forget(self, paths: List[Path] = None, ftype: str = None, unit: str = None) -> int:
+        """Remove records so files are reprocessed next run
+
+        Parameters
+        ----------
+        paths : List[Path], optional
+            specific files, default None
+        ftype : str, optional
+            all files of ftype, default None
+        unit : str, optional
+            all files for unit, default None
+
+        Returns
+        -------
+        int
+            records removed
+        """
+        where, params = [], []
+
+        if not paths is None:
+            paths = [str(p) for p in paths]
+            where.append(f'path IN ({", ".join("?" * len(paths))})')
+            params.extend(paths)
+
+        for col, val in dict(ftype=ftype, unit=unit).items():
+            if not val is None:
+                where.append(f'{col} = ?')
+                params.append(val)
+
+        if not where:
+            raise ValueError('Pass at least one of paths, ftype, unit to forget')
+
+        with self.connect() as conn:
+            n = conn.execute(f'DELETE FROM ImportManifest WHERE {" AND ".join(where)}', params).rowcount
+
+        log.info(f'Removed {n} import manifest records')
+        return n
+
+    def to_df(self, ftype: str = None) -> pd.DataFrame:
+        """Manifest as df, eg to check failed files"""
+        sql = 'SELECT * FROM ImportManifest'
+        params = []
+
+        if not ftype is None:
+            sql += ' WHERE ftype = ?'
+            params.append(ftype)
+
+        with self.connect() as conn:
+            return pd.read_sql(sql, conn, params=params)
+
+
+class UnitCheckpoint():
+    """Json checkpoint of one unit's progress through FileProcessor import pipeline
+    - written after each chunk of files is committed to db, so a crashed/killed run resumes from the last chunk
+    - removed once unit finishes, a leftover checkpoint means the unit's last run didn't complete
+    """
+
+    def __init__(self, unit: str, ftype: str, p: Path = None):
+        self.p = p or cf.p_applocal / f'checkpoints/{ftype}/{unit}.json'
+        self.unit, self.ftype = unit, ftype
+        self.files_done = []  # type: List[str]
+        self.rowsadded = 0
+
+        if self.p.exists():
+            try:
+                m = json.loads(self.p.read_text())
+                self.files_done, self.rowsadded = m['files_done'], m['rowsadded']
+                log.info(f'Resuming {ftype} import from checkpoint, unit: {unit}, files done: {len(self.files_done)}')
+            except Exception as e:
+                log.warning(f'Failed to read checkpoint, starting unit from beginning: {self.p}, {e}')
+
+    def remaining(self, lst: List[Path]) -> List[Path]:
+        """Files not yet committed in previous run"""
+        s_done = set(self.files_done)
+        return [p for p in lst if not str(p) in s_done]
+
+    def update(self, lst: List[Path], rowsadded: int) -> None:
+        """Mark chunk of files as committed and replace checkpoint file atomically"""
+        self.files_done.extend(str(p) for p in lst)
+        self.rowsadded += rowsadded
+
+        m = dict(
+            unit=self.unit,
+            ftype=self.ftype,
+            files_done=self.files_done,
+            rowsadded=self.rowsadded,
+            date_modified=dt.now().isoformat(' ', timespec='seconds'))
+
+        self.p.parent.mkdir(parents=True, exist_ok=True)
+        p_tmp = self.p.with_suffix(f'.{os.getpid()}.tmp')
+        p_tmp.write_text(json.dumps(m))
+        os.replace(p_tmp, self.p)
+
+    def clear(self) -> None:
+        self.p.unlink(missing_ok=True)
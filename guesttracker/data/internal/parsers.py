@@ -0,0 +1,131 @@
+import csv
+import io
+import time
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+from guesttracker import functions as f
+
+"""
+Vectorised column parsers for plm haulcycle and fault csvs
+- no db/eventfolders imports, used by data.internal.plm/faults readers
+"""
+
+
+def hms_to_seconds(s: pd.Series) -> pd.Series:
+    """Vectorised data.internal.utils.to_seconds, 'H:M:S' strings to int seconds
+    - raises ValueError for missing/malformed values or out of range fields, same as time.strptime per row
+    """
+    if len(s) == 0:
+        return pd.Series(dtype='int64', index=s.index)
+
+    parts = s.astype(str).str.split(':', expand=True)
+    if not parts.shape[1] == 3:
+        raise ValueError(f'Time not in H:M:S format: {s.iloc[0]}')
+
+    # raises on non numeric eg 'nan', rows with < 3 parts become float
+    hms = parts.apply(pd.to_numeric).to_numpy()
+    if not hms.dtype.kind in 'iu' or (hms < 0).any() or (hms.max(axis=0) > (23, 59, 61)).any():
+        raise ValueError('Time not in H:M:S format or out of range')
+
+    return pd.Series(hms @ [3600, 60, 1], index=s.index, dtype='int64')
+
+
+def to_float(s: pd.Series) -> pd.Series:
+    """Numeric col to float, str cols (eg carryback with spaces '1 .5') have spaces removed first"""
+    if not pd.api.types.is_numeric_dtype(s):
+        s = s.str.replace(' ', '', regex=False)
+
+    return s.astype(float)
+
+
+def parse_cycles(df: pd.DataFrame, fmt: str = None) -> pd.DataFrame:
+    """Convert raw haulcycle rows (cols renamed, incl date/time) to plm.good_cols dtypes, vectorised per column
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+    fmt : str, optional
+        datetime format of 'date time', default None (inferred from first row)
+    """
+    return df \
+        .assign(datetime=lambda x: pd.to_datetime(
+            x['date'] + ' ' + x['time'],
+            format=fmt,
+            infer_datetime_format=fmt is None)) \
+        .dropna(subset=['datetime']) \
+        .assign(
+            cycletime=lambda x: hms_to_seconds(x['cycletime']),
+            carryback=lambda x: to_float(x['carryback']))
+
+
+def local_utc_offsets(t: np.ndarray) -> np.ndarray:
+    """Local timezone utc offset (seconds) at each epoch, same offset dt.fromtimestamp uses
+    - looked up once per day, days with a dst change are looked up per 15 min (tz changes fall on 15 min boundaries)
+    """
+    def _offsets(ts: np.ndarray) -> np.ndarray:
+        return np.array([time.localtime(x).tm_gmtoff for x in ts.tolist()], dtype='int64')
+
+    days, idx = np.unique(t // 86400, return_inverse=True)
+    start, end = _offsets(days * 86400), _offsets((days + 1) * 86400)
+    offsets = start[idx]
+
+    changed = (start != end)[idx]
+    if changed.any():
+        quarters, idx_q = np.unique(t[changed] // 900, return_inverse=True)
+        offsets[changed] = _offsets(quarters * 900)[idx_q]
+
+    return offsets
+
+
+def parse_fault_times(s: pd.Series) -> pd.Series:
+    """Vectorised parse_fault_time, 'epoch|tz_offset' strings to datetime
+    - split with c csv parser (sep='|'), much faster than str.split per row
+    - epoch converted to local time same as dt.fromtimestamp, so times match faults already imported
+
+    Parameters
+    ----------
+    s : pd.Series
+        eg '1577865660|-25200'
+
+    Returns
+    -------
+    pd.Series
+        datetime64
+    """
+    if len(s) == 0:
+        return pd.Series(dtype='datetime64[ns]', index=s.index)
+
+    # raises ValueError on missing values or parts
+    df = pd.read_csv(
+        io.StringIO('\n'.join(s.tolist())),
+        sep='|',
+        header=None,
+        names=['t', 'tz'],
+        dtype='int64',
+        skip_blank_lines=False)
+
+    t = df['t'].to_numpy()
+    return pd.Series(pd.to_datetime(t + local_utc_offsets(t) + df['tz'].to_numpy(), unit='s'), index=s.index)
+
+
+def parse_fault_header(lines: List[str]) -> Dict[str, str]:
+    """Machine serial and model from fault csv header lines
+
+    Parameters
+    ----------
+    lines : List[str]
+        first lines of file, 'Machine Model,980E' etc in rows 2-5
+
+    Returns
+    -------
+    Dict[str, str]
+        serial, model
+    """
+    m = {f.to_snake(row[0]): row[1].strip() for row in csv.reader(lines[1:5]) if len(row) > 1}
+
+    return dict(
+        serial=m['machine_serial_no'],
+        model=m['machine_model'] + m['machine_type_minor_variation_code'])
@@ -11,6 +11,8 @@ from guesttracker import eventfolders as efl
 from guesttracker import functions as f
 from guesttracker import getlog
 from guesttracker.data.internal import utils as utl
+from guesttracker.data.internal.manifest import ImportManifest
+from guesttracker.data.internal.parsers import parse_cycles
 from guesttracker.database import db
 from guesttracker.queries.plm import PLMUnit
 from guesttracker.utils import fileops as fl
@@ -79,6 +81,10 @@ def update_plm_all_units(minesite='FortHills', model='980'):
         ftype='plm',
         chunksize=10000)
 
+    # files read in each unit's process are only marked imported once all rows are committed
+    if not rowsadded is None:
+        ImportManifest().record_many([rec for m in result for rec in m['df'].attrs.get('import_files', [])])
+
     new_result = []
     for m in result:
         df = m['df']
@@ -221,8 +227,26 @@ def unit_from_haulcycle(p: Path, raise_errors: bool = True) -> Union[str, None]:
     return unit
 
 
-def read_plm3(p: Path):
+def read_plm3(p: Path, legacy: bool = False) -> pd.DataFrame:
     """Read plm3 file from csv"""
+    if legacy:
+        return _read_plm3_legacy(p=p)
+
+    df = pd.read_csv(p, header=7, engine='c', usecols=m_cols_plm3, skip_blank_lines=False)
+
+    # plm 3 has alarmfile csv inside, need to break at first blank row
+    is_blank = df.drop(columns=['Date', 'Time']).isna().all(axis=1).to_numpy()
+    n = is_blank.argmax() if is_blank.any() else len(df)
+
+    return df.iloc[:n] \
+        .dropna(subset=['Date', 'Time'], how='all') \
+        .rename(columns=m_cols_plm3) \
+        .pipe(parse_cycles)[good_cols] \
+        .pipe(lambda df: df[df.datetime <= dt.now()])
+
+
+def _read_plm3_legacy(p: Path) -> pd.DataFrame:
+    """Original row-wise plm3 reader, kept to verify parse_cycles against (verify_read_plm)"""
     df = pd \
         .read_csv(
             p,
@@ -245,8 +269,17 @@ def read_plm3(p: Path):
         .pipe(lambda df: df[df.datetime <= dt.now()])
 
 
-def read_plm(p: Path, unit: str = None) -> pd.DataFrame:
-    """Load single plmcycle file to dataframe"""
+def read_plm(p: Path, unit: str = None, legacy: bool = False) -> pd.DataFrame:
+    """Load single plmcycle file to dataframe
+
+    Parameters
+    ----------
+    p : Path
+    unit : str, optional
+        backup unit if not in header, default None
+    legacy : bool, optional
+        use original row-wise parsing (strptime per row), default False
+    """
 
     # can maybe pass in unit while uploading all dls as backup
     unit_backup = unit
@@ -263,7 +296,7 @@ def read_plm(p: Path, unit: str = None) -> pd.DataFrame:
 
         # don't try plm3 for 980s
         if not '980' in model_base:
-            return read_plm3(p=p)
+            return read_plm3(p=p, legacy=legacy)
         else:
             raise e
 
@@ -273,7 +306,19 @@ def read_plm(p: Path, unit: str = None) -> pd.DataFrame:
         else:
             return None
 
+    if legacy:
+        return _read_plm_legacy(p=p, unit=unit)
+
     # NOTE some plm files have two CHECKSUM rows, so .iloc[:-2] fails
+    return pd.read_csv(p, engine='c', header=8, usecols=m_cols) \
+        .iloc[:-2] \
+        .rename(columns=m_cols) \
+        .pipe(parse_cycles, fmt='%m/%d/%y %H:%M:%S') \
+        .assign(unit=unit)[good_cols]
+
+
+def _read_plm_legacy(p: Path, unit: str) -> pd.DataFrame:
+    """Original row-wise plm reader, kept to verify parse_cycles against (verify_read_plm)"""
     return pd \
         .read_csv(
             p,
@@ -291,6 +336,60 @@ def read_plm(p: Path, unit: str = None) -> pd.DataFrame:
             carryback=lambda x: x['carryback'].astype(str).str.replace(' ', '').astype(float))[good_cols]
 
 
+def verify_read_plm(lst: List[Path], unit: str = None) -> pd.DataFrame:
+    """Read files with vectorised and legacy parsers and check results are identical (values + dtypes)
+    - files failing in both readers count as matching
+
+    Parameters
+    ----------
+    lst : List[Path]
+        haulcycle files, eg from FolderSearch('plm')
+    unit : str, optional
+        backup unit passed to read_plm, default None
+
+    Returns
+    -------
+    pd.DataFrame
+        path, rows, match, error per file, mismatched files first
+
+    Examples
+    --------
+    >>> lst = utl.FolderSearch('plm', d_lower=dt(2021, 1, 1)).search(efl.UnitFolder('F301').p_dls)
+    >>> df = plm.verify_read_plm(lst)
+    >>> df[~df.match]
+    """
+    def _read(p: Path, legacy: bool) -> Tuple[Union[pd.DataFrame, None], Union[str, None]]:
+        try:
+            return read_plm(p, unit=unit, legacy=legacy), None
+        except Exception as e:
+            return None, f'{type(e).__name__}: {e}'
+
+    data = []
+    for p in lst:
+        df, err = _read(p, legacy=False)
+        df_legacy, err_legacy = _read(p, legacy=True)
+
+        if df is None or df_legacy is None:
+            match = df is None and df_legacy is None
+        elif len(df) == 0 and len(df_legacy) == 0:
+            match = list(df.columns) == list(df_legacy.columns)
+        else:
+            match = df.equals(df_legacy) and df.dtypes.equals(df_legacy.dtypes)
+
+        data.append(dict(
+            path=str(p),
+            rows=len(df) if not df is None else None,
+            rows_legacy=len(df_legacy) if not df_legacy is None else None,
+            match=match,
+            error=err,
+            error_legacy=err_legacy))
+
+    df = pd.DataFrame(data, columns=['path', 'rows', 'rows_legacy', 'match', 'error', 'error_legacy'])
+    log.info(f'Verified plm readers, files: [{len(df)}], mismatched: [{(~df.match).sum()}]')
+
+    return df.sort_values('match', kind='stable')
+
+
 def collect_plm_files(unit: str, d_lower: dt = None, lst: list = None):
     """Collect PLM files from p drive and save to desktop
     - Used for uploading to KA PLM report system
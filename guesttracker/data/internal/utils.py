@@ -16,6 +16,8 @@ from guesttracker import eventfolders as efl
 from guesttracker import functions as f
 from guesttracker import getlog
 from guesttracker.data.internal import dls, faults, plm
+from guesttracker.data.internal.foldersearch import FolderSearch
+from guesttracker.data.internal.manifest import ImportManifest, UnitCheckpoint
 from guesttracker.database import db
 from guesttracker.queries import TableKeys
 from guesttracker.utils import fileops as fl
@@ -44,127 +46,6 @@ def get_config(ftype: str):
         .get(ftype)
 
 
-class FolderSearch():
-    """Class to recursively search folder paths for specific file types"""
-
-    # set up filepaths to exclude
-    fr = ['frdls', 'event', 'data']
-    base = ['stats', 'system', 'pic'] + fr
-    vhms = ['vhms', 'chk']
-    plm = ['plm']
-    ge = ['ge', 'dsc']
-    non_ge = base + ge
-
-    cfg = dict(
-        fault=dict(
-            find=r'fault0.*csv$',
-            exclude=non_ge + plm),
-        plm=dict(
-            find=r'haul.*csv$',
-            exclude=[r'\d{8}'] + non_ge + vhms),
-        dsc=dict(
-            find=r'dsc|\d{5}_\d{6}_\d{4}',
-            exclude=[r'^a\d{5}$'] + base + plm + vhms),
-        tr3=dict(
-            find=r'.*tr3$',
-            exclude=non_ge + plm + vhms),
-        ahs=dict(
-            find=r'^data\d*$|^dnevent|^sfevent',
-        ))
-
-    keys = list(cfg.keys())
-
-    def __init__(
-            self,
-            ftype: str,
-            max_depth: int = 6,
-            d_lower: dt = None):
-        """
-        Parameters
-        ----------
-        ftype : str
-            file type to collect (dsc, fault | plm | tr3)
-        max_depth : int, optional
-            max depth to recurse, default 5
-        d_lower : dt, optional
-            date to filter file date created, default 2016-01-01
-        """
-        if not ftype in self.keys:
-            raise ValueError(f'Incorrect ftype "{ftype}", must be in {self.keys}')
-
-        if d_lower is None:
-            d_lower = dt.now() + delta(days=-180)
-
-        cfg = self.cfg.get(ftype)
-        expr_exclude = self.make_re_exclude(lst=cfg.get('exclude'))
-        expr_find = cfg.get('find')
-
-        f.set_self(vars())
-
-    def should_exclude(self, name: str) -> bool:
-        """Check if folder name matches exclude pattern
-
-        Parameters
-        ----------
-        name : str
-            folder name to check
-
-        Returns
-        -------
-        bool
-            if folder matches exclude pattern
-        """
-        return False if self.expr_exclude is None else re.search(self.expr_exclude, name)
-
-    def search(self, p: Path, depth: int = 0) -> list:
-        """Recurse folder and find matching files/folders
-
-        Parameters
-        ----------
-        p : Path
-            start path
-        depth : int, optional
-            current search depth, default 0
-
-        Returns
-        -------
-        list
-            list of all collected files
-        """
-        lst = []
-
-        for p in p.iterdir():
-            name = p.name.lower()
-
-            # exclude folders, enforce date greater than d_lower
-            if not self.should_exclude(name) and fl.date_modified(p) > self.d_lower:
-
-                # find matching files and add to return list
-                if re.search(self.expr_find, name):
-                    lst.append(p)
-
-                # else search deeper
-                elif depth < self.max_depth and p.is_dir():
-                    lst.extend(self.search(p=p, depth=depth + 1))
-
-        return lst
-
-    def make_re_exclude(self, lst: list) -> str:
-        """Make exclude regex expr for ftype
-
-        Parameters
-        ----------
-        lst : list
-            list to join
-
-        Returns
-        -------
-        str
-            exclude string item1|item2|...
-        """
-        return '|'.join(lst) if not lst is None else None
-
-
 class FileProcessor():
     """Higher level class to manage collecting and processing files based on type"""
 
@@ -173,11 +54,28 @@ class FileProcessor():
             ftype: str,
             d_lower: dt = dt(2020, 1, 1),
             max_depth: int = 4,
-            search_folders: list = ['downloads']):
-
+            search_folders: list = ['downloads'],
+            force: bool = False,
+            use_manifest: bool = True,
+            use_cache: bool = True,
+            p_checkpoints: Path = None):
+        """
+        Parameters
+        ----------
+        force : bool, optional
+            reprocess plm/fault files already in import manifest, default False
+        use_manifest : bool, optional
+            skip plm/fault files already imported and unchanged, default True
+        use_cache : bool, optional
+            reuse listings of folders unchanged since last search (FolderSearch use_cache), default True
+        p_checkpoints : Path, optional
+            dir for per unit import checkpoints, default cf.p_applocal/checkpoints/{ftype}
+        """
+        p_checkpoints = Path(p_checkpoints or cf.p_applocal / f'checkpoints/{ftype}')
         self.collected_files = []
         self.collected_files_dict = {}
-        self.folder_search = FolderSearch(ftype=ftype, d_lower=d_lower, max_depth=max_depth)
+        self.folder_search = FolderSearch(ftype=ftype, d_lower=d_lower, max_depth=max_depth, use_cache=use_cache)
+        self.manifest = ImportManifest() if use_manifest and ftype in ('plm', 'fault') else None
 
         f.set_self(vars())
 
@@ -217,7 +115,20 @@ class FileProcessor():
         # parallel process collecting files per unit
         lst = Parallel(n_jobs=n_jobs, verbose=11)(delayed(self._collect_files_unit)(unit=unit) for unit in units)
 
-        self.collected_files_dict = f.flatten_list_dict(lst)
+        m_files = f.flatten_list_dict(lst)
+
+        # drop files already imported before anything is opened
+        if not self.manifest is None:
+            lst_new = self.manifest.filter_new(
+                lst=f.flatten_list_list(list(m_files.values())),
+                ftype=self.ftype,
+                force=self.force,
+                d_lower=self.d_lower)
+
+            s_new = set(lst_new)
+            m_files = {unit: [p for p in items if p in s_new] for unit, items in m_files.items()}
+
+        self.collected_files_dict = m_files
         self.collected_files = f.flatten_list_list([v for v in self.collected_files_dict.values()])
 
         # log message for total number of files, and files per unit
@@ -236,7 +147,7 @@ class FileProcessor():
         log.info(f'{name} - units: [{len(units)}], startdate: {self.d_lower}')
 
         proc_func = getattr(self, f'{name}')
-        proc_func(lst=lst)
+        return proc_func(lst=lst)
 
     def proc_dsc_batch(self, lst: List[Path]) -> int:
         """Process batch of dsc files that may be in the same top folder"""
@@ -259,23 +170,137 @@ class FileProcessor():
         lst_out = Parallel(n_jobs=-1, verbose=11)(delayed(self.proc_dsc_batch)(lst=lst) for lst in lst_grouped)
         log.info(f'Processed [{sum(lst_out)}/{len(lst)}] dsc files')
 
+    def group_by_unit(self, lst: List[Path]) -> Dict[str, List[Path]]:
+        """Group files by unit folder they were collected from, files passed in directly use unit_from_path"""
+        s_lst = set(lst)
+        m = {unit: [p for p in items if p in s_lst] for unit, items in self.collected_files_dict.items()}
+        s_found = set(f.flatten_list_list(list(m.values())))
+
+        for p in lst:
+            if not p in s_found:
+                unit = unit_from_path(p)
+                if not unit is None:
+                    m.setdefault(unit, []).append(p)
+
+        return {unit: items for unit, items in m.items() if items}
+
+    def process_unit(self, unit: str, lst: List[Path], chunksize: int = 100) -> dict:
+        """Parse > dedupe > upsert one unit's plm/fault files, chunksize files at a time
+        - each chunk is committed and recorded to manifest + checkpoint before the next is read, so memory is bounded
+            by chunksize and a failed unit resumes after its last committed chunk
+        - rows from earlier chunks/runs are deduped against the db by filter_existing_records
+
+        Returns
+        -------
+        dict
+            unit, files, rowsadded, error
+        """
+        ckpt = UnitCheckpoint(unit=unit, ftype=self.ftype, p=self.p_checkpoints / f'{unit}.json')
+        lst = ckpt.remaining(lst)
+        error = None
+
+        with db.worker_scope():
+            try:
+                for i in range(0, len(lst), chunksize):
+                    lst_chunk = lst[i: i + chunksize]
+
+                    df = combine_csv(
+                        lst_csv=lst_chunk,
+                        ftype=self.ftype,
+                        d_lower=self.d_lower,
+                        n_jobs=4,
+                        manifest=self.manifest)
+
+                    rowsadded = import_csv_df(df=df, ftype=self.ftype, chunksize=10000) if len(df) > 0 else 0
+                    if rowsadded is None:
+                        raise RuntimeError('Failed to import rows to db, see log')
+
+                    if not self.manifest is None:
+                        self.manifest.record_many(df.attrs.get('import_files', []))
+
+                    ckpt.update(lst=lst_chunk, rowsadded=rowsadded)
+                    log.info(f'{self.ftype} unit: {unit}, files: [{len(ckpt.files_done)}], rows: [{ckpt.rowsadded}]')
+
+                ckpt.clear()
+            except Exception as e:
+                error = str(e)
+                log.error(f'Failed {self.ftype} import, unit: {unit}, resume from checkpoint: {ckpt.p}\n\t{e}')
+
+        return dict(unit=unit, files=len(ckpt.files_done), rowsadded=ckpt.rowsadded, error=error)
+
+    def process_plm(self, lst: List[Path], n_jobs: int = 4, chunksize: int = 100, resume: bool = True) -> list:
+        """Import plm files, units in parallel, each unit's rows upserted as soon as they're parsed
+
+        Parameters
+        ----------
+        lst : List[Path]
+            collected haulcycle files
+        n_jobs : int, optional
+            units processed at once, default 4
+        chunksize : int, optional
+            files parsed + imported per step within unit, default 100
+        resume : bool, optional
+            skip files committed by a previous failed run (unit checkpoint), False to discard checkpoints,
+            default True
+
+        Returns
+        -------
+        list
+            dict of unit, files, rowsadded, error per unit
+        """
+        m_files = self.group_by_unit(lst=lst)
+
+        if not resume:
+            for unit in m_files:
+                UnitCheckpoint(unit=unit, ftype=self.ftype, p=self.p_checkpoints / f'{unit}.json').clear()
 
-def combine_csv(lst_csv, ftype, d_lower=None, n_jobs: int = -1, **kw):
-    """Combine list of csvs into single and drop duplicates, based on duplicate cols"""
+        n_jobs = max(min(n_jobs, len(m_files)), 1)
+        result = Parallel(n_jobs=n_jobs, verbose=11)(
+            delayed(self.process_unit)(unit=unit, lst=items, chunksize=chunksize) for unit, items in m_files.items())
+
+        failed = [m['unit'] for m in result if not m['error'] is None]
+        n = sum(m['rowsadded'] for m in result)
+        log.info(f'Processed plm, units: [{len(result)}], rows added: [{n}], failed: {failed}')
+
+        return result
+
+
+def combine_csv(
+        lst_csv,
+        ftype,
+        d_lower=None,
+        n_jobs: int = -1,
+        manifest: 'ImportManifest' = None,
+        **kw):
+    """Combine list of csvs into single and drop duplicates, based on duplicate cols
+    - if manifest passed, per file manifest records are returned in df.attrs['import_files'], record them
+        with manifest.record_many only after df is imported
+    """
     func = get_config(ftype).get('read_func')
 
+    def _read(p: Path) -> Tuple[Union[pd.DataFrame, None], Union[dict, None]]:
+        df = func(p=p, **kw)
+        rec = manifest.make_record(p=p, ftype=ftype, df=df, d_lower=d_lower) if not manifest is None else None
+        return df, rec
+
     # multiprocess reading/parsing single csvs
-    job = delayed(func)
-    dfs = Parallel(n_jobs=n_jobs, verbose=11, prefer='threads')(job(p=p_csv, **kw) for p_csv in lst_csv)
+    result = Parallel(n_jobs=n_jobs, verbose=11, prefer='threads')(delayed(_read)(p=p_csv) for p_csv in lst_csv)
+    dfs = [df for df, _ in result if not df is None]
 
-    df = pd.concat([df for df in dfs if not df is None], sort=False) \
-        .drop_duplicates(subset=get_config(ftype)['duplicate_cols'])
+    if not dfs:
+        df = pd.DataFrame()
+    else:
+        df = pd.concat(dfs, sort=False) \
+            .drop_duplicates(subset=get_config(ftype)['duplicate_cols'])
 
     # drop old records before importing
     # faults dont use datetime, but could use 'Time_From'
     if not d_lower is None and 'datetime' in df.columns:
         df = df[df.datetime >= d_lower]
 
+    if not manifest is None:
+        df.attrs['import_files'] = [rec for _, rec in result]
+
     return df
 
 
@@ -329,9 +354,7 @@ def unit_from_path(p):
     """
     minesite = plm.minesite_from_path(p)
 
-    units = db.get_df_unit() \
-        .pipe(lambda df: df[df.MineSite == minesite]) \
-        .Unit.unique().tolist()
+    units = db.units_minesite(minesite)
 
     match = re.search(f'({"|".join(units)})', str(p))
     if match:
@@ -347,11 +370,18 @@ def process_files(
         d_lower: dt = dt(2020, 1, 1),
         max_depth: int = 4,
         import_: bool = True,
-        parallel: bool = True) -> Union[int, pd.DataFrame]:
+        parallel: bool = True,
+        force: bool = False,
+        use_manifest: bool = True,
+        use_cache: bool = True) -> Union[int, pd.DataFrame]:
     """
     Top level control function - pass in single unit or list of units
     1. Get list of files (plm, fault, dsc)
     2. Process - import plm/fault or 'fix' dsc eg downloads folder structure
+    - plm/fault files already in the import manifest (and unchanged) are skipped before being opened,
+        pass force=True to reprocess them
+    - with import_=False, caller must record df.attrs['import_files'] to manifest after importing df
+    - use_cache=False to list every folder fresh instead of reusing unchanged folder listings (FolderSearch use_cache)
 
     TODO - make this into a FileProcessor class
     """
@@ -373,7 +403,7 @@ def process_files(
 
         # could search more than just downloads folder (eg event too)
         for p_search in lst_search:
-            lst.extend(FolderSearch(ftype, d_lower=d_lower, max_depth=max_depth).search(p_search))
+            lst.extend(FolderSearch(ftype, d_lower=d_lower, max_depth=max_depth, use_cache=use_cache).search(p_search))
 
         # process all dsc folders per unit as we find them
         if ftype == 'dsc':
@@ -407,10 +437,23 @@ def process_files(
 
     # collect all csv files for all units first, then import together
     if ftype in ('plm', 'fault'):
+        manifest = ImportManifest() if use_manifest else None
+        if not manifest is None:
+            lst = manifest.filter_new(lst=lst, ftype=ftype, force=force, d_lower=d_lower)
+
         log.info(f'num files: {len(lst)}')
         if lst:
-            df = combine_csv(lst_csv=lst, ftype=ftype, d_lower=d_lower)
-            return import_csv_df(df=df, ftype=ftype) if import_ else df
+            df = combine_csv(lst_csv=lst, ftype=ftype, d_lower=d_lower, manifest=manifest)
+            if not import_:
+                return df
+
+            rowsadded = import_csv_df(df=df, ftype=ftype)
+
+            # failed imports return None, leave files out of manifest so they're read again next run
+            if not manifest is None and not rowsadded is None:
+                manifest.record_many(df.attrs.get('import_files', []))
+
+            return rowsadded
 
         else:
             return pd.DataFrame()  # return blank dataframe
@@ -456,8 +499,8 @@ def combine_import_csvs(lst_csv: list, ftype: str, **kw) -> int:
     return import_csv_df(df=df, ftype=ftype)
 
 
-def import_csv_df(df: pd.DataFrame, ftype: str, **kw) -> int:
-    """Import fault or plm df combined from csvs"""
+def import_csv_df(df: pd.DataFrame, ftype: str, **kw) -> Union[int, None]:
+    """Import fault or plm df combined from csvs, None if import failed"""
 
     df = filter_existing_records(df=df, ftype=ftype)
 
@@ -0,0 +1,252 @@
+import time
+from typing import *
+
+import pandas as pd
+from pypika import MSSQLQuery as Query
+from pypika import Table as T
+from sqlalchemy import delete, inspect, select
+from sqlalchemy.orm import Session
+
+from guesttracker import errors as er
+from guesttracker import functions as f
+from guesttracker import getlog
+from guesttracker.database import db
+from guesttracker.utils import dbmodel as dbm
+from guesttracker.utils.sqlparams import as_param
+
+log = getlog(__name__)
+
+"""
+ReservationUnits junction table, one row per (reservation, unit) with the reservation's dates
+- Reservations.unit_assignments (eg "A1, A2") is still the field users see/edit
+- junction rows are rebuilt from it whenever a reservation's units/dates change, so availability checks can be
+    indexed range queries instead of loading + splitting every reservation
+- until migrate() has been run, db reads fall back to splitting unit_assignments (is_migrated)
+
+Examples
+--------
+>>> from guesttracker.data import reservations as rs
+>>> rs.migrate()  # create table + backfill from all existing reservations
+"""
+
+# Reservations cols which require junction rows to be rebuilt when changed
+SYNC_COLS = ('unit_assignments', 'arrival_date', 'departure_date')
+
+cols = ['reservation_id', 'unit_id', 'arrival_date', 'departure_date']
+
+# result of last is_migrated check, negative result rechecked after MIGRATED_TTL (migrate() can run while app is open)
+_migrated = dict(val=False, checked=None)
+MIGRATED_TTL = 300  # seconds
+
+
+def is_migrated() -> bool:
+    """Check if ReservationUnits table exists and has been backfilled
+    - positive result cached for session, negative result for MIGRATED_TTL
+    """
+    m = _migrated
+    if m['val'] or (not m['checked'] is None and time.time() - m['checked'] < MIGRATED_TTL):
+        return m['val']
+
+    m['val'], m['checked'] = check_migrated(), time.time()
+    return m['val']
+
+
+def check_migrated() -> bool:
+    """Query db for migration state
+    - table missing > False
+    - table empty > only migrated if no reservations have units to backfill
+
+    Returns
+    -------
+    bool
+    """
+    t, r = dbm.ReservationUnits, dbm.Reservations
+
+    try:
+        # own connection, not session, so a failed check doesn't fail the session's transaction
+        with db.engine.connect() as conn:
+            if not inspect(conn).has_table(t.__tablename__):
+                log.info('ReservationUnits table not created, using Reservations.unit_assignments')
+                return False
+
+            if not conn.execute(select(t.reservation_id).limit(1)).first() is None:
+                return True
+
+            sql = select(r.uid).where(r.unit_assignments.isnot(None)).where(r.unit_assignments != '').limit(1)
+            if conn.execute(sql).first() is None:
+                return True
+
+        log.info('ReservationUnits not backfilled, using Reservations.unit_assignments')
+    except Exception as e:
+        log.warning(f'Failed to check ReservationUnits, using Reservations.unit_assignments: {type(e).__name__}')
+
+    return False
+
+
+def split_units(s: Union[str, None]) -> List[str]:
+    """Split unit_assignments string to list of unit abbrs, eg "A1, A2" > ['A1', 'A2']"""
+    if s is None or pd.isnull(s):
+        return []
+
+    return [u.strip() for u in str(s).split(',') if u.strip()]
+
+
+def explode_units(df_res: pd.DataFrame, df_unit: pd.DataFrame) -> pd.DataFrame:
+    """Convert reservations to junction rows, matching unit abbrs (case insensitive) to Units.uid
+
+    Parameters
+    ----------
+    df_res : pd.DataFrame
+        Reservations with uid, unit_assignments, arrival_date, departure_date
+    df_unit : pd.DataFrame
+        Units with uid, abbr
+
+    Returns
+    -------
+    pd.DataFrame
+        df with cols reservation_id, unit_id, arrival_date, departure_date
+    """
+    m_unit = dict(zip(df_unit.abbr.str.strip().str.upper(), df_unit.uid))
+
+    df = df_res \
+        .assign(unit=lambda x: x.unit_assignments.apply(split_units)) \
+        .explode('unit') \
+        .dropna(subset=['unit']) \
+        .assign(unit_id=lambda x: x.unit.str.upper().map(m_unit))
+
+    df_missing = df[df.unit_id.isna()]
+    if len(df_missing) > 0:
+        units = sorted(df_missing.unit.unique())
+        log.warning(f'{len(df_missing)} unit assignments not matched to Units, skipped: {units[:20]}')
+
+    return df \
+        .dropna(subset=['unit_id']) \
+        .rename(columns=dict(uid='reservation_id')) \
+        .drop_duplicates(subset=['reservation_id', 'unit_id'])[cols] \
+        .reset_index(drop=True)
+
+
+def split_reservations(df_res: pd.DataFrame) -> pd.DataFrame:
+    """Split reservations to one row per unit abbr, used before ReservationUnits is migrated
+
+    Parameters
+    ----------
+    df_res : pd.DataFrame
+        Reservations with uid, unit_assignments, arrival_date, departure_date
+
+    Returns
+    -------
+    pd.DataFrame
+        df with cols unit, reservation_id, arrival_date, departure_date (same as db.q_reservation_units)
+    """
+    return df_res \
+        .assign(unit=lambda x: x.unit_assignments.apply(split_units)) \
+        .explode('unit') \
+        .dropna(subset=['unit']) \
+        .rename(columns=dict(uid='reservation_id'))[['unit', 'reservation_id', 'arrival_date', 'departure_date']] \
+        .reset_index(drop=True)
+
+
+def get_df_res(uids: List[str] = None) -> pd.DataFrame:
+    """Read reservations' unit_assignments and dates from db"""
+    a = T('Reservations')
+    q = Query.from_(a) \
+        .select(a.uid, a.unit_assignments, a.arrival_date, a.departure_date)
+
+    if not uids is None:
+        q = q.where(a.uid.isin(as_param(uids)))
+
+    return db.read_query(q=q, source='ReservationUnits')
+
+
+def create_table() -> None:
+    """Create ReservationUnits table + indexes if not exists"""
+    dbm.ReservationUnits.__table__.create(bind=db.engine, checkfirst=True)
+
+
+def stage_units(uids: Union[str, List[str]], session: Session = None) -> None:
+    """Replace junction rows for specific reservations in session's open transaction, caller commits
+    - reservations are read through the same session, so uncommitted edits (eg Row.update) are used
+
+    Parameters
+    ----------
+    uids : Union[str, List[str]]
+        Reservations.uid(s)
+    session : Session, optional
+        default db.session
+    """
+    uids = f.as_list(uids)
+    session = session or db.session
+    t, r = dbm.ReservationUnits, dbm.Reservations
+
+    rows = session.query(r.uid, r.unit_assignments, r.arrival_date, r.departure_date) \
+        .filter(r.uid.in_(uids)).all()
+
+    df_res = pd.DataFrame(rows, columns=['uid', 'unit_assignments', 'arrival_date', 'departure_date'])
+    df = explode_units(df_res=df_res, df_unit=db.get_df_unit(active_only=False))
+
+    session.query(t).filter(t.reservation_id.in_(uids)).delete(synchronize_session=False)
+    df = df.astype(object).where(df.notna(), None)  # NaT > None
+    session.add_all([t(**m) for m in df.to_dict(orient='records')])
+
+
+def sync_units(uids: Union[str, List[str]]) -> bool:
+    """Rebuild junction rows for specific reservations in a single transaction
+    - call after a reservation's unit_assignments/dates are changed outside the orm and already committed
+
+    Parameters
+    ----------
+    uids : Union[str, List[str]]
+        Reservations.uid(s)
+
+    Returns
+    -------
+    bool
+        if transaction succeeded
+    """
+    fail_msg = 'Failed to update ReservationUnits'
+
+    try:
+        stage_units(uids=uids)
+    except Exception as e:
+        er.log_error(msg=fail_msg, exc=e, log=log, display=True)
+        db.rollback()
+        return False
+
+    return db.safe_commit(fail_msg=fail_msg)
+
+
+def backfill(chunksize: int = 10_000) -> int:
+    """Rebuild all junction rows from Reservations.unit_assignments
+
+    Parameters
+    ----------
+    chunksize : int, optional
+        rows per upsert round trip, default 10_000
+
+    Returns
+    -------
+    int
+        rows inserted
+    """
+    from guesttracker.dbtransaction import BulkUpsert
+
+    df = explode_units(df_res=get_df_res(), df_unit=db.get_df_unit(active_only=False, force=True))
+
+    db.safe_execute(delete(dbm.ReservationUnits))
+    db.safe_commit()
+
+    result = BulkUpsert(table='ReservationUnits', chunksize=chunksize).upsert(data=df)
+    db.cache.invalidate(name='reservations')
+
+    log.info(f'Backfilled ReservationUnits: {result}')
+    return result['inserted']
+
+
+def migrate(chunksize: int = 10_000) -> int:
+    """Create ReservationUnits table and backfill from existing reservations"""
+    create_table()
+    n = backfill(chunksize=chunksize)
+    _migrated.update(val=True, checked=time.time())
+
+    return n
@@ -1,5 +1,6 @@
 import functools
-import socket
+import threading
+from contextlib import contextmanager
 from typing import *
 from typing import TYPE_CHECKING
 from urllib import parse
@@ -13,7 +14,7 @@ from pypika import Table as T
 from pypika import functions as fn
 from sqlalchemy import create_engine, exc
 from sqlalchemy.engine.base import Connection  # just to wrap errors
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 from sqlalchemy.pool.base import Pool
 
 from guesttracker import config as cf
@@ -21,9 +22,16 @@ from guesttracker import delta, dt
 from guesttracker import errors as er
 from guesttracker import functions as f
 from guesttracker import getlog
+from guesttracker.utils.dbcache import Stamp, TableCache
+from guesttracker.utils.retry import (
+    CircuitBreaker, RetryPolicy, RetryStats, call_with_retry, is_transient)
+from guesttracker.utils.querystats import query_stats
+from guesttracker.utils.sqlparams import Param, StatementCache, get_sql_params
 from jgutils.secrets import SecretsManager
 
 if TYPE_CHECKING:
+    from pypika.queries import QueryBuilder
+
     from guesttracker.utils.dbmodel import Base
 
 log = getlog(__name__)
@@ -103,7 +111,11 @@ def _create_engine():
     """Create sqla engine object
     - sqlalchemy.engine.base.Engine
     - Used in DB class and outside, eg pd.read_sql
-    - any errors reading db_creds results in None engine"""
+    - any errors reading db_creds results in None engine
+    - GT_DB_BACKEND=sqlite uses local stand-in db instead of mssql"""
+    if cf.DB_BACKEND == 'sqlite':
+        from guesttracker.utils.localdb import create_engine_local
+        return create_engine_local()
 
     # connect_args = {'autocommit': True}
     # , isolation_level="AUTOCOMMIT"
@@ -140,21 +152,110 @@ def e(func):
             # rollback invalid transaction
             log.warning(f'Rollback and retry operation: {type(e)}')
             db.rollback()
-            return func(*args, **kwargs)
-
-        except (exc.OperationalError, exc.DBAPIError, exc.ResourceClosedError) as e:
-            log.warning(f'Handling {type(e)}')
-            db.reset()
-            return func(*args, **kwargs)
+            return db.retry(func, *args, **kwargs)
 
         except Exception as e:
-            log.warning(f'Handling other errors: {type(e)}')
-            db.reset()
-            return func(*args, **kwargs)
+            if not is_transient(e):
+                raise
+
+            # connection dropped, retry with backoff (or fail fast if breaker open)
+            log.warning(f'Handling {type(e)}')
+            db.breaker.record_failure()
+            db.reset_thread()
+            return db.retry(func, *args, **kwargs)
 
     return wrapper
 
 
+class UnitIndex():
+    """Hash indexes over unit table for O(1) lookups by unit/serial/minesite
+    - Built once per version of the cached unit df, rebuilt when cache reloads units
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Parameters
+        ----------
+        df : pd.DataFrame
+            full (cached) unit df
+        """
+        self.source = df  # keep ref to check if unit cache has been reloaded
+
+        if 'active' in df.columns:
+            df = df[df.active == 1]
+
+        df = df.reset_index(drop=True)
+        unit_col = 'Unit' if 'Unit' in df.columns else 'abbr'
+        units = df[unit_col].astype(str).str.strip().tolist()
+
+        def _col(name: str) -> list:
+            return df[name].tolist() if name in df.columns else [None] * len(df)
+
+        by_unit = {unit: i for i, unit in enumerate(units)}
+        by_serial = {}  # type: Dict[str, List[int]]
+        by_serial_model = {}  # type: Dict[Tuple[str, str], List[int]]
+        by_minesite = {}  # type: Dict[str, List[str]]
+
+        for i, (serial, model_base, minesite) in enumerate(zip(_col('Serial'), _col('ModelBase'), _col('MineSite'))):
+            if not serial is None:
+                by_serial.setdefault(serial, []).append(i)
+                by_serial_model.setdefault((serial, model_base), []).append(i)
+
+            if not minesite is None:
+                by_minesite.setdefault(minesite, []).append(units[i])
+
+        self.df, self.units = df, units
+        self.models, self.minesites = _col('Model'), _col('MineSite')
+        self.by_unit, self.by_serial, self.by_serial_model, self.by_minesite = \
+            by_unit, by_serial, by_serial_model, by_minesite
+
+    def is_current(self, df: pd.DataFrame) -> bool:
+        """Check if index was built from this df"""
+        return df is self.source
+
+    def unit_exists(self, unit: str) -> bool:
+        return unit in self.by_unit
+
+    def get_row(self, unit: str) -> Union[pd.Series, None]:
+        i = self.by_unit.get(unit, None)
+        return self.df.iloc[i] if not i is None else None
+
+    def units_minesite(self, minesite: str = None, model: str = None) -> List[str]:
+        """Active units at minesite (all if None), filtered by partial model match if provided"""
+        units = self.by_minesite.get(minesite, []) if not minesite is None else self.units
+
+        if not model is None:
+            units = [u for u in units if model in str(self.models[self.by_unit[u]])]
+
+        return units
+
+    def unit_from_serial(
+            self,
+            serial: str,
+            model: str = None,
+            model_base: str = None,
+            minesite: str = None) -> Union[str, None]:
+        """Get unit from serial, filtered by partial model/minesite match if provided
+
+        Returns
+        -------
+        Union[str, None]
+            unit if exactly one match found
+        """
+        if not model_base is None:
+            idxs = self.by_serial_model.get((serial, model_base), [])
+        else:
+            idxs = self.by_serial.get(serial, [])
+
+        if not model is None:
+            idxs = [i for i in idxs if model in str(self.models[i])]
+
+        if not minesite is None:
+            idxs = [i for i in idxs if minesite in str(self.minesites[i])]
+
+        return self.units[idxs[0]] if len(idxs) == 1 else None
+
+
 class DB(object):
     def __init__(self):
         __name__ = 'HBA Guest Tracker Database'
@@ -162,41 +263,82 @@ class DB(object):
         self.reset(False)
 
         df_unit = None
+        _unit_index = None
         df_fc = None
         df_component = None
-        dfs = {}
+        p_snapshot = cf.p_applocal / 'snapshots' if not cf.AZURE_WEB else None
+        cache = TableCache(probe=self.get_table_stamp, default_ttl=60, p_snapshot=p_snapshot)
+
+        # query results shared across QueryBase instances, keyed by sql + params
+        result_cache = TableCache(probe=self.get_table_stamp, default_ttl=30, max_entries=256, max_bytes=256e6)
+        fetch_backend = 'pandas'  # default backend for read_sql, pandas | arrow
+        backend = cf.DB_BACKEND  # mssql | sqlite
+        # prepared cursors for parameterised queries
+        stmt_cache = StatementCache(get_conn=lambda: self.conn, translate=self.translate_sql)
         domain_map = dict(SMS='KOMATSU', Cummins='CED', Suncor='NETWORK')
         domain_map_inv = f.inverse(m=domain_map)
-        last_internet_success = dt.now() + delta(seconds=-61)
+        breaker = CircuitBreaker(name='db', failure_threshold=3, reset_timeout=30)
+        retry_stats = RetryStats()
+        retry_policy_ui = RetryPolicy(max_attempts=2, base_delay=0.1, max_delay=0.5)
+        retry_policy_worker = RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=8)
         f.set_self(vars())
 
         self.expected_exceptions = []
 
-    def check_internet(self, host='8.8.8.8', port=53, timeout=3, recheck_time=60):
-        """
-        Test if internet connection exists before attempting any database operations
-        Host: 8.8.8.8 (google-public-dns-a.google.com)
-        OpenPort: 53/tcp
-        Service: domain (DNS/TCP)
-        recheck_time : int, default 60
-            only re-check every x seconds
-        """
-        # raise er.NoInternetError() # testing
+        # link cached reference tables to the db tables they're loaded from
+        # snapshot tables are written to disk and loaded on startup before first db connection
+        for name, tables, ttl, snapshot in [
+                ('units', ['Units', 'Classes'], 300, True),
+                ('equiptype', 'EquipType', 600, True),
+                ('customers', 'Customers', 60, True),
+                ('component', 'ComponentType', 600, True),
+                ('reservations', ['Reservations', 'ReservationUnits', 'Units'], 30, False),
+                ('fc', 'FactoryCampaign', 300, False),
+                ('parts', 'Parts', 600, False),
+                ('emaillist', 'EmailList', 600, False),
+                ('oil_comps', ['OilSamples', 'Units'], 600, False),
+                ('lst_minesite', ['Units'], 300, False),
+                ('issues', None, None, False)]:
+            self.cache.register(name=name, tables=tables, ttl=ttl, snapshot=snapshot)
 
-        # Kinda sketch, but just avoid re-checking too frequently
-        if (dt.now() - self.last_internet_success).seconds < recheck_time:
-            return True
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """Shorter retries on gui main thread so ui doesn't freeze"""
+        if threading.current_thread() is threading.main_thread() and cf.IS_QT_APP:
+            return self.retry_policy_ui
 
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(timeout)
-            s.connect((host, port))
-            s.shutdown(socket.SHUT_RDWR)
-            s.close()
-            self.last_internet_success = dt.now()
-            return True
-        except socket.error as ex:
-            raise er.NoInternetError()
+        return self.retry_policy_worker
+
+    def retry(self, func: Callable, *args, expected_exceptions: list = None, **kw) -> Any:
+        """Call func, retry transient errors with backoff and reset thread's session between attempts
+
+        Parameters
+        ----------
+        func : Callable
+        expected_exceptions : list, optional
+            exceptions to always raise immediately, default None
+
+        Returns
+        -------
+        Any
+            result of func
+        """
+        def _on_retry(e: Exception) -> None:
+            self.rollback()
+            self.reset_thread(warn=False)
+
+        return call_with_retry(
+            func=functools.partial(func, *args, **kw),
+            policy=self.retry_policy,
+            breaker=self.breaker,
+            stats=self.retry_stats,
+            on_retry=_on_retry,
+            expected_exceptions=tuple(f.as_list(expected_exceptions or [])))
+
+    @property
+    def health(self) -> Dict[str, Any]:
+        """Circuit breaker state + retry counters"""
+        return dict(breaker=self.breaker.state, **self.retry_stats.to_dict())
 
     def rollback(self):
         """Wrapper for session rollback"""
@@ -207,20 +349,59 @@ class DB(object):
             log.warning(f'Failed to rollback session.: {type(e)}')
 
     def reset(self, warn: bool = True) -> None:
-        """set engine objects to none to force reset, not ideal"""
+        """set engine objects to none to force reset, not ideal
+        - resets for all threads, use reset_thread to only drop current thread's session/connections
+        """
         if warn:
             log.warning('Resetting database.')
 
         self._engine, self._session = None, None
 
+        if hasattr(self, 'stmt_cache'):
+            self.stmt_cache.reset()
+
+    def reset_thread(self, warn: bool = True) -> None:
+        """Close current thread's session and cached cursors, connections are returned to pool
+        - other threads (eg gui edits while worker runs) keep their sessions
+        """
+        if warn:
+            log.warning('Resetting database session for current thread.')
+
+        if not self._session is None:
+            try:
+                self._session.remove()
+            except Exception as e:
+                log.warning(f'Failed to remove session: {type(e)}')
+
+        self.stmt_cache.clear()
+
+    @contextmanager
+    def worker_scope(self) -> Iterator['DB']:
+        """Scope session/connections to a background worker thread
+        - rollback on error, always release thread's session + connections when done
+
+        Examples
+        --------
+        >>> with db.worker_scope():
+                func()
+        """
+        try:
+            yield self
+        except Exception:
+            self.rollback()
+            raise
+        finally:
+            self.reset_thread(warn=False)
+
     def clear_saved_tables(self):
         # reset dfs so they are forced to reload from the db
         from guesttracker.gui._global import update_statusbar
-        self.dfs = {}
+        self.cache.clear()
+        self.result_cache.clear()
         update_statusbar('Saved database tables cleared.')
 
     def safe_func(self, func: Callable, *args, **kw) -> Any:
-        """Call func and reset db one time if failed (try to reconnect)
+        """Call func, retrying transient (connection) errors with backoff
 
         Parameters
         ----------
@@ -237,37 +418,30 @@ class DB(object):
         Raises
         ------
         er.SMSDatabaseError
-            if second attempt fails
+            if func fails with non-transient error or retries exhausted
+        er.DatabaseUnavailableError
+            if circuit breaker open
         """
 
         # always check for expected_exceptions in kws
         expected_exceptions = f.as_list(kw.pop('expected_exceptions', []))
 
-        _func = functools.partial(func, *args, **kw)
-
         try:
-            return _func()
-
+            return self.retry(func, *args, expected_exceptions=expected_exceptions, **kw)
+        except er.DatabaseUnavailableError:
+            raise
         except Exception as e:
-            # pyodbc.Error raised as generic sqlalchemy.exc.DBAPIError
-
             # allow not suppressing exception
-            if type(e) in expected_exceptions:
+            if isinstance(e, tuple(expected_exceptions)):
                 raise e
-            else:
-                log.warning(f'type e: {type(e)}')
-                if isinstance(e, exc.DBAPIError):
-                    log.warning(f'_message: {e._message}')
 
-            log.warning(f'Failed db func (retrying): {func}, {e}')
-            self.reset()
+            # pyodbc.Error raised as generic sqlalchemy.exc.DBAPIError
+            if isinstance(e, exc.DBAPIError):
+                log.warning(f'_message: {e._message}')
 
-            # try one more time after reset
-            try:
-                return _func()
-            except Exception as e:
-                fail_msg = f'Failed db func: {func}\n\targs: {args}, kw: {kw}\n\troot error: {str(e)}'
-                raise er.SMSDatabaseError(fail_msg) from e
+            self.rollback()
+            fail_msg = f'Failed db func: {func}\n\targs: {args}, kw: {kw}\n\troot error: {str(e)}'
+            raise er.SMSDatabaseError(fail_msg) from e
 
     def safe_execute(self, sql: str, **kw) -> None:
         """Convenience wrapper for session.execute
@@ -310,7 +484,7 @@ class DB(object):
 
     @property
     def engine(self):
-        self.check_internet()
+        self.breaker.check()  # fail fast if db recently unreachable
 
         if self._engine is None:
             self._engine = _create_engine()
@@ -351,17 +525,18 @@ class DB(object):
 
     @property
     def session(self) -> Session:
-        self.check_internet()  # need to call every time in case using _session
+        """Session for current thread (scoped_session registry), each thread checks out its own connection"""
+        self.breaker.check()  # need to call every time in case using _session
         if self._session is None:
             try:
-                # create session, this is for the ORM part of sqlalchemy
-                self._session = sessionmaker(bind=self.engine)()
+                # create session registry, this is for the ORM part of sqlalchemy
+                self._session = scoped_session(sessionmaker(bind=self.engine))
                 # TODO wrap session methods to retry?
 
             except Exception as e:
                 raise er.SMSDatabaseError('Couldn\'t create session.') from e
 
-        return self._session
+        return self._session()
 
     @er.errlog('Error closing raw_connection')
     def close(self):
@@ -385,8 +560,109 @@ class DB(object):
         self.session.add(row)
         return self.safe_commit()
 
-    def read_query(self, q):
-        return pd.read_sql(sql=q.get_sql(), con=self.engine)
+    def read_sql(self, sql: str, params: list = None, backend: str = None, source: str = 'read_sql') -> pd.DataFrame:
+        """Read sql to df with pd.read_sql or columnar arrow backend
+        - parameterised queries are executed on cached prepared cursors (one per sql shape)
+        - transient connection errors are retried with backoff
+
+        Parameters
+        ----------
+        sql : str
+        params : list, optional
+            query parameters, default None
+        backend : str, optional
+            pandas | arrow, default self.fetch_backend
+        source : str, optional
+            query class/caller name for query_stats, default 'read_sql'
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        with query_stats.timer(source=source, sql=sql) as m:
+            m['result'] = self.retry(self._read_sql, sql=sql, params=params, backend=backend)
+
+        return m['result']
+
+    def _read_sql(self, sql: str, params: list = None, backend: str = None) -> pd.DataFrame:
+        from guesttracker.utils import fetch
+        backend = backend or self.fetch_backend
+
+        if params:
+            return self.stmt_cache.read_df(sql=sql, params=params, backend=backend)
+
+        if backend == 'pandas':
+            return pd.read_sql(sql=sql, con=self.engine)
+
+        conn = self.conn
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(self.translate_sql(sql), *([params] if params else []))
+            return fetch.read_cursor(cursor=cursor, backend=backend)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def read_query(self, q, backend: str = None, source: str = 'read_query') -> pd.DataFrame:
+        sql, params = get_sql_params(q)
+        return self.read_sql(sql=sql, params=params, backend=backend, source=source)
+
+    def iter_sql(
+            self,
+            sql: str,
+            chunksize: int = 50000,
+            params: list = None,
+            backend: str = None,
+            source: str = 'iter_sql') -> Iterator[pd.DataFrame]:
+        """Execute sql on raw connection and yield results in chunks of max chunksize rows
+        - connection is held until generator is exhausted or closed
+        - transient errors executing the query are retried with backoff, errors once rows are yielded are raised
+        - recorded in query_stats once generator is exhausted or closed, with total rows
+
+        Parameters
+        ----------
+        sql : str
+        chunksize : int, optional
+            default 50000
+        params : list, optional
+            query parameters, default None
+        backend : str, optional
+            pandas | arrow, default self.fetch_backend
+        source : str, optional
+            query class/caller name for query_stats, default 'iter_sql'
+
+        Yields
+        ------
+        Iterator[pd.DataFrame]
+        """
+        from guesttracker.utils import fetch
+
+        with query_stats.timer(source=source, sql=sql) as m:
+            m['rows'] = 0
+            conn, cursor = self.retry(self._execute_cursor, sql=sql, params=params)
+
+            try:
+                for df in fetch.iter_cursor(cursor=cursor, chunksize=chunksize, backend=backend or self.fetch_backend):
+                    m['rows'] += len(df)
+                    yield df
+            finally:
+                cursor.close()
+                conn.close()
+
+    def _execute_cursor(self, sql: str, params: list = None) -> Tuple[Any, Any]:
+        """Execute sql on new raw connection, return (conn, cursor) for caller to fetch from and close"""
+        conn = self.conn
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(self.translate_sql(sql), *([params] if params else []))
+        except Exception:
+            cursor.close()
+            conn.close()
+            raise
+
+        return conn, cursor
 
     def get_smr(self, unit: str, date: dt) -> int:
         """Get smr for unit on specific date from db
@@ -402,8 +678,8 @@ class DB(object):
         """
         a = T('UnitSMR')
         q = Query().from_(a).select('SMR') \
-            .where(a.DateSMR == date) \
-            .where(a.Unit == unit)
+            .where(a.DateSMR == Param(date)) \
+            .where(a.Unit == Param(unit))
         return self.query_single_val(q)
 
     def get_smr_prev_co(self, unit: str, date: dt, floc: str) -> int:
@@ -424,24 +700,100 @@ class DB(object):
         """
         a = T('EventLog')
         q = Query().from_(a).select(a.SMR) \
-            .where(a.Unit == unit) \
-            .where(a.DateAdded <= date) \
-            .where(a.Floc == floc) \
+            .where(a.Unit == Param(unit)) \
+            .where(a.DateAdded <= Param(date)) \
+            .where(a.Floc == Param(floc)) \
             .orderby(a.DateAdded, order=Order.desc)
 
         return self.query_single_val(q)
 
+    def translate_sql(self, sql: str) -> str:
+        """Translate mssql syntax for raw cursor execution on local sqlite backend
+        - sqlalchemy executions are translated by engine event
+        """
+        if self.backend == 'sqlite':
+            from guesttracker.utils.localdb import translate_sql
+            return translate_sql(sql)
+
+        return sql
+
+    def get_table_stamp(self, tables: List[str]) -> Stamp:
+        """Get cheap version stamp (row count + checksum) for tables in a single round trip
+        - sqlite has no table checksum, uses row count + max rowid (in-place updates only caught by ttl)
+
+        Parameters
+        ----------
+        tables : List[str]
+
+        Returns
+        -------
+        Stamp
+            tuple of (table, row_count, checksum) per table
+        """
+        if self.backend == 'sqlite':
+            sql = ' UNION ALL '.join(
+                f"SELECT '{t}', COUNT(*), IFNULL(MAX(rowid), 0) FROM [{t}]" for t in tables)
+        else:
+            sql = ' UNION ALL '.join(
+                f"SELECT '{t}', COUNT_BIG(*), CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM [{t}]" for t in tables)
+
+        conn = self.conn
+        cursor = conn.cursor()
+
+        try:
+            rows = cursor.execute(sql).fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+        return tuple(sorted(tuple(row) for row in rows))
+
+    def load_snapshots(self) -> List[str]:
+        """Load reference tables saved to disk from previous session
+        - Called at startup so first lookups don't block on db
+        - Must call revalidate_snapshots after (in worker thread) to refresh any which are out of date
+        """
+        return self.cache.load_snapshots()
+
+    def revalidate_snapshots(self) -> List[str]:
+        """Check snapshot tables against db version stamps and reload any which have changed
+
+        Returns
+        -------
+        List[str]
+            names of tables reloaded
+        """
+        loaders = dict(
+            units=self.get_df_unit,
+            equiptype=self.get_df_equiptype,
+            customers=self.get_df_customers,
+            component=self.get_df_component)
+
+        stale = self.cache.stale_entries(names=self.cache.snapshot_names)
+
+        for name in stale:
+            loaders[name]()
+
+        log.info(f'Reloaded stale snapshots: {stale}')
+        return stale
+
     def get_df_saved(self, name: str, force: bool = False, **kw) -> Union[pd.DataFrame, None]:
-        """Return df from saved cache"""
-        # TODO load if doesn't exist?
-        if force:
-            return None
+        """Return df from saved cache, None if not loaded or db table has changed"""
+        return self.cache.get(name=name, force=force)
 
-        return self.dfs.get(name, None)
+    def save_df(self, df: Union[pd.DataFrame, List[str]], name: str, **kw) -> None:
+        """Save dataframe (or list) to cache
 
-    def save_df(self, df: Union[pd.DataFrame, List[str]], name: str) -> None:
-        """Save dataframe (or list) to cache"""
-        self.dfs[name] = df
+        Parameters
+        ----------
+        df : Union[pd.DataFrame, List[str]]
+        name : str
+        tables : Union[str, List[str]], optional
+            db tables df depends on, default registered tables
+        ttl : Union[float, None], optional
+            seconds before cached df is revalidated
+        """
+        self.cache.put(name=name, data=df, **kw)
 
     def fix_customer_units(self, df: pd.DataFrame, col: str = 'unit') -> pd.DataFrame:
         """Replace Suncor's leading zeros in unit columnm
@@ -475,23 +827,34 @@ class DB(object):
         Union[str, pd.DataFrame, None]
             single val or horizontal df of all vals with index dropped
         """
-        df = self.get_df_unit()
+        idx = self.unit_index
+        i = idx.by_unit.get(unit.strip(), None)
 
         try:
-            df = df.loc[unit.strip(), field]
+            if i is None:
+                raise KeyError(unit)
 
             if isinstance(field, list):
-                df = df.to_frame().T.reset_index(drop=True)
+                return idx.df.iloc[[i]][field].reset_index(drop=True)
 
-            return df
+            return idx.df.iloc[i][field]
         except KeyError:
             log.warning(f'Couldn\'t get value "{field}" for unit "{unit}" in unit table.')
             return None
 
+    @property
+    def unit_index(self) -> UnitIndex:
+        """Hash indexes of unit table, rebuilt if unit cache has been reloaded"""
+        df = self.get_df_unit(active_only=False)
+
+        if self._unit_index is None or not self._unit_index.is_current(df):
+            self._unit_index = UnitIndex(df=df)
+
+        return self._unit_index
+
     def unit_exists(self, unit: str) -> bool:
         """Checck if unit exists in database"""
-        df = self.get_df_unit()
-        return unit in df.Unit
+        return self.unit_index.unit_exists(unit)
 
     def units_not_in_db(self, units: list):
         """Check list of units in db
@@ -500,9 +863,12 @@ class DB(object):
         list
             list of units not in db
         """
-        df = self.get_df_unit()
-        lst = df[df.Unit.isin(units)].Unit.to_list()
-        return list(set(units) - set(lst))
+        idx = self.unit_index
+        return [unit for unit in set(units) if not idx.unit_exists(unit)]
+
+    def units_minesite(self, minesite: str) -> List[str]:
+        """Get list of active units for minesite"""
+        return self.unit_index.units_minesite(minesite)
 
     def unit_from_serial(
             self,
@@ -525,23 +891,10 @@ class DB(object):
         Union[str, None]
             unit if matched, else None
         """
-        unit = None
-
-        df = self.get_df_unit() \
-            .query('Serial == @serial')
-
         if not model is None:
             model = model.replace("'", '')
-            df = df.query('Model.str.contains(@model)')
 
-        if not minesite is None:
-            df = df.query('MineSite.str.contains(@minesite)')
-
-        # unit found
-        if df.shape[0] == 1:
-            unit = df.iloc[0, df.columns.get_loc('Unit')]
-
-        return unit
+        return self.unit_index.unit_from_serial(serial=serial, model=model, minesite=minesite)
 
     def get_modelbase(self, model: str) -> Union[str, None]:
         """Get model base from model"""
@@ -552,15 +905,19 @@ class DB(object):
             # model not in database
             return None
 
-    def get_df_equiptype(self):
-        if not hasattr(self, 'df_equiptype') or self.df_equiptype is None:
-            self.set_df_equiptype()
+    def get_df_equiptype(self, force: bool = False) -> pd.DataFrame:
+        name = 'equiptype'
+        df = self.get_df_saved(name, force=force)
 
-        return self.df_equiptype
+        if df is None:
+            df = self.set_df_equiptype()
+            self.save_df(df, name)
+
+        return df
 
-    def unique_units(self, **kw):
-        df = self.get_df_unit(**kw)
-        return df.Unit.unique()
+    def unique_units(self, minesite: str = None, model: str = None, **kw) -> List[str]:
+        """Get list of unique active units, optionally filtered to minesite and partial model match"""
+        return self.unit_index.units_minesite(minesite=minesite, model=model)
 
     def filter_database_units(self, df: pd.DataFrame, col: str = 'Unit') -> pd.DataFrame:
         """Filter dataframe to only units in database
@@ -579,9 +936,9 @@ class DB(object):
 
     def get_df_emaillist(self, force=False):
         name = 'emaillist'
-        df = self.get_df_saved(name)
+        df = self.get_df_saved(name, force=force)
 
-        if df is None or force:
+        if df is None:
             from guesttracker.queries import EmailList
             query = EmailList()
             df = query.get_df()
@@ -646,9 +1003,9 @@ class DB(object):
 
     def get_df_parts(self, force: bool = False) -> pd.DataFrame:
         name = 'parts'
-        df = self.get_df_saved(name)
+        df = self.get_df_saved(name, force=force)
 
-        if df is None or force:
+        if df is None:
             from guesttracker.queries.misc import Parts
             query = Parts()
             df = query.get_df()
@@ -656,9 +1013,9 @@ class DB(object):
 
         return df
 
-    def get_df_customers(self) -> pd.DataFrame:
+    def get_df_customers(self, force: bool = False) -> pd.DataFrame:
         name = 'customers'
-        df = self.get_df_saved(name)
+        df = self.get_df_saved(name, force=force)
 
         if df is None:
             from guesttracker.queries.hba import HBAQueryBase
@@ -704,34 +1061,97 @@ class DB(object):
 
         return df
 
+    def q_reservation_units(self) -> 'QueryBuilder':
+        """Query for non-cancelled reservations' units and dates, from ReservationUnits junction table"""
+        a, b, c = pk.Tables('ReservationUnits', 'Units', 'Reservations')
+
+        return Query.from_(a) \
+            .select(b.abbr.as_('unit'), a.reservation_id, a.arrival_date, a.departure_date) \
+            .inner_join(b).on(a.unit_id == b.uid) \
+            .inner_join(c).on(a.reservation_id == c.uid) \
+            .where(c.cancel_date.isnull())
+
+    def get_df_reservations_split(self) -> pd.DataFrame:
+        """Non-cancelled reservations with one row per unit, split from Reservations.unit_assignments
+        - fallback before ReservationUnits is migrated, same cols as q_reservation_units
+        """
+        from guesttracker.data import reservations as rs
+
+        a = T('Reservations')
+        q = Query.from_(a) \
+            .select(a.uid, a.unit_assignments, a.arrival_date, a.departure_date) \
+            .where(a.cancel_date.isnull())
+
+        return self.read_query(q=q, source='reservations') \
+            .pipe(rs.split_reservations)
+
     def get_df_reservations(self, **kw) -> pd.DataFrame:
+        """Return df of all non-cancelled reservations with one row per reserved unit"""
+        from guesttracker.data import reservations as rs
         name = 'reservations'
         df = self.get_df_saved(name, **kw)
 
         if df is None:
-            # from guesttracker.queries.hba import HBAQueryBase
-            # query = HBAQueryBase(name='Reservations')
-
-            a = pk.Table('Reservations')
-            q = Query.from_(a) \
-                .select(a.unit_assignments, a.arrival_date, a.departure_date, a.cancel_date)
-
-            df = pd.read_sql(sql=q.get_sql(), con=db.engine) \
-                .pipe(lambda df: df[df.cancel_date.isna()]) \
-                .assign(unit_assignments=lambda x: x.unit_assignments.str.split(',')).explode('unit_assignments') \
-                .rename(columns=dict(unit_assignments='unit')) \
-                .reset_index(drop=True)
+            if rs.is_migrated():
+                df = self.read_query(q=self.q_reservation_units(), source='reservations') \
+                    .reset_index(drop=True)
+            else:
+                df = self.get_df_reservations_split()
 
             self.save_df(df, name)
 
         return df
 
-    def set_df_equiptype(self):
+    def get_reserved_units(self, d_lower: dt, d_upper: dt, exclude_uid: str = None) -> pd.DataFrame:
+        """Return units with a non-cancelled reservation overlapping nights [d_lower, d_upper)
+        - indexed range query on ReservationUnits, doesn't load all reservations (unless not migrated yet)
+        - compares by day (same as AvailabilityIndex), so departure and arrival on same day don't conflict
+
+        Parameters
+        ----------
+        d_lower : dt
+            arrival date
+        d_upper : dt
+            departure date
+        exclude_uid : str, optional
+            reservation to ignore (eg when editing it), default None
+
+        Returns
+        -------
+        pd.DataFrame
+            df with cols unit, reservation_id, arrival_date, departure_date
+        """
+        from guesttracker.data import reservations as rs
+
+        a = T('ReservationUnits')
+        d_lower, d_upper = pd.Timestamp(d_lower).normalize(), pd.Timestamp(d_upper).normalize()
+
+        if not rs.is_migrated():
+            df = self.get_df_reservations_split()
+            mask = (df.arrival_date < d_upper) & (df.departure_date >= d_lower + delta(days=1))
+            if not exclude_uid is None:
+                mask &= df.reservation_id != exclude_uid
+
+            return df[mask].reset_index(drop=True)
+
+        # stay's first night < d_upper and last night >= d_lower
+        q = self.q_reservation_units() \
+            .where(a.arrival_date < Param(d_upper.to_pydatetime())) \
+            .where(a.departure_date >= Param((d_lower + delta(days=1)).to_pydatetime()))
+
+        if not exclude_uid is None:
+            q = q.where(a.reservation_id != Param(exclude_uid))
+
+        return self.read_query(q=q, source='reserved_units')
+
+    def set_df_equiptype(self) -> pd.DataFrame:
         a = T('EquipType')
         q = Query().from_(a).select(a.star)
-        self.df_equiptype = pd.read_sql(sql=q.get_sql(), con=self.engine) \
+        self.df_equiptype = self.read_query(q=q) \
             .set_index('Model', drop=False)
 
+        return self.df_equiptype
+
     def get_df_fc(
             self,
             minesite: Union[str, None] = None,
@@ -782,9 +1202,9 @@ class DB(object):
         df[target] = df[cols].apply(
             lambda x: f'{x[0]}{sep}{x[1]}' if not x[1] is None else x[0], axis=1)
 
-    def get_df_component(self):
+    def get_df_component(self, force: bool = False) -> pd.DataFrame:
         name = 'component'
-        df = self.get_df_saved(name)
+        df = self.get_df_saved(name, force=force)
 
         if df is None:
             a = T('ComponentType')
@@ -849,121 +1269,94 @@ class DB(object):
         return df
 
     @er.errlog('Failed to import dataframe')
-    def import_df(
-            self,
-            df: pd.DataFrame,
-            imptable: str,
-            impfunc: str,
-            notification: bool = True,
-            prnt: bool = False,
-            chunksize: int = None,
-            index: bool = False,
-            if_exists: str = 'append',
-            import_name: str = None) -> Union[int, None]:
-
-        rowsadded = 0
-        if df is None or len(df) == 0:
-            if imptable == 'temp_import' and not import_name is None:
-                imptable = import_name
-            log.warning(f'No rows to import to: {imptable}')
-
-            fmt = '%Y-%m-%d %H:%M'
-            if notification:
-                f.discord(
-                    msg=f'{dt.now().strftime(fmt)} - {imptable}: No rows to import',
-                    channel='sms')
-
-            return
-
-        df.to_sql(
-            name=imptable,
-            con=self.engine,
-            if_exists=if_exists,
-            index=index,
-            chunksize=chunksize)
-
-        cursor = self.cursor
-        rowsadded = cursor.execute(impfunc).rowcount
-        cursor.commit()
-
-        import_name = import_name or imptable
-        msg = f'{import_name}: {rowsadded}'
-        if prnt:
-            log.info(msg)
-
-        if notification:
-            f.discord(msg=msg, channel='sms')
-
-        return rowsadded
-
     def insert_update(
             self,
             a: str,
-            df: pd.DataFrame,
+            df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
             join_cols: list = None,
-            b: str = 'temp_import',
+            when_matched: str = 'ignore',
+            when_not_matched: str = 'insert',
+            chunksize: int = None,
+            notification: bool = True,
+            prnt: bool = False,
             **kw) -> int:
-        """Insert values from df into temp update table b and merge to a
+        """Merge values from df into table a with dbt.BulkUpsert
 
         Parameters
         ----------
         a : str
             insert into table
-        b : str
-            select from table (temp table)
-        join_cols : str
-            colums to join a/b on
-        df : pd.DataFrame
+        df : Union[pd.DataFrame, Iterable[pd.DataFrame]]
+            df, or iterable of dfs to stream in chunks
+        join_cols : list
+            colums to match existing rows on, default table's primary keys
+        when_matched : str, optional
+            ignore | update existing rows, default 'ignore'
+        when_not_matched : str, optional
+            insert | ignore new rows, default 'insert'
+        chunksize : int, optional
+            max rows per merge, default 10000
 
         Returns
         -------
         int
-            rows added
+            rows added (inserted + updated), None if import failed (error logged)
         """
-        if b == 'temp_import':
-            kw['if_exists'] = 'replace'
+        from guesttracker import dbtransaction as dbt
 
         if join_cols is None:
-            from guesttracker import dbtransaction as dbt
             join_cols = dbt.get_dbtable_keys(dbtable=a)
 
-        imptable = b
-
-        # drop duplicates
-        if not df is None and len(df) > 0:
+        if df is None:
+            df = pd.DataFrame()
 
+        def _subset(df: pd.DataFrame) -> list:
             # sometimes df will have been converted to lower cols
             join_cols_lower = [c.lower() for c in join_cols]
-            subset = join_cols if not all(c in df.columns for c in join_cols_lower) else join_cols_lower
+            return join_cols if not all(c in df.columns for c in join_cols_lower) else join_cols_lower
 
-            df = df \
-                .drop_duplicates(subset=subset, keep='first')
+        def _dedupe(df: pd.DataFrame) -> pd.DataFrame:
+            return df.drop_duplicates(subset=_subset(df), keep='first')
 
-            a, b = pk.Tables(a, b)
-            cols = df.columns
+        if isinstance(df, pd.DataFrame):
+            if len(df) == 0:
+                log.warning(f'No rows to import to: {a}')
 
-            # this builds an import function from scratch, replaces stored proceedures
-            q = Query.into(a) \
-                .columns(*cols) \
-                .from_(b) \
-                .left_join(a).on_field(*join_cols) \
-                .select(*cols) \
-                .where(a.field(join_cols[0]).isnull())
-        else:
-            q = ''
+                if notification:
+                    fmt = '%Y-%m-%d %H:%M'
+                    f.discord(msg=f'{dt.now().strftime(fmt)} - {a}: No rows to import', channel='sms')
 
-        rowsadded = self.import_df(df=df, imptable=imptable, impfunc=str(q), import_name=a, **kw)
-        # self.cursor.execute(f'TRUNCATE TABLE {b};')
-        self.cursor.execute(f'DROP TABLE {b};')
-        self.cursor.commit()
+                return 0
 
+            df = _dedupe(df)
+            join_cols = _subset(df)
+        else:
+            # MERGE fails on duplicate source keys, dedupe each streamed df (later dfs match earlier chunks)
+            df = (_dedupe(_df) for _df in df if not _df is None)
+
+        result = dbt.BulkUpsert(
+            table=a,
+            keys=join_cols,
+            when_matched=when_matched,
+            when_not_matched=when_not_matched,
+            chunksize=chunksize or 10000) \
+            .upsert(data=df)
+
+        rowsadded = result['inserted'] + result['updated']
         msg = f'{a}: {rowsadded}'
+        if result['updated']:
+            msg += f' (inserted: {result["inserted"]}, updated: {result["updated"]})'
+
         log.info(msg)
 
+        if notification:
+            f.discord(msg=msg, channel='sms')
+
         return rowsadded
 
     def query_single_val(self, q: Query) -> Any:
         """Query single val from db
+        - query values wrapped in Param are sent as parameters on a cached prepared cursor
 
         Parameters
         ----------
@@ -973,7 +1366,11 @@ class DB(object):
         -------
         Any
         """
-        return self.cursor.execute(q.get_sql()).fetchval()
+        sql, params = get_sql_params(q)
+
+        with query_stats.timer(source='query_single_val', sql=sql) as m:
+            m['rows'] = 1
+            return self.retry(self.stmt_cache.fetchval, sql=sql, params=params)
 
     def max_date_db(self, table=None, field=None, q=None, join_minesite=True, minesite='FortHills'):
         a = T(table)
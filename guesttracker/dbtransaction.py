@@ -3,15 +3,18 @@ from typing import *
 import pandas as pd
 import sqlalchemy as sa
 from sqlalchemy import and_, literal
+from sqlalchemy.dialects import mssql
 from sqlalchemy.dialects.mssql.base import DATETIME2
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.query import Query as SQLAQuery
 from sqlalchemy.sql.sqltypes import BigInteger, Boolean, Float, String
 
+from guesttracker import errors as er
 from guesttracker import functions as f
 from guesttracker import getlog
 from guesttracker.database import db
 from guesttracker.utils import dbmodel as dbm
+from guesttracker.utils.querystats import query_stats
 
 if TYPE_CHECKING:
     from sqlalchemy.orm.decl_api import DeclarativeMeta
@@ -130,7 +133,10 @@ class DBTransaction():
         txn_func = getattr(db.session, f'bulk_{operation_type}_mappings')
         # txn_func(self.dbtable, self.update_items)
 
-        db.safe_func(txn_func, self.dbtable, self.update_items)
+        sql = f'bulk_{operation_type} {self.dbtable.__tablename__}'
+        with query_stats.timer(source='DBTransaction.update_all', sql=sql) as m:
+            db.safe_func(txn_func, self.dbtable, self.update_items)
+            m['rows'] = len(self.update_items)
 
         num_recs = len(self.update_items)
         if num_recs == 0:
@@ -152,6 +158,281 @@ class DBTransaction():
         return self
 
 
+class BulkUpsert():
+    """Bulk insert/update df to db table with a single server-side MERGE per chunk
+    - rows are staged in a session-scoped #temp table with the target table's column types
+    - all operations use the same raw connection so the #temp table is visible to MERGE
+    """
+
+    how_matched = ('ignore', 'update')
+    how_not_matched = ('ignore', 'insert')
+
+    def __init__(
+            self,
+            table: str,
+            keys: List[str] = None,
+            when_matched: str = 'ignore',
+            when_not_matched: str = 'insert',
+            update_cols: List[str] = None,
+            chunksize: int = 10000):
+        """
+        Parameters
+        ----------
+        table : str
+            target table name
+        keys : List[str], optional
+            cols to match source/target rows on, default target table's primary keys
+        when_matched : str, optional
+            ignore | update existing rows, default 'ignore'
+        when_not_matched : str, optional
+            insert | ignore new rows, default 'insert'
+        update_cols : List[str], optional
+            cols to update when matched, default all non-key cols
+        chunksize : int, optional
+            max rows staged/merged per round trip, default 10000
+
+        Raises
+        ------
+        ValueError
+            if when_matched/when_not_matched not valid, or both are 'ignore'
+        """
+        if not when_matched in self.how_matched:
+            raise ValueError(f'when_matched must be in {self.how_matched}, not "{when_matched}"')
+
+        if not when_not_matched in self.how_not_matched:
+            raise ValueError(f'when_not_matched must be in {self.how_not_matched}, not "{when_not_matched}"')
+
+        if when_matched == 'ignore' and when_not_matched == 'ignore':
+            raise ValueError('MERGE needs at least one of update or insert.')
+
+        if keys is None:
+            keys = get_dbtable_keys(dbtable=table)
+
+        model = getattr(dbm, table, None)  # type: Union[DeclarativeMeta, None]
+        temp_table = f'#stage_{table}'
+        result = dict(inserted=0, updated=0, rows=0, chunks=0)
+        f.set_self(vars())
+
+    def get_col_types(self, cols: List[str]) -> Union[Dict[str, str], None]:
+        """Get exact sql column types from dbmodel, None if table not in dbmodel"""
+        if self.model is None:
+            return None
+
+        dialect = mssql.dialect()
+        m_cols = {c.name.lower(): c for c in self.model.__table__.columns}
+        missing = [c for c in cols if not c.lower() in m_cols]
+        if missing:
+            raise ValueError(f'Columns not in table "{self.table}": {missing}')
+
+        return {c: m_cols[c.lower()].type.compile(dialect=dialect) for c in cols}
+
+    def create_temp_sql(self, cols: List[str]) -> str:
+        """Create empty #temp table with target table's col types
+        - uses dbmodel types if available, else copies types from target table on server
+        """
+        t = self.temp_table
+        sql = f"IF OBJECT_ID('tempdb..{t}') IS NOT NULL DROP TABLE {t};\n"
+        m_types = self.get_col_types(cols=cols)
+
+        if not m_types is None:
+            col_defs = ', '.join(f'[{c}] {_type} NULL' for c, _type in m_types.items())
+            return sql + f'CREATE TABLE {t} ({col_defs});'
+        else:
+            select_cols = ', '.join(f'[{c}]' for c in cols)
+            return sql + f'SELECT TOP 0 {select_cols} INTO {t} FROM [{self.table}];'
+
+    def merge_sql(self, cols: List[str]) -> str:
+        """Build MERGE statement from #temp table to target, returning inserted/updated counts"""
+        keys = [c for c in cols if c.lower() in [k.lower() for k in self.keys]]
+        if not len(keys) == len(self.keys):
+            raise ValueError(f'All keys {self.keys} must be in df cols.')
+
+        update_cols = self.update_cols or [c for c in cols if not c in keys]
+        on = ' AND '.join(f't.[{c}] = s.[{c}]' for c in keys)
+
+        clauses = []
+        if self.when_matched == 'update' and update_cols:
+            set_cols = ', '.join(f't.[{c}] = s.[{c}]' for c in update_cols)
+            clauses.append(f'WHEN MATCHED THEN UPDATE SET {set_cols}')
+
+        if self.when_not_matched == 'insert':
+            insert_cols = ', '.join(f'[{c}]' for c in cols)
+            values = ', '.join(f's.[{c}]' for c in cols)
+            clauses.append(f'WHEN NOT MATCHED BY TARGET THEN INSERT ({insert_cols}) VALUES ({values})')
+
+        clauses = '\n'.join(clauses)
+
+        return f"""
+            SET NOCOUNT ON;
+            DECLARE @actions TABLE (action NVARCHAR(10));
+            MERGE [{self.table}] WITH (HOLDLOCK) AS t
+            USING {self.temp_table} AS s
+            ON {on}
+            {clauses}
+            OUTPUT $action INTO @actions;
+            SELECT
+                ISNULL(SUM(CASE WHEN action = 'INSERT' THEN 1 ELSE 0 END), 0),
+                ISNULL(SUM(CASE WHEN action = 'UPDATE' THEN 1 ELSE 0 END), 0)
+            FROM @actions;"""
+
+    def iter_chunks(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+        """Yield bounded chunks from single df or iterable of dfs"""
+        if isinstance(data, pd.DataFrame):
+            data = [data]
+
+        for df in data:
+            for i in range(0, len(df), self.chunksize):
+                yield df.iloc[i: i + self.chunksize]
+
+    def upsert(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> Dict[str, int]:
+        """Stage and merge all rows to target table, committing after each chunk
+
+        Parameters
+        ----------
+        data : Union[pd.DataFrame, Iterable[pd.DataFrame]]
+            single df, or iterable/generator of dfs with same cols
+
+        Returns
+        -------
+        Dict[str, int]
+            counts of inserted, updated, rows, chunks
+        """
+        if db.backend == 'sqlite':
+            return self.upsert_sqlite(data=data)
+
+        conn = db.conn
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        cols = None
+
+        try:
+            for df in self.iter_chunks(data):
+                if len(df) == 0:
+                    continue
+
+                if cols is None:
+                    cols = df.columns.tolist()
+                    cursor.execute(self.create_temp_sql(cols=cols))
+                    sql_merge = self.merge_sql(cols=cols)
+                    sql_stage = 'INSERT INTO {} ({}) VALUES ({})'.format(
+                        self.temp_table,
+                        ', '.join(f'[{c}]' for c in cols),
+                        ', '.join('?' * len(cols)))
+                else:
+                    cursor.execute(f'TRUNCATE TABLE {self.temp_table};')
+
+                with query_stats.timer(source='BulkUpsert', sql=sql_merge) as m_stats:
+                    # convert numpy types to python objects, nan to None
+                    rows = list(
+                        df[cols].astype(object).where(df[cols].notna(), None).itertuples(index=False, name=None))
+                    cursor.executemany(sql_stage, rows)
+
+                    inserted, updated = cursor.execute(sql_merge).fetchone()
+                    conn.commit()
+                    m_stats['rows'] = len(df)
+
+                m = self.result
+                m['inserted'] += inserted
+                m['updated'] += updated
+                m['rows'] += len(df)
+                m['chunks'] += 1
+
+            if not cols is None:
+                cursor.execute(f'DROP TABLE {self.temp_table};')
+                conn.commit()
+
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()  # return connection to pool
+
+        log.info(f'{self.table}: {self.result}')
+        return self.result
+
+    def upsert_sql_sqlite(self, cols: List[str]) -> Tuple[str, List[str]]:
+        """Build sqlite INSERT .. ON CONFLICT (or UPDATE if not inserting) statement
+        - NOTE keys must be the table's primary key or have a unique index
+
+        Returns
+        -------
+        Tuple[str, List[str]]
+            sql, df cols in param order
+        """
+        keys = [c for c in cols if c.lower() in [k.lower() for k in self.keys]]
+        if not len(keys) == len(self.keys):
+            raise ValueError(f'All keys {self.keys} must be in df cols.')
+
+        update_cols = self.update_cols or [c for c in cols if not c in keys]
+        set_cols = ', '.join(f'[{c}] = excluded.[{c}]' for c in update_cols)
+
+        if self.when_not_matched == 'ignore':
+            set_cols = ', '.join(f'[{c}] = ?' for c in update_cols)
+            where = ' AND '.join(f'[{c}] = ?' for c in keys)
+            return f'UPDATE [{self.table}] SET {set_cols} WHERE {where}', update_cols + keys
+
+        if self.when_matched == 'update' and update_cols:
+            action = f'DO UPDATE SET {set_cols}'
+        else:
+            action = 'DO NOTHING'
+
+        sql = 'INSERT INTO [{}] ({}) VALUES ({}) ON CONFLICT ({}) {}'.format(
+            self.table,
+            ', '.join(f'[{c}]' for c in cols),
+            ', '.join('?' * len(cols)),
+            ', '.join(f'[{c}]' for c in keys),
+            action)
+
+        return sql, cols
+
+    def upsert_sqlite(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> Dict[str, int]:
+        """Local sqlite backend version of upsert, no #temp table/MERGE
+        - inserted = change in row count, updated = remaining changed rows
+        """
+        conn = db.conn
+        cursor = conn.cursor()
+        sql, param_cols = None, None
+
+        def _count() -> int:
+            return cursor.execute(f'SELECT COUNT(*) FROM [{self.table}]').fetchone()[0]
+
+        try:
+            for df in self.iter_chunks(data):
+                if len(df) == 0:
+                    continue
+
+                if sql is None:
+                    sql, param_cols = self.upsert_sql_sqlite(cols=df.columns.tolist())
+
+                with query_stats.timer(source='BulkUpsert', sql=sql) as m_stats:
+                    n_before, changes_before = _count(), conn.total_changes
+
+                    rows = list(
+                        df[param_cols].astype(object).where(df[param_cols].notna(), None)
+                        .itertuples(index=False, name=None))
+                    cursor.executemany(sql, rows)
+                    conn.commit()
+                    m_stats['rows'] = len(df)
+
+                inserted = _count() - n_before
+                m = self.result
+                m['inserted'] += inserted
+                m['updated'] += conn.total_changes - changes_before - inserted
+                m['rows'] += len(df)
+                m['chunks'] += 1
+
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+        log.info(f'{self.table}: {self.result}')
+        return self.result
+
+
 class Row():
     def __init__(
             self,
@@ -246,21 +527,36 @@ class Row():
         else:
             sql = sa.delete(t).where(and_(*cond))  # kinda sketch to even have this here..
 
-        if not check_exists:
-            db.safe_execute(sql)
-        else:
-            # Check if row exists, if not > create new row object, update it, add to session, commit
-            q = session.query(t).filter(and_(*cond))
-            func = session.query(literal(True)).filter(q.exists()).scalar
-            exists = db.safe_func(func)
-
-            if not exists:
-                e = t(**keys, **vals)
-                session.add(e)
-            else:
-                db.safe_execute(sql)
+        with query_stats.timer(source='Row.update', sql=sql) as m:
+            m['rows'] = 1
 
-        return db.safe_commit()  # True if transaction succeeded
+            if not check_exists:
+                db.safe_execute(sql)
+            else:
+                # Check if row exists, if not > create new row object, update it, add to session, commit
+                q = session.query(t).filter(and_(*cond))
+                func = session.query(literal(True)).filter(q.exists()).scalar
+                exists = db.safe_func(func)
+
+                if not exists:
+                    e = t(**keys, **vals)
+                    session.add(e)
+                else:
+                    db.safe_execute(sql)
+
+            # keep ReservationUnits junction rows in sync with edited unit_assignments/dates, same transaction
+            if not delete and t is dbm.Reservations:
+                from guesttracker.data import reservations as rs
+                if set(vals) & set(rs.SYNC_COLS) and rs.is_migrated():
+                    try:
+                        rs.stage_units(uids=keys['uid'], session=session)
+                    except Exception as e:
+                        msg = 'Failed to update ReservationUnits, edit not saved'
+                        er.log_error(msg=msg, exc=e, log=log, display=True)
+                        db.rollback()
+                        return False
+
+            return db.safe_commit()  # True if transaction succeeded
 
     def create_model_from_db(self) -> SQLAQuery:
         """Query sqalchemy orm session using model eg dbo.EventLog, and keys eg {UID=123456789}
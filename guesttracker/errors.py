@@ -493,6 +493,20 @@ class NoInternetError(ExpectedError):
         self.update_statusbar(msg=msg)
 
 
+class DatabaseUnavailableError(ExpectedError):
+    """Raised when database circuit breaker is open after repeated connection failures."""
+
+    def __init__(self, message='Database unavailable.', retry_in: float = None):
+        super().__init__(message)
+
+        base_log.warning(message)
+        msg = 'WARNING: Can\'t connect to database.'
+        if not retry_in is None:
+            msg = f'{msg} Retrying in {retry_in:.0f}s.'
+
+        self.update_statusbar(msg=msg)
+
+
 class NoRowSelectedError(ExpectedError):
     """Raised if no internet connection detected."""
 
@@ -13,14 +13,17 @@ from guesttracker import dbtransaction as dbt
 from guesttracker import functions as f
 from guesttracker import getlog
 from guesttracker.data import factorycampaign as fc
+from guesttracker.data import reservations as rs
 from guesttracker.database import db
 from guesttracker.gui import _global as gbl
 from guesttracker.gui import formfields as ff
 from guesttracker.gui.dialogs.dialogbase import (
-    InputField, InputForm, add_linesep, msg_simple, unit_exists)
+    InputField, InputForm, add_linesep, msg_simple, msgbox, unit_exists)
 from guesttracker.gui.dialogs.tables import DialogTableWidget, UnitOpenFC
+from guesttracker.utils import availindex as avl
 from guesttracker.utils import dbconfig as dbc
 from guesttracker.utils import dbmodel as dbm
+from guesttracker.utils.availindex import AvailabilityIndex
 
 if TYPE_CHECKING:
     from guesttracker.gui.tables import TableWidget
@@ -153,7 +156,12 @@ class Reservations(HBAAddRow):
         self.v_layout2 = QVBoxLayout()
         self.grid_layout.addLayout(self.v_layout2, 0, 1, 1, 1)
 
-        self.dfu = db.get_df_unit() \
+        df_unit = db.get_df_unit()
+        self.df_unit = df_unit
+        self.m_unit_uid = dict(zip(df_unit.abbr, df_unit.uid))  # type: Dict[str, str]
+        self.selected_units = []  # type: List[str]
+
+        self.dfu = df_unit \
             .drop(columns=['uid', 'active']) \
             .sort_values(by=['class_name', 'name'], ascending=[False, True]) \
             .assign(reserved=False)
@@ -172,7 +180,12 @@ class Reservations(HBAAddRow):
 
         self.v_layout2.addWidget(self.tbl)
 
-        self.df_res = db.get_df_reservations()
+        btn = QPushButton('Check Nearby Dates', self)
+        btn.setToolTip('Check available units for same length stay starting up to 3 days earlier/later')
+        btn.clicked.connect(lambda: self.show_nearby_dates())
+        self.v_layout2.addWidget(btn)
+
+        self.avail = AvailabilityIndex.from_db()
 
         self.df_cust = db.get_df_customers()
 
@@ -193,13 +206,35 @@ class Reservations(HBAAddRow):
 
         self.dfu = dbc.set_unit_availability(
             df_unit=self.dfu,
-            df_res=self.df_res,
             date_arrival=date_arrival,
-            date_departure=date_departure)
+            date_departure=date_departure,
+            index=self.avail)
 
         self.tbl.display_data(self.dfu, resize_cols=True)
         self.on_unit_selection_change()
 
+    def show_nearby_dates(self, days: int = 3) -> None:
+        """Check all shifted date ranges in one batch and show available units for each"""
+        date_arrival = self.fields_db['arrival_date'].val
+        date_departure = self.fields_db['departure_date'].val
+
+        if date_arrival is None or date_departure is None:
+            return
+
+        shifts = pd.to_timedelta(range(-days, days + 1), unit='D')
+        df_req = pd.DataFrame(dict(
+            arrival_date=pd.Timestamp(date_arrival) + shifts,
+            departure_date=pd.Timestamp(date_departure) + shifts,
+            persons=self.fields_db['num_persons'].val))
+
+        df = avl.batch_free_units(df_req=df_req, df_unit=self.df_unit, index=self.avail)
+
+        msg = '\n'.join(
+            f'{row.arrival_date:%Y-%m-%d} - {row.departure_date:%Y-%m-%d}: {row.n_available} '
+            + f'({", ".join(row.units)})' for row in df.itertuples())
+
+        msgbox(msg=f'Available units:\n\n{msg}')
+
     def on_unit_selection_change(self):
         """Update units_assigned with selected units if valid"""
         rows = self.tbl.selected_rows()
@@ -221,7 +256,8 @@ class Reservations(HBAAddRow):
                 selected_units.append(abbr)
 
         # combine selected units to string and set back to unit_assignments field
-        units_combined = ', '.join(sorted(selected_units))
+        self.selected_units = sorted(selected_units)
+        units_combined = ', '.join(self.selected_units)
         self.fields_db['unit_assignments'].val = units_combined
 
     def accept(self):
@@ -229,11 +265,23 @@ class Reservations(HBAAddRow):
         row.status = 6  # TODO change this
         self.m['customer_name'] = self.fields_db['customer_id'].val
 
-        # show unit table and allow multi select - db.get_df_units()
+        date_arrival = self.fields_db['arrival_date'].val
+        date_departure = self.fields_db['departure_date'].val
 
-        # add "select units" button
+        # re-check on server in case units were booked since dialog was opened
+        df = db.get_reserved_units(d_lower=date_arrival, d_upper=date_departure)
+        reserved = sorted(set(self.selected_units) & set(df.unit))
+        if reserved:
+            self.update_statusbar(f'Units already reserved for these dates: {", ".join(reserved)}', warn=True)
+            return False
 
-        # validate unit availability
+        # junction rows are inserted with reservation (once table has been migrated)
+        if rs.is_migrated():
+            row.ReservationUnits = [
+                dbm.ReservationUnits(
+                    unit_id=self.m_unit_uid[unit],
+                    arrival_date=date_arrival,
+                    departure_date=date_departure) for unit in self.selected_units]
 
         return super().accept()
 
@@ -166,6 +166,10 @@ class MainWindow(QMainWindow):
         self.u = None
         # log.debug('user init')
 
+        # load reference tables from disk so first lookups don't wait on db, then revalidate in background
+        db.load_snapshots()
+        Worker(func=db.revalidate_snapshots, mw=self).start()
+
         last_tab_name = self.settings.value('active table', 'Event Log')
         self.tabs.init_tabs()
         self.tabs.activate_tab(title=last_tab_name)
@@ -272,6 +276,20 @@ class MainWindow(QMainWindow):
         msg = self.updater.get_changelog_full()
         dlgs.msgbox(msg='Changelog:', markdown_msg=msg)
 
+    def dump_query_stats(self) -> None:
+        """Write query timing records to csv and show slowest queries"""
+        from guesttracker.utils.querystats import query_stats
+
+        if not len(query_stats):
+            self.update_statusbar('No queries recorded yet.')
+            return
+
+        p_raw, p_sum = query_stats.dump(p=cf.p_applocal / 'querystats')
+        df = query_stats.summary(by='source').head(15).round(3)
+
+        msg = f'```\n{df.to_string()}\n```\n\nSaved to: {p_sum.parent}'
+        dlgs.msgbox(msg='Query stats (slowest by total time):', markdown_msg=msg)
+
     def init_sentry(self):
         """Add user-related scope information to sentry"""
         with configure_scope() as scope:  # type: ignore
@@ -499,6 +517,7 @@ class MainWindow(QMainWindow):
                 #     table_widget=t()),
                 reset_database_connection=dict(sep=True, func=db.reset),
                 reset_database_tables=db.clear_saved_tables,
+                dump_query_stats=self.dump_query_stats,
                 # open_SAP=dict(sep=True, func=self.open_sap)
             ),
             help=dict(
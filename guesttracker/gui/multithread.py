@@ -5,6 +5,7 @@ from PyQt6.QtCore import QObject, QRunnable, pyqtSignal, pyqtSlot
 from guesttracker import errors as er
 from guesttracker import functions as f
 from guesttracker import getlog
+from guesttracker.database import db
 
 log = getlog(__name__)
 
@@ -29,9 +30,12 @@ class Worker(QRunnable):
 
     @pyqtSlot()
     def run(self):
-        """Run task in background worker thread"""
+        """Run task in background worker thread
+        - db session/connections are scoped to this thread and released when done
+        """
         try:
-            result = self.func(*self.args, **self.kw)
+            with db.worker_scope():
+                result = self.func(*self.args, **self.kw)
         except:
             msg = f'Multithread Error - {self.func.__name__}'
             self.signals.error.emit(msg, sys.exc_info())
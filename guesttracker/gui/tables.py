@@ -1262,14 +1262,18 @@ class TableWidget(QWidget):
         msg.add_attachments(lst_attach=lst_attach)
         msg.show()
 
-    def save_df(self, style=None, df=None, p=None, name='temp', ext='xlsx'):
+    def save_df(self, style=None, df=None, p=None, name='temp', ext='xlsx', query=None):
         if p is None:
             p = Path.home() / f'Desktop/{name}.{ext}'
 
         if ext == 'xlsx':
             style.to_excel(p, index=False, freeze_panes=(1, 0))
         elif ext == 'csv':
-            df.to_csv(p, index=False)
+            if not query is None:
+                # re-run displayed table's query and stream to file in chunks
+                query.to_csv(p=p, last_loaded=True)
+            else:
+                df.to_csv(p, index=False)
 
         return p
 
@@ -1292,7 +1296,10 @@ class TableWidget(QWidget):
         if ext == 'xlsx':
             kw['style'] = self.view.get_style(df=None, outlook=True)
         elif ext == 'csv':
-            kw['df'] = self.view.data_model.df
+            if self.query.can_stream and not self.query.last_sql is None:
+                kw['query'] = self.query
+            else:
+                kw['df'] = self.view.data_model.df
 
         p = self.save_df(**kw)
         if not p is None:
@@ -1469,6 +1476,30 @@ class Units(HBATableWidget):
             self.set_combo_delegate(col='Active', items=lists['TrueFalse'], allow_blank=False)
 
 
+class ReportTableWidget(TableWidget):
+    """Read-only table of aggregated query results (eg Charges rollups), no add/delete rows
+    - refresh reloads query directly, no db table for RefreshTable dialog to build fields from"""
+
+    def __init__(self, name: str = None, parent=None):
+        super().__init__(parent=parent, name=name)
+
+    class View(TableView):
+        def __init__(self, parent: TableWidget):
+            super().__init__(parent=parent)
+            self.read_only_all = True
+
+    def show_refresh(self, *args, **kw):
+        self.refresh(save_query=False)
+
+
+class FolioTotals(ReportTableWidget):
+    pass
+
+
+class Revenue(ReportTableWidget):
+    pass
+
+
 class EventLogBase(TableWidget):
     def __init__(self, parent=None):
         super().__init__(parent=parent)
@@ -2,6 +2,7 @@ import inspect
 import operator as op
 import time
 from abc import ABCMeta
+from pathlib import Path
 from typing import *
 
 import pandas as pd
@@ -19,6 +20,8 @@ from guesttracker.database import db
 from guesttracker.errors import SettingsError
 from guesttracker.utils import dbconfig as dbc
 from guesttracker.utils import dbmodel as dbm
+from guesttracker.utils.querystats import query_stats
+from guesttracker.utils.sqlparams import Param, as_param, collect_params, literal_sql
 
 if not cf.AZURE_WEB:
     # dont want to include seaborn in azure functions package
@@ -129,30 +132,30 @@ class Filter():
                 func = getattr(field_, term)
                 if val:
                     if term == 'between':
-                        ct = func(*val)  # between
+                        ct = func(*as_param(val))  # between
                     else:
-                        ct = func(val)  # isin, etc
+                        ct = func(as_param(val))  # isin, etc
                 else:
                     ct = func()
 
             elif isinstance(val, str):
                 val = val.replace('*', '%')
                 if '%' in val:
-                    ct = field_.like(val)
+                    ct = field_.like(Param(val))
                 else:
                     if opr is None:
                         opr = op.eq
-                    ct = opr(field_, val)
+                    ct = opr(field_, Param(val))
 
             elif isinstance(val, (int, float)):
                 if opr is None:
                     opr = op.eq
-                ct = opr(field_, val)
+                ct = opr(field_, Param(val))
 
             elif isinstance(val, (dt, date)):
                 if opr is None:
                     opr = op.ge
-                ct = opr(field_, val)
+                ct = opr(field_, Param(val))
 
         self.add_criterion(ct=ct)
         return self
@@ -160,7 +163,7 @@ class Filter():
     def add_criterion(self, ct):
         # check for duplicate criterion, use str(ct) as dict key for actual ct
         # can also use this to pass in a completed pk criterion eg (T().field() == val)
-        self.criterion[str(ct)] = ct
+        self.criterion[literal_sql(ct)] = ct
         if isinstance(ct, pk.terms.ComplexCriterion):
             return  # cant use fields in complexcriterion for later access but whatever
 
@@ -214,6 +217,18 @@ class Filter():
 
 
 class QueryBase(metaclass=ABCMeta):
+    # process_df only uses values within each row, so can be applied per chunk in iter_df
+    process_df_rowwise = False
+
+    # pandas | arrow, arrow converts results column-wise (faster for wide tables), None = db default
+    fetch_backend = None
+
+    # share raw results across instances with identical sql/params (db.result_cache)
+    # tables are version-checked after ttl expires, otherwise entries are only trusted for ttl
+    use_result_cache = False
+    result_cache_tables = None  # type: List[str]
+    result_cache_ttl = 30
+
     def __init__(
             self,
             parent: 'TableWidget' = None,
@@ -237,6 +252,7 @@ class QueryBase(metaclass=ABCMeta):
         self.df = pd.DataFrame()
         self.df_loaded = False
         self.data_query_time = 0.0
+        self.last_sql = None  # (sql, params) of last _get_df, reused by iter_df(last_loaded=True)
 
         m = cf.config['TableName']
         self.color = cf.config['color']
@@ -324,7 +340,7 @@ class QueryBase(metaclass=ABCMeta):
                 q = self.get_query()
 
             # no select cols defined yet
-            if q.get_sql() == '':
+            if literal_sql(q) == '':
                 q = q.select(*self.cols)
 
             q = q.where(self.fltr.expand_criterion())
@@ -335,12 +351,27 @@ class QueryBase(metaclass=ABCMeta):
 
             sql = str(q)
 
-            # save previous query to qsettings
+            # save previous query to qsettings (always with literal values)
             if cf.IS_QT_APP and save_query:
-                gbl.get_settings().setValue(self.query_key, sql)
+                gbl.get_settings().setValue(self.query_key, literal_sql(q))
 
         return sql
 
+    def get_sql_params(self, **kw) -> Tuple[str, list]:
+        """Return sql with "?" placeholders for filter values + list of params
+        - keeps sql text constant across filter values so the server can reuse the cached plan
+        - queries with raw sql (or last_query) return literal sql + empty params
+
+        Returns
+        -------
+        Tuple[str, list]
+            sql, params
+        """
+        with collect_params() as params:
+            sql = self.get_sql(**kw)
+
+        return sql, list(params)
+
     def set_fltr(self):
         self.fltr = Filter(parent=self)
         self.fltr2 = Filter(parent=self)
@@ -456,6 +487,7 @@ class QueryBase(metaclass=ABCMeta):
             prnt: bool = False,
             skip_process: bool = False,
             lower_cols: bool = False,
+            result_cache: bool = None,
             **kw) -> pd.DataFrame:
         """Execute query and return dataframe
 
@@ -471,6 +503,8 @@ class QueryBase(metaclass=ABCMeta):
             Allow skipping process_df for troubleshooting, default False
         lower_cols : bool, optional
             Lowercase column names, default False
+        result_cache : bool, optional
+            use shared result cache, default self.use_result_cache
 
         Returns
         ---
@@ -479,18 +513,139 @@ class QueryBase(metaclass=ABCMeta):
         self._set_default_filter(do=default, **kw) \
             ._set_base_filter(do=base, **kw)
 
-        sql = self.get_sql(**kw)
+        sql, params = self.get_sql_params(**kw)
+        self.last_sql = (sql, params)
         if prnt:
-            print(sql)
+            print(sql, params)
+
+        if result_cache is None:
+            result_cache = self.use_result_cache
 
-        return pd \
-            .read_sql(sql=sql, con=db.engine) \
+        return self.read_sql(sql=sql, params=params, result_cache=result_cache) \
             .pipe(f.default_df) \
             .pipe(self.sort_primary_date) \
             .pipe(f.convert_df_view_cols, m=self.view_cols, do=not lower_cols) \
             .pipe(self._process_df, do=not skip_process) \
             .pipe(f.set_default_dtypes, m=self.default_dtypes)
 
+    def read_sql(self, sql: str, params: list = None, result_cache: bool = False) -> pd.DataFrame:
+        """Read raw query result, optionally from db.result_cache
+        - cached df is copied so processing doesn't modify the shared entry
+
+        Parameters
+        ----------
+        sql : str
+        params : list, optional
+        result_cache : bool, optional
+            default False
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        if not result_cache:
+            return db.read_sql(sql=sql, params=params, backend=self.fetch_backend, source=self.name)
+
+        key = f'{self.fetch_backend}|{sql}|{params}'
+        df = db.result_cache.get(key, tables=self.result_cache_tables)
+
+        if df is None:
+            df = db.read_sql(sql=sql, params=params, backend=self.fetch_backend, source=self.name)
+            db.result_cache.put(key, df, tables=self.result_cache_tables, ttl=self.result_cache_ttl)
+        else:
+            query_stats.record(source=self.name, sql=sql, secs=0.0, rows=len(df), cache_hit=True)
+
+        return df.copy()
+
+    def iter_df(
+            self,
+            chunksize: int = 50000,
+            default: bool = False,
+            base: bool = False,
+            prnt: bool = False,
+            lower_cols: bool = False,
+            last_loaded: bool = False,
+            **kw) -> Iterator[pd.DataFrame]:
+        """Execute query and yield dataframes of max chunksize rows
+        - Applies row-local parts of _get_df pipeline per chunk
+        - Chunks are in server order (no sort_primary_date)
+        - process_df only applied if class sets process_df_rowwise
+
+        Parameters
+        ----------
+        chunksize : int, optional
+            rows per chunk, default 50000
+        default : bool, optional
+            self.set_default_filter if default=True, default False
+        base : bool, optional
+            self.set_base_filter, default False
+        prnt : bool, optional
+            Print query sql, default False
+        lower_cols : bool, optional
+            Lowercase column names, default False
+        last_loaded : bool, optional
+            Re-run sql of last get_df call (eg table currently displayed), ignores filters, default False
+
+        Yields
+        ------
+        Iterator[pd.DataFrame]
+        """
+        if last_loaded:
+            if self.last_sql is None:
+                raise SettingsError('No query loaded yet.')
+
+            sql, params = self.last_sql
+        else:
+            self._set_default_filter(do=default, **kw) \
+                ._set_base_filter(do=base, **kw)
+
+            try:
+                sql, params = self.get_sql_params(**kw)
+            finally:
+                self.set_fltr()
+
+        if prnt:
+            print(sql, params)
+
+        dfs = db.iter_sql(sql=sql, chunksize=chunksize, params=params, backend=self.fetch_backend, source=self.name)
+
+        for df in dfs:
+            yield df \
+                .pipe(f.default_df) \
+                .pipe(f.convert_df_view_cols, m=self.view_cols, do=not lower_cols) \
+                .pipe(self._process_df, do=self.process_df_rowwise) \
+                .pipe(f.set_default_dtypes, m=self.default_dtypes)
+
+    def to_csv(self, p: Path, chunksize: int = 50000, **kw) -> int:
+        """Stream query results to csv file in chunks without loading full df
+        - empty result still writes file with header
+
+        Parameters
+        ----------
+        p : Path
+            csv file path
+        chunksize : int, optional
+            default 50000
+
+        Returns
+        -------
+        int
+            rows written
+        """
+        nrows = 0
+
+        for i, df in enumerate(self.iter_df(chunksize=chunksize, **kw)):
+            df.to_csv(p, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            nrows += len(df)
+
+        log.info(f'Wrote {nrows} rows to: {p}')
+        return nrows
+
+    @property
+    def can_stream(self) -> bool:
+        """iter_df chunks match get_df (apart from row order) if process_df is row-local or not overridden"""
+        return self.process_df_rowwise or type(self).process_df is QueryBase.process_df
+
     def get_df(self, cached: bool = False, **kw) -> pd.DataFrame:
         """Wrapper for _get_df
 
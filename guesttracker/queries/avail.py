@@ -103,6 +103,9 @@ class AvailTopDowns(AvailBase):
 
 class AvailSummary(QueryBase):
     """Query for calculating availability tables and summary stats for reports"""
+    # same summary is loaded by multiple report sections
+    use_result_cache = True
+    result_cache_ttl = 300
 
     def __init__(
             self,
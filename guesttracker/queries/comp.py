@@ -19,6 +19,8 @@ log = getlog(__name__)
 
 
 class ComponentCOBase(EventLogBase):
+    process_df_rowwise = True  # only drops rn col
+
     def __init__(self, da=None, **kw):
         super().__init__(da=da, **kw)
         a, b, c, d, e = self.a, self.b, T('ComponentType'), self.d, T('ComponentBench')
@@ -145,6 +147,8 @@ class ComponentSMR(QueryBase):
 
 
 class ComponentCOReport(ComponentCOBase):
+    process_df_rowwise = False  # sorts by component
+
     def __init__(
             self,
             d_rng: Tuple[dt, dt],
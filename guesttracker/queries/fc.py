@@ -268,6 +268,7 @@ class FCDetails(FCBase):
 
 class FCOpen(FCBase):
     """Query for db"""
+    process_df_rowwise = True
 
     def __init__(self, theme='dark'):
         super().__init__(theme=theme)
@@ -1,13 +1,19 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List, Tuple, Union
 
+import pandas as pd
+from pypika import CustomFunction as cfn
 from pypika import MSSQLQuery as Query
 from pypika import Table as T
+from pypika import functions as fn
+from pypika.terms import Star
 
 from guesttracker import config as cf
+from guesttracker import dt
 from guesttracker import functions as f
 from guesttracker.queries import QueryBase
 from guesttracker.utils import dbconfig as dbc
 from guesttracker.utils import dbmodel as dbm
+from guesttracker.utils.sqlparams import Param, as_param
 
 if TYPE_CHECKING:
     from pypika.queries import QueryBuilder
@@ -107,3 +113,227 @@ class Charges(HBAQueryBase):
         super().__init__(**kw)
 
         self.default_dtypes |= f.dtypes_dict('Int64', ['Sub Kind'])
+
+
+class ChargesAggBase(QueryBase):
+    """Charges rolled up on the server with GROUP BY, only the aggregated rows are returned
+    - use_summary=True reads the pre-aggregated summary table (see data.charges) instead of scanning Charges
+    - total = total_amount + total_tax1 + total_tax2 (payments are negative, so folio total is the balance owing)
+    """
+    use_result_cache = True
+    result_cache_ttl = 60
+
+    summary_table = None  # type: str
+    measures = ('total_amount', 'total_tax1', 'total_tax2', 'discount')
+
+    def __init__(
+            self,
+            use_summary: bool = False,
+            d_rng: Tuple[dt, dt] = None,
+            name: str = None,
+            da: dict = None,
+            **kw):
+        """da = d_rng (+ subclass args), re-applied to fltr on every get_sql
+
+        Parameters
+        ----------
+        use_summary : bool, optional
+            read summary table maintained by triggers on Charges, default False
+        d_rng : Tuple[dt, dt], optional
+            only include charges with d_lower <= charge_date < d_upper, default None
+        name : str, optional
+            passed by gui TableWidget, not used (title from class name), default None
+        """
+        select_tablename = self.summary_table if use_summary else 'Charges'
+        super().__init__(select_tablename=select_tablename, da=dict(d_rng=d_rng) | (da or {}), **kw)
+        self.use_summary = use_summary
+        self.a = self.select_table
+        self.result_cache_tables = [select_tablename]
+
+        view_cols = [self.view_cols.get(c, c) for c in (*self.measures, 'total')]
+        self.default_dtypes |= f.dtypes_dict('float64', view_cols)
+        self.formats |= {c: '{:,.2f}' for c in view_cols}
+
+    def set_default_args(self, d_rng: Tuple[dt, dt] = None) -> None:
+        """Set date range"""
+        if not d_rng is None:
+            self.set_d_rng(d_rng=d_rng)
+
+    @property
+    def date_col(self) -> str:
+        return 'charge_day' if self.use_summary else 'charge_date'
+
+    def set_d_rng(self, d_rng: Tuple[dt, dt]) -> None:
+        """Filter charges in date range, upper bound exclusive
+        - summary tables are filtered on charge_day, so bounds are rounded to days"""
+        d_lower, d_upper = [pd.Timestamp(d) for d in d_rng]
+
+        if self.use_summary:
+            d_lower, d_upper = d_lower.date(), d_upper.ceil('D').date()
+        else:
+            d_lower, d_upper = d_lower.to_pydatetime(), d_upper.to_pydatetime()
+
+        col = self.a[self.date_col]
+        self.fltr.add(ct=(col >= Param(d_lower)) & (col < Param(d_upper)))
+
+    def agg_cols(self) -> list:
+        """Count + sum of each measure, summary tables already hold partial counts/sums"""
+        a = self.a
+        n_charges = fn.Sum(a.n_charges) if self.use_summary else fn.Count(Star())
+        sums = {c: fn.Sum(fn.Coalesce(a[c], 0)) for c in self.measures}
+        total = sums['total_amount'] + sums['total_tax1'] + sums['total_tax2']
+
+        return [n_charges.as_('n_charges'), *[expr.as_(c) for c, expr in sums.items()], total.as_('total')]
+
+
+class FolioTotals(ChargesAggBase):
+    """Folio totals per reservation or customer
+
+    Examples
+    --------
+    >>> query = FolioTotals(by='reservation', use_summary=True)
+    >>> query.set_reservations(uids=['...'])
+    >>> df = query.get_df()
+    """
+    summary_table = 'FolioSummary'
+
+    def __init__(self, by: str = 'reservation', **kw):
+        """
+        Parameters
+        ----------
+        by : str, optional
+            reservation | customer, default 'reservation'
+        """
+        if not by in ('reservation', 'customer'):
+            raise ValueError(f'by must be in (reservation, customer), not "{by}"')
+
+        super().__init__(**kw)
+        self.by = by
+
+        if self.use_summary and not self.da['d_rng'] is None:
+            raise ValueError('FolioSummary has no dates, use_summary=False to filter by d_rng')
+
+    def set_d_rng(self, d_rng: Tuple[dt, dt]) -> None:
+        if self.use_summary:
+            raise ValueError('FolioSummary has no dates, use_summary=False to filter by d_rng')
+
+        super().set_d_rng(d_rng=d_rng)
+
+    def set_reservations(self, uids: Union[str, List[str]]) -> None:
+        self.fltr.add(ct=self.a.reservation_id.isin(as_param(f.as_list(uids))))
+
+    def set_customers(self, uids: Union[str, List[str]]) -> None:
+        self.fltr.add(ct=self.a.customer_id.isin(as_param(f.as_list(uids))))
+
+    @property
+    def q(self):
+        a, b, c = self.a, T('Reservations'), T('Customers')
+
+        if self.by == 'reservation':
+            keys = [a.reservation_id]
+            extra = [b.arrival_date, b.departure_date, b.unit_assignments]
+            q = Query.from_(a) \
+                .inner_join(b).on(a.reservation_id == b.uid) \
+                .left_join(c).on(b.customer_id == c.uid)
+        else:
+            keys, extra = [a.customer_id], []
+            q = Query.from_(a) \
+                .inner_join(c).on(a.customer_id == c.uid)
+
+        # group by plain customer name column, mssql can't group by select alias
+        return q \
+            .select(*keys, c.name.as_('customer_name'), *extra, *self.agg_cols()) \
+            .groupby(*keys, c.name, *extra)
+
+
+class Revenue(ChargesAggBase):
+    """Revenue per period and account/package/kind
+
+    Examples
+    --------
+    >>> query = Revenue(by=['account'], period='month', d_rng=(dt(2022, 1, 1), dt(2023, 1, 1)), use_summary=True)
+    >>> df = query.get_df()
+    """
+    summary_table = 'RevenueDaily'
+    measures = ('quantity', 'total_amount', 'total_tax1', 'total_tax2', 'discount')
+
+    def __init__(
+            self,
+            by: Union[str, List[str]] = None,
+            period: str = 'month',
+            kinds: List[int] = None,
+            **kw):
+        """
+        Parameters
+        ----------
+        by : Union[str, List[str]], optional
+            any of account | package | kind, default ['account', 'package']
+        period : str, optional
+            day | month | year | None (whole range), default 'month'
+        kinds : List[int], optional
+            only include Charges.kind in kinds, default None
+        """
+        by = list(by) if isinstance(by, tuple) else f.as_list(by or ['account', 'package'])
+        invalid = [b for b in by if not b in ('account', 'package', 'kind')]
+        if invalid:
+            raise ValueError(f'by must be in (account, package, kind), not {invalid}')
+
+        if not period in ('day', 'month', 'year', None):
+            raise ValueError(f'period must be in (day, month, year, None), not "{period}"')
+
+        super().__init__(da=dict(kinds=kinds), **kw)
+        self.by, self.period = by, period
+        self.default_dtypes |= f.dtypes_dict('Int64', [self.view_cols.get('kind', 'kind')])
+        self.default_dtypes |= f.dtypes_dict('datetime64[ns]', [self.view_cols.get('period', 'period')])
+
+    def set_default_args(self, kinds: List[int] = None, **kw) -> None:
+        """Set date range and charge kinds"""
+        super().set_default_args(**kw)
+
+        if not kinds is None:
+            self.fltr.add(ct=self.a.kind.isin(as_param(f.as_list(kinds))))
+
+    def period_expr(self):
+        """First day of period containing charge date"""
+        d = self.a[self.date_col]
+
+        if self.period == 'day' and self.use_summary:
+            return d
+
+        datefromparts = cfn('DATEFROMPARTS', ['year', 'month', 'day'])
+        _year, _month, _day = cfn('YEAR', ['date']), cfn('MONTH', ['date']), cfn('DAY', ['date'])
+
+        return dict(
+            day=lambda: datefromparts(_year(d), _month(d), _day(d)),
+            month=lambda: datefromparts(_year(d), _month(d), 1),
+            year=lambda: datefromparts(_year(d), 1, 1))[self.period]()
+
+    @property
+    def q(self):
+        a = self.a
+        q = Query.from_(a)
+        select, group = [], []
+
+        if not self.period is None:
+            select.append(self.period_expr().as_('period'))
+            group.append(self.period_expr())
+
+        for name in self.by:
+            if name == 'kind':
+                # summary stores null kind as -1 to be part of primary key
+                kind = fn.NullIf(a.kind, -1) if self.use_summary else a.kind
+                select.append(kind.as_('kind'))
+                group.append(a.kind)
+            else:
+                b = T(f'{name.title()}s')
+                q = q.left_join(b).on(a[f'{name}_id'] == b.uid)
+                select.append(b.name.as_(f'{name}_name'))
+                group.extend([a[f'{name}_id'], b.name])  # accounts/packages can share a name
+
+        q = q.select(*select, *self.agg_cols())
+        return q.groupby(*group) if group else q
+
+    def process_df(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Sort by period + group cols (first cols in select)"""
+        n_keys = len(self.by) + (not self.period is None)
+        return df.sort_values(list(df.columns[:n_keys])).reset_index(drop=True) if n_keys else df
@@ -83,6 +83,8 @@ class TableKeysPLM(TableKeys):
 
 
 class FrameCracks(EventLogBase):
+    process_df_rowwise = True
+
     def __init__(self, da=None, **kw):
         super().__init__(da=da, **kw)
         a, b = self.a, self.b
@@ -1,4 +1,6 @@
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import *
 
@@ -39,7 +41,7 @@ class Report(object):
             rep_type: str = 'pdf',
             **kw):
         # dict of {df_name: {func: func_definition, da: **da, df=None}}
-        dfs, charts, sections, exec_summary, style_funcs = {}, {}, {}, {}, {}
+        dfs, charts, sections, exec_summary, style_funcs, load_times = {}, {}, {}, {}, {}, {}
         signatures = []
         self.html_template = 'report_template.html'
         dfs_loaded = False
@@ -115,18 +117,93 @@ class Report(object):
 
             getattr(sys.modules[__name__], sec['name'])(report=self, **sec)
 
-    def load_all_dfs(self, saved=False):
-        # call each df's function with its args and assign to df
+    def load_all_dfs(self, saved: bool = False, max_workers: int = 4):
+        """Load all dfs, running independent queries concurrently
+
+        Parameters
+        ----------
+        saved : bool, optional
+            load from saved csvs, default False
+        max_workers : int, optional
+            max threads (each uses its own db connection from the pool), default 4, 1 = serial
+        """
         print('\n\nLoading dfs:')
-        for name in self.dfs:
-            self.load_df(name=name, saved=saved)
+        start = time.time()
+
+        if saved or max_workers <= 1:
+            for name in self.dfs:
+                self.load_df(name=name, saved=saved)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report') as pool:
+                for wave in self.get_load_plan():
+                    futures = [pool.submit(self.load_dfs, names=names) for names in wave]
+
+                    # wait for full wave before starting dependents, raise first error
+                    for future in futures:
+                        future.result()
 
         self.dfs_loaded = True
+        log.info(f'Loaded {len(self.dfs)} dfs in {time.time() - start:.2f}s, slowest: '
+                 + str(sorted(self.load_times.items(), key=lambda x: -x[1])[:3]))
         return self
 
+    def get_load_plan(self) -> List[List[List[str]]]:
+        """Group dfs into waves which can be loaded concurrently
+        - df only starts once all dfs in its depends_on are loaded
+        - dfs sharing any query object are loaded serially in one task (query holds filter state)
+
+        Returns
+        -------
+        List[List[List[str]]]
+            list of waves > list of tasks > df names loaded in order by one worker
+        """
+        remaining = list(self.dfs)
+        loaded = set()
+        waves = []
+
+        while remaining:
+            ready = [n for n in remaining if set(self.dfs[n].get('depends_on', [])) <= loaded]
+
+            if not ready:
+                raise ValueError(f'Circular or missing df dependencies: {remaining}')
+
+            tasks = []  # type: List[Tuple[Set[int], List[str]]]
+            for name in ready:
+                keys, names = {id(owner) for owner in self._df_owners(name=name)}, []
+
+                # merge all tasks sharing an owner with this df, keep load order
+                for task in [t for t in tasks if t[0] & keys]:
+                    tasks.remove(task)
+                    keys |= task[0]
+                    names += task[1]
+
+                tasks.append((keys, sorted(names, key=ready.index) + [name]))
+
+            waves.append([names for _, names in tasks])
+            loaded |= set(ready)
+            remaining = [n for n in remaining if not n in loaded]
+
+        return waves
+
+    def _df_owners(self, name: str) -> List['QueryBase']:
+        """Get query objects df is loaded from/with (query, bound method, query captured in lambda, or passed in da)"""
+        m = self.dfs[name]
+        func = m['func']
+        owners = [m['query'], getattr(func, '__self__', None)] \
+            + [cell.cell_contents for cell in getattr(func, '__closure__', None) or []] \
+            + list((m['da'] or {}).values())
+
+        return [owner for owner in owners if isinstance(owner, qr.QueryBase)]
+
+    def load_dfs(self, names: List[str], saved: bool = False) -> None:
+        with db.worker_scope():
+            for name in names:
+                self.load_df(name=name, saved=saved)
+
     def load_df(self, name, saved=False):
         """Load df from either function defn or query obj"""
         print(f'\t{name}')
+        start = time.time()
         m = self.dfs[name]
         func, query, da, name = m['func'], m['query'], m['da'], m['name']
 
@@ -139,6 +216,8 @@ class Report(object):
         elif not query is None:
             m['df'] = query.get_df(**da)
 
+        self.load_times[name] = round(time.time() - start, 3)
+
     def load_section_data(self):
         for sec in self.sections.values():
             sec.load_subsection_data()
@@ -1418,7 +1497,11 @@ class SubSection():
             display=True,
             has_chart=False,
             caption=None,
-            style_func=None):
+            style_func=None,
+            depends_on: Union[str, List[str]] = None):
+        """Add df to report
+        - depends_on: names of other dfs which must be loaded first (eg func reads report.get_df)
+        """
         if name is None:
             name = self.title
 
@@ -1433,7 +1516,8 @@ class SubSection():
             df=None,
             df_html=None,
             display=display,
-            has_chart=has_chart)
+            has_chart=has_chart,
+            depends_on=f.as_list(depends_on or []))
 
         self.report.style_funcs |= {name: style_func}
 
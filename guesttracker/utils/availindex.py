@@ -0,0 +1,341 @@
+from collections import defaultdict as dd
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+from guesttracker import dt, getlog
+
+log = getlog(__name__)
+
+"""
+Sorted interval index of reservations per unit for fast availability checks
+- Stays are stored as nights: [arrival day, departure day), so a departure and an arrival on the same day don't
+    conflict (check out 11:00, check in 15:00)
+- Per unit, stays are sorted by arrival with a running max of departures (max_end), so "any stay overlapping
+    [a, b)" is a single binary search: last stay arriving before b, then max_end of all stays up to it > a
+- Overlapping stays on the same unit (double bookings) are still handled correctly
+- add/cancel update single unit's arrays in place, no full rebuild
+- units not in the index are unknown, never free (is_free, free_units, free_matrix) and never reserved
+
+Examples
+--------
+>>> from guesttracker.utils.availindex import AvailabilityIndex
+>>> idx = AvailabilityIndex.from_db()
+>>> idx.free_units(dt(2022, 7, 1), dt(2022, 7, 5))
+>>> idx.next_free(unit='C1', d=dt(2022, 7, 1), nights=3)
+"""
+
+DateLike = Union[dt, pd.Timestamp, np.datetime64, str]
+
+
+def to_day(d: DateLike) -> int:
+    """Convert date to int days since epoch"""
+    return int(np.datetime64(pd.Timestamp(d).normalize(), 'D').astype(np.int64))
+
+
+def from_day(day: int) -> pd.Timestamp:
+    return pd.Timestamp(np.datetime64(int(day), 'D'))
+
+
+def days_array(s: pd.Series) -> np.ndarray:
+    """Convert series of datetimes to int days since epoch"""
+    return pd.to_datetime(s).dt.normalize().values.astype('datetime64[D]').astype(np.int64)
+
+
+class UnitIntervals():
+    """Sorted stays (arrival, departure days) for single unit"""
+
+    def __init__(self, starts: np.ndarray = None, ends: np.ndarray = None, rids: np.ndarray = None):
+        if starts is None:
+            starts, ends, rids = np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, object)
+
+        order = np.argsort(starts, kind='stable')
+        self.starts = np.asarray(starts, np.int64)[order]
+        self.ends = np.asarray(ends, np.int64)[order]
+        self.rids = np.asarray(rids, object)[order]
+        self.max_end = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends.copy()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _reset_max_end(self, i: int) -> None:
+        """Recompute running max of ends from position i"""
+        if i >= len(self.ends):
+            return
+
+        prev = self.max_end[i - 1] if i > 0 else np.iinfo(np.int64).min
+        self.max_end[i:] = np.maximum.accumulate(np.maximum(self.ends[i:], prev))
+
+    def is_free(self, a: int, b: int) -> bool:
+        """If no stay overlaps [a, b), O(log n)"""
+        i = np.searchsorted(self.starts, b, side='left')  # stays [0, i) arrive before b
+        return i == 0 or self.max_end[i - 1] <= a
+
+    def overlapping(self, a: int, b: int) -> np.ndarray:
+        """Positions of stays overlapping [a, b), O(log n + k)
+        - walk back from last stay arriving before b until running max_end <= a (no earlier stay can overlap)
+        """
+        i = np.searchsorted(self.starts, b, side='left') - 1
+        out = []
+
+        while i >= 0 and self.max_end[i] > a:
+            if self.ends[i] > a:
+                out.append(i)
+            i -= 1
+
+        return np.array(out[::-1], dtype=np.int64)
+
+    def next_free(self, a: int, nights: int) -> Tuple[int, Union[int, None]]:
+        """First window of at least `nights` starting on or after day a
+
+        Returns
+        -------
+        Tuple[int, Union[int, None]]
+            (first free day, next arrival after it or None if open ended)
+        """
+        while True:
+            b = a + nights
+            i = np.searchsorted(self.starts, b, side='left')
+
+            if i == 0 or self.max_end[i - 1] <= a:
+                j = np.searchsorted(self.starts, a, side='left')
+                return a, (int(self.starts[j]) if j < len(self.starts) else None)
+
+            a = int(self.max_end[i - 1])  # jump past all stays blocking window
+
+    def add(self, a: int, b: int, rid: Any) -> None:
+        i = int(np.searchsorted(self.starts, a, side='right'))
+        self.starts = np.insert(self.starts, i, a)
+        self.ends = np.insert(self.ends, i, b)
+        self.rids = np.insert(self.rids, i, rid)
+        self.max_end = np.insert(self.max_end, i, b)
+        self._reset_max_end(i)
+
+    def remove(self, rid: Any) -> int:
+        """Remove all stays for reservation id, returns number removed"""
+        idx = np.flatnonzero(self.rids == rid)
+        if len(idx) == 0:
+            return 0
+
+        self.starts = np.delete(self.starts, idx)
+        self.ends = np.delete(self.ends, idx)
+        self.rids = np.delete(self.rids, idx)
+        self.max_end = np.delete(self.max_end, idx)
+        self._reset_max_end(int(idx[0]))
+        return len(idx)
+
+
+class AvailabilityIndex():
+    def __init__(self, df_res: pd.DataFrame = None, units: Iterable[str] = None):
+        """
+        Parameters
+        ----------
+        df_res : pd.DataFrame, optional
+            non-cancelled reservations, one row per unit, cols unit, reservation_id, arrival_date, departure_date
+        units : Iterable[str], optional
+            all unit abbrs, including units with no reservations, default units in df_res
+        """
+        m_units = {}  # type: Dict[str, UnitIntervals]
+        m_res = dd(set)  # type: Dict[Any, Set[str]]  # reservation_id: units, for cancel
+        self.m_units, self.m_res = m_units, m_res
+
+        if not df_res is None and len(df_res) > 0:
+            df = df_res.dropna(subset=['unit', 'arrival_date', 'departure_date'])
+            starts, ends = days_array(df.arrival_date), days_array(df.departure_date)
+            rids = df['reservation_id'].values if 'reservation_id' in df.columns else np.full(len(df), None)
+            units_res = df.unit.values
+
+            for unit, idx in pd.Series(np.arange(len(df))).groupby(units_res).groups.items():
+                idx = np.asarray(idx)
+                m_units[unit] = UnitIntervals(starts=starts[idx], ends=ends[idx], rids=rids[idx])
+
+                for rid in rids[idx]:
+                    m_res[rid].add(unit)
+
+        for unit in units or []:
+            if not unit in m_units:
+                m_units[unit] = UnitIntervals()
+
+    @classmethod
+    def from_db(cls, **kw) -> 'AvailabilityIndex':
+        """Build index from all non-cancelled reservations and all units"""
+        from guesttracker.database import db
+        df_unit = db.get_df_unit(active_only=False, **kw)
+        return cls(df_res=db.get_df_reservations(**kw), units=df_unit.abbr)
+
+    @property
+    def units(self) -> List[str]:
+        return list(self.m_units.keys())
+
+    def _units(self, units: Iterable[str] = None) -> Iterable[str]:
+        return self.m_units.keys() if units is None else units
+
+    def is_free(self, unit: str, d_lower: DateLike, d_upper: DateLike) -> bool:
+        """If unit has no reservation overlapping nights [d_lower, d_upper), False if unit not in index"""
+        intervals = self.m_units.get(unit, None)
+        return not intervals is None and intervals.is_free(to_day(d_lower), to_day(d_upper))
+
+    def free_units(self, d_lower: DateLike, d_upper: DateLike, units: Iterable[str] = None) -> List[str]:
+        """Units with no reservation overlapping nights [d_lower, d_upper)
+
+        Parameters
+        ----------
+        d_lower : DateLike
+            arrival date
+        d_upper : DateLike
+            departure date
+        units : Iterable[str], optional
+            units to check, default all
+
+        Returns
+        -------
+        List[str]
+        """
+        a, b = to_day(d_lower), to_day(d_upper)
+        return [u for u in self._units(units) if u in self.m_units and self.m_units[u].is_free(a, b)]
+
+    def reserved_units(self, d_lower: DateLike, d_upper: DateLike, units: Iterable[str] = None) -> List[str]:
+        """Units with at least one reservation overlapping nights [d_lower, d_upper)"""
+        a, b = to_day(d_lower), to_day(d_upper)
+        return [u for u in self._units(units) if u in self.m_units and not self.m_units[u].is_free(a, b)]
+
+    def conflicts(self, d_lower: DateLike, d_upper: DateLike, units: Iterable[str] = None) -> pd.DataFrame:
+        """Existing reservations which overlap proposed booking
+
+        Parameters
+        ----------
+        d_lower : DateLike
+        d_upper : DateLike
+        units : Iterable[str], optional
+            units in proposed booking, default all
+
+        Returns
+        -------
+        pd.DataFrame
+            df with cols unit, reservation_id, arrival_date, departure_date
+        """
+        a, b = to_day(d_lower), to_day(d_upper)
+        data = []
+
+        for unit in self._units(units):
+            intervals = self.m_units.get(unit, None)
+            if intervals is None:
+                continue
+
+            for i in intervals.overlapping(a, b):
+                data.append((unit, intervals.rids[i], from_day(intervals.starts[i]), from_day(intervals.ends[i])))
+
+        return pd.DataFrame(data, columns=['unit', 'reservation_id', 'arrival_date', 'departure_date'])
+
+    def next_free(self, unit: str, d: DateLike, nights: int = 1) -> Tuple[pd.Timestamp, Union[pd.Timestamp, None]]:
+        """Next free window of at least `nights` for unit, starting on or after d
+
+        Returns
+        -------
+        Tuple[pd.Timestamp, Union[pd.Timestamp, None]]
+            (first free arrival date, date of next reservation after it or None if open ended)
+        """
+        intervals = self.m_units.get(unit, None)
+        if intervals is None:
+            raise KeyError(f'Unit not in index: {unit}')
+
+        a, b = intervals.next_free(to_day(d), nights)
+        return from_day(a), (from_day(b) if not b is None else None)
+
+    def free_matrix(self, d_lower: Iterable[DateLike], d_upper: Iterable[DateLike], units: Iterable[str]) -> np.ndarray:
+        """Availability of every unit for many date ranges at once
+        - one vectorised binary search per unit over all ranges, O(units * n log stays)
+
+        Parameters
+        ----------
+        d_lower : Iterable[DateLike]
+            arrival dates
+        d_upper : Iterable[DateLike]
+            departure dates, same length as d_lower
+        units : Iterable[str]
+
+        Returns
+        -------
+        np.ndarray
+            bool array (n ranges, n units), True if unit is free for range, False for units not in index
+        """
+        a, b = days_array(pd.Series(d_lower)), days_array(pd.Series(d_upper))
+        units = list(units)
+        free = np.ones((len(a), len(units)), dtype=bool)
+
+        for j, unit in enumerate(units):
+            intervals = self.m_units.get(unit, None)
+            if intervals is None:
+                free[:, j] = False
+                continue
+            elif len(intervals) == 0:
+                continue
+
+            i = np.searchsorted(intervals.starts, b, side='left')
+            free[:, j] = (i == 0) | (intervals.max_end[np.maximum(i - 1, 0)] <= a)
+
+        return free
+
+    def add(self, reservation_id: Any, units: Union[str, Iterable[str]], d_lower: DateLike, d_upper: DateLike) -> None:
+        """Add reservation for one or more units"""
+        a, b = to_day(d_lower), to_day(d_upper)
+
+        for unit in ([units] if isinstance(units, str) else units):
+            if not unit in self.m_units:
+                self.m_units[unit] = UnitIntervals()
+
+            self.m_units[unit].add(a, b, reservation_id)
+            self.m_res[reservation_id].add(unit)
+
+    def cancel(self, reservation_id: Any) -> int:
+        """Remove reservation from all its units, returns number of unit stays removed"""
+        units = self.m_res.pop(reservation_id, set())
+        return sum(self.m_units[unit].remove(reservation_id) for unit in units if unit in self.m_units)
+
+
+def batch_free_units(
+        df_req: pd.DataFrame,
+        df_unit: pd.DataFrame = None,
+        index: AvailabilityIndex = None) -> pd.DataFrame:
+    """Available units for many (arrival, departure, persons, class) requests, evaluated together
+
+    Parameters
+    ----------
+    df_req : pd.DataFrame
+        cols arrival_date, departure_date, optional persons (min Units.max_persons), class_name (case insensitive),
+        null persons/class_name = any
+    df_unit : pd.DataFrame, optional
+        units to offer, cols abbr, max_persons, class_name, default active units from db
+    index : AvailabilityIndex, optional
+        default build from db
+
+    Returns
+    -------
+    pd.DataFrame
+        df_req with cols units (list of free unit abbrs) and n_available
+    """
+    if df_unit is None or index is None:
+        from guesttracker.database import db
+
+        if df_unit is None:
+            df_unit = db.get_df_unit()
+        if index is None:
+            index = AvailabilityIndex.from_db()
+
+    units = df_unit.abbr.to_numpy()
+    free = index.free_matrix(d_lower=df_req.arrival_date, d_upper=df_req.departure_date, units=units)
+
+    if 'persons' in df_req.columns:
+        persons = pd.to_numeric(df_req.persons, errors='coerce').fillna(0).to_numpy()
+        free &= df_unit.max_persons.fillna(0).to_numpy()[None, :] >= persons[:, None]
+
+    if 'class_name' in df_req.columns:
+        req_class = df_req.class_name.fillna('').astype(str).str.lower().to_numpy()
+        unit_class = df_unit.class_name.fillna('').astype(str).str.lower().to_numpy()
+        free &= (req_class[:, None] == '') | (req_class[:, None] == unit_class[None, :])
+
+    return df_req \
+        .assign(
+            units=[list(units[row]) for row in free],
+            n_available=free.sum(axis=1))
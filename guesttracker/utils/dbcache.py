@@ -0,0 +1,406 @@
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import *
+
+import pandas as pd
+
+from guesttracker import functions as f
+from guesttracker import getlog
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ModuleNotFoundError:
+    pa = None
+    feather = None
+
+log = getlog(__name__)
+
+"""
+Versioned in-memory cache for dataframes loaded from the database
+- Each entry can be linked to one or more db tables and stores a cheap server-side version stamp for them
+- Entries are trusted for `ttl` seconds, after which the stamp is re-checked before the entry is reused
+- If the stamp has changed (or can't be checked) the entry is dropped and the caller reloads it
+- Entries registered with snapshot=True are also written to disk (feather, or pickle if pyarrow not installed)
+    so they can be loaded at startup before the db is available, then revalidated in the background
+"""
+
+Stamp = Union[Tuple[tuple, ...], None]
+
+
+def obj_size(obj: Any) -> int:
+    """Approximate memory size of cached object in bytes"""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True).sum()) if isinstance(obj, pd.DataFrame) \
+            else int(obj.memory_usage(deep=True))
+
+    return sys.getsizeof(obj)
+
+
+class CacheEntry():
+    def __init__(
+            self,
+            name: str,
+            data: Any,
+            tables: List[str],
+            stamp: Stamp,
+            ttl: Union[float, None]):
+        """Single cached object
+
+        Parameters
+        ----------
+        name : str
+            cache key
+        data : Any
+            cached object, usually a dataframe
+        tables : List[str]
+            db tables the data was loaded from, used for version stamps
+        stamp : Stamp
+            version stamp of tables when data was loaded
+        ttl : Union[float, None]
+            seconds to trust entry before re-checking stamp, None = never expire
+        """
+        checked = time.time()
+        size = obj_size(data)
+        hits = 0
+        f.set_self(vars())
+
+    @property
+    def expired(self) -> bool:
+        """If entry is past its ttl and needs revalidation"""
+        return not self.ttl is None and time.time() - self.checked >= self.ttl
+
+    def touch(self) -> None:
+        """Reset ttl after stamp was revalidated"""
+        self.checked = time.time()
+
+
+class TableCache():
+    """LRU cache of dataframes with per-entry ttl and table version stamps"""
+
+    def __init__(
+            self,
+            probe: Callable[[List[str]], Stamp] = None,
+            default_ttl: Union[float, None] = 60,
+            max_entries: int = 64,
+            max_bytes: Union[int, None] = None,
+            p_snapshot: Union[Path, None] = None):
+        """
+        Parameters
+        ----------
+        probe : Callable[[List[str]], Stamp], optional
+            func to get current version stamp for list of tables, default None (ttl only)
+        default_ttl : Union[float, None], optional
+            default seconds before entry is revalidated, default 60
+        max_entries : int, optional
+            max entries before least recently used is evicted, default 64
+        max_bytes : Union[int, None], optional
+            max total memory of cached objects, default None (no limit)
+        p_snapshot : Union[Path, None], optional
+            folder to write on-disk snapshots of registered entries, default None (disabled)
+        """
+        entries = OrderedDict()  # type: OrderedDict[str, CacheEntry]
+        registry = {}  # type: Dict[str, Dict[str, Any]]
+        pending = {}  # type: Dict[str, Tuple[List[str], Stamp]]
+        hits, misses, revalidations, evictions = 0, 0, 0, 0
+        lock = threading.RLock()
+        f.set_self(vars())
+
+    def register(
+            self,
+            name: str,
+            tables: Union[str, List[str]] = None,
+            ttl: Union[float, None] = -1,
+            snapshot: bool = False) -> None:
+        """Set default tables/ttl for cache key so callers only need to pass name
+
+        Parameters
+        ----------
+        name : str
+        tables : Union[str, List[str]], optional
+            db tables name depends on
+        ttl : Union[float, None], optional
+            entry ttl, default -1 (use default_ttl)
+        snapshot : bool, optional
+            persist entry to disk when loaded, default False
+        """
+        self.registry[name] = dict(tables=f.as_list(tables or []), ttl=ttl, snapshot=snapshot)
+
+    def get_stamp(self, tables: List[str]) -> Stamp:
+        """Get version stamp for tables, None if no probe or probe failed"""
+        if not tables or self.probe is None:
+            return None
+
+        try:
+            return self.probe(tables)
+        except Exception as e:
+            log.warning(f'Failed to get version stamp for {tables}: {e}')
+            return None
+
+    def _is_valid(self, entry: CacheEntry) -> bool:
+        """Check if expired entry is still current by comparing its version stamp
+        - entry is kept if stamp can't be checked (eg db unreachable), only a changed stamp drops it
+        """
+        if not entry.tables or self.probe is None:
+            return False  # nothing to revalidate against, ttl only
+
+        with self.lock:
+            self.revalidations += 1
+
+        stamp = self.get_stamp(entry.tables)
+        return stamp is None or stamp == entry.stamp
+
+    def get(self, name: str, force: bool = False, tables: Union[str, List[str]] = None) -> Any:
+        """Return cached object or None if missing/stale
+
+        Parameters
+        ----------
+        name : str
+        force : bool, optional
+            drop existing entry and force reload, default False
+        tables : Union[str, List[str]], optional
+            tables to stamp on miss if name not registered, default None
+
+        Returns
+        -------
+        Any
+            cached object or None
+        """
+        # stamps are checked outside lock so a slow db round trip doesn't block other threads' cache hits
+        with self.lock:
+            entry = self.entries.get(name, None)
+            if not entry is None and force:
+                self.entries.pop(name)
+                entry = None
+
+        if not entry is None and entry.expired:
+            if self._is_valid(entry):
+                entry.touch()
+            else:
+                log.info(f'Cache entry stale: {name}')
+                with self.lock:
+                    if self.entries.get(name, None) is entry:
+                        self.entries.pop(name)
+
+                entry = None
+
+        if entry is None:
+            # get stamp before caller loads data so changes during load aren't missed
+            tables = f.as_list(tables or self.registry.get(name, {}).get('tables', []))
+            stamp = self.get_stamp(tables)
+
+            with self.lock:
+                self.misses += 1
+                self.pending[name] = (tables, stamp)
+
+            return None
+
+        with self.lock:
+            self.hits += 1
+            entry.hits += 1
+            if name in self.entries:
+                self.entries.move_to_end(name)
+
+        return entry.data
+
+    def put(
+            self,
+            name: str,
+            data: Any,
+            tables: Union[str, List[str]] = None,
+            ttl: Union[float, None] = -1) -> None:
+        """Add object to cache
+
+        Parameters
+        ----------
+        name : str
+        data : Any
+        tables : Union[str, List[str]], optional
+            db tables data was loaded from, default registered tables
+        ttl : Union[float, None], optional
+            default -1 (use registered or default ttl)
+        """
+        m = self.registry.get(name, {})
+        tables = f.as_list(tables or m.get('tables', []))
+
+        if ttl == -1:
+            ttl = m.get('ttl', -1)
+        if ttl == -1:
+            ttl = self.default_ttl
+
+        with self.lock:
+            pending = self.pending.pop(name, None)
+
+        # only use stamp from get's miss if it was taken for the same tables
+        if not pending is None and pending[0] == tables:
+            stamp = pending[1]
+        else:
+            stamp = self.get_stamp(tables)
+
+        with self.lock:
+            entry = CacheEntry(name=name, data=data, tables=tables, stamp=stamp, ttl=ttl)
+            self.entries[name] = entry
+            self.entries.move_to_end(name)
+            self.evict()
+
+        if m.get('snapshot', False):
+            self.write_snapshot(entry=entry)
+
+    def evict(self) -> None:
+        """Drop least recently used entries until under max entries/bytes"""
+        with self.lock:
+            while len(self.entries) > self.max_entries \
+                    or (not self.max_bytes is None and len(self.entries) > 1 and self.size > self.max_bytes):
+                name, _ = self.entries.popitem(last=False)
+                self.evictions += 1
+                log.info(f'Evicted cache entry: {name}')
+
+    def invalidate(self, name: str = None, table: str = None) -> None:
+        """Drop single entry, all entries depending on table, or all entries"""
+        with self.lock:
+            if not name is None:
+                self.entries.pop(name, None)
+            elif not table is None:
+                for k in [k for k, e in self.entries.items() if table in e.tables]:
+                    self.entries.pop(k)
+            else:
+                self.entries.clear()
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    @property
+    def snapshot_names(self) -> List[str]:
+        return [k for k, m in self.registry.items() if m.get('snapshot', False)]
+
+    def _p_snapshot(self, name: str) -> Path:
+        ext = 'feather' if not feather is None else 'pkl'
+        return self.p_snapshot / f'{name}.{ext}'
+
+    def write_snapshot(self, entry: CacheEntry) -> None:
+        """Write entry data + version stamp to disk"""
+        if self.p_snapshot is None or not isinstance(entry.data, pd.DataFrame):
+            return
+
+        p = self._p_snapshot(entry.name)
+
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+
+            if not feather is None:
+                feather.write_feather(pa.Table.from_pandas(entry.data), p)
+            else:
+                entry.data.to_pickle(p)
+
+            stamp = list(entry.stamp) if not entry.stamp is None else None
+            with open(p.with_suffix('.json'), 'w') as file:
+                json.dump(dict(tables=entry.tables, stamp=stamp, saved=time.time()), file)
+
+        except Exception as e:
+            log.warning(f'Failed to write snapshot "{entry.name}": {e}')
+
+    def read_snapshot(self, name: str) -> bool:
+        """Load single snapshot from disk into cache (memory mapped if feather)
+
+        Returns
+        -------
+        bool
+            if snapshot loaded
+        """
+        p = self._p_snapshot(name)
+        p_meta = p.with_suffix('.json')
+
+        if not (p.exists() and p_meta.exists()):
+            return False
+
+        try:
+            with open(p_meta, 'r') as file:
+                m = json.load(file)
+
+            if not feather is None:
+                df = feather.read_table(p, memory_map=True).to_pandas()
+            else:
+                df = pd.read_pickle(p)
+
+        except Exception as e:
+            log.warning(f'Failed to read snapshot "{name}": {e}')
+            return False
+
+        stamp = tuple(tuple(item) for item in m['stamp']) if not m['stamp'] is None else None
+        ttl = self.registry.get(name, {}).get('ttl', -1)
+
+        with self.lock:
+            if not name in self.entries:
+                self.entries[name] = CacheEntry(
+                    name=name,
+                    data=df,
+                    tables=m['tables'],
+                    stamp=stamp,
+                    ttl=self.default_ttl if ttl == -1 else ttl)
+
+        return True
+
+    def load_snapshots(self) -> List[str]:
+        """Load all registered snapshots from disk
+
+        Returns
+        -------
+        List[str]
+            names of snapshots loaded
+        """
+        if self.p_snapshot is None:
+            return []
+
+        names = [name for name in self.snapshot_names if self.read_snapshot(name)]
+        log.info(f'Loaded snapshots: {names}')
+        return names
+
+    def stale_entries(self, names: List[str] = None) -> List[str]:
+        """Check version stamps of entries (eg loaded from snapshot) and drop any which have changed
+
+        Parameters
+        ----------
+        names : List[str], optional
+            default all entries with tables
+
+        Returns
+        -------
+        List[str]
+            names of entries dropped
+        """
+        with self.lock:
+            entries = [e for e in self.entries.values() if e.tables and (names is None or e.name in names)]
+
+        stale = []
+        for entry in entries:
+            if self._is_valid(entry):
+                entry.touch()
+            else:
+                self.invalidate(name=entry.name)
+                stale.append(entry.name)
+
+        return stale
+
+    @property
+    def size(self) -> int:
+        """Total approximate size of cached objects in bytes"""
+        return sum(e.size for e in self.entries.values())
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counters and per-entry info"""
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            revalidations=self.revalidations,
+            evictions=self.evictions,
+            size=self.size,
+            entries={k: dict(hits=e.hits, size=e.size, age=round(time.time() - e.checked, 1))
+                     for k, e in self.entries.items()})
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
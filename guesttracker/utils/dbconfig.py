@@ -5,6 +5,8 @@ from typing import Dict, List, TypedDict
 
 import pandas as pd
 
+from guesttracker.utils.availindex import AvailabilityIndex
+
 # TODO add validation funcs here?
 
 
@@ -36,31 +38,34 @@ table_data: Dict[str, TDItem] = defaultdict(
 
 def set_unit_availability(
         df_unit: pd.DataFrame,
-        df_res: pd.DataFrame,
         date_arrival: dt,
-        date_departure: dt) -> pd.DataFrame:
+        date_departure: dt,
+        df_res: pd.DataFrame = None,
+        index: AvailabilityIndex = None) -> pd.DataFrame:
     """Add "reserved" column to unit df based on all previous reservations (excluding cancellations)
+    - any stay overlapping the requested nights counts, including stays fully inside the range
 
     Parameters
     ----------
     df_unit : pd.DataFrame
-    df_res : pd.DataFrame
-        df with reservations split into units and dates
     date_arrival : dt
     date_departure : dt
+    df_res : pd.DataFrame, optional
+        df with reservations split into units and dates, used if index not passed
+    index : AvailabilityIndex, optional
+        prebuilt index, reuse for repeated checks (eg on every date change), default None
 
     Returns
     -------
     pd.DataFrame
     """
-    # check wether each unit is available for the given dates
-    df_res = df_res \
-        .assign(reserved=lambda x:
-                ((date_arrival >= x.arrival_date) &
-                 (date_arrival < x.departure_date)) |
-                ((date_departure > x.arrival_date) &
-                    (date_departure <= x.departure_date))) \
-        .query('reserved == True')
+    if date_arrival is None or date_departure is None:
+        return df_unit.assign(reserved=False)
+
+    if index is None:
+        index = AvailabilityIndex(df_res=df_res)
+
+    reserved = index.reserved_units(d_lower=date_arrival, d_upper=date_departure)
 
     return df_unit \
-        .assign(reserved=lambda x: x.abbr.isin(df_res.unit.unique()))
+        .assign(reserved=lambda x: x.abbr.isin(reserved))
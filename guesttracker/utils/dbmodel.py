@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    BigInteger, Boolean, Column, Float, ForeignKeyConstraint,
+    BigInteger, Boolean, Column, Date, Float, ForeignKeyConstraint, Index,
     PrimaryKeyConstraint, String)
 from sqlalchemy.dialects.mssql import DATETIME2
 from sqlalchemy.orm import declarative_base, relationship
@@ -126,6 +126,8 @@ class Reservations(Base):
 
     customer = relationship('Customers', foreign_keys=[customer_id], back_populates='Reservations')
     Charges = relationship('Charges', back_populates='reservation')
+    ReservationUnits = relationship(
+        'ReservationUnits', back_populates='reservation', cascade='all, delete-orphan', passive_deletes=True)
 
 
 class Units(Base):
@@ -145,6 +147,7 @@ class Units(Base):
     class_ = relationship('Classes', back_populates='Units')
     Charges = relationship('Charges', back_populates='unit')
     PackageUnits = relationship('PackageUnits', back_populates='unit')
+    ReservationUnits = relationship('ReservationUnits', back_populates='unit')
 
 
 class Charges(Base):
@@ -201,3 +204,61 @@ class PackageUnits(Base):
 
     package = relationship('Packages', back_populates='PackageUnits')
     unit = relationship('Units', back_populates='PackageUnits')
+
+
+class ReservationUnits(Base):
+    __tablename__ = 'ReservationUnits'
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ['reservation_id'], ['Reservations.uid'], ondelete='CASCADE', name='FK__ReservationUnits__reservation'),
+        ForeignKeyConstraint(['unit_id'], ['Units.uid'], name='FK__ReservationUnits__unit'),
+        PrimaryKeyConstraint('reservation_id', 'unit_id', name='PK__ReservationUnits'),
+        Index('IX__ReservationUnits__dates', 'arrival_date', 'departure_date'),
+        Index('IX__ReservationUnits__unit_dates', 'unit_id', 'arrival_date', 'departure_date')
+    )
+
+    reservation_id = Column(String(36, 'SQL_Latin1_General_CP1_CI_AS'))
+    unit_id = Column(String(36, 'SQL_Latin1_General_CP1_CI_AS'))
+    arrival_date = Column(DATETIME2)
+    departure_date = Column(DATETIME2)
+
+    reservation = relationship('Reservations', back_populates='ReservationUnits')
+    unit = relationship('Units', back_populates='ReservationUnits')
+
+
+class FolioSummary(Base):
+    """Charges totals per (reservation, customer), maintained by triggers on Charges (see data.charges)
+    - null keys stored as '' so they can be part of the primary key"""
+    __tablename__ = 'FolioSummary'
+    __table_args__ = (
+        PrimaryKeyConstraint('reservation_id', 'customer_id', name='PK__FolioSummary'),
+        Index('IX__FolioSummary__customer', 'customer_id')
+    )
+
+    reservation_id = Column(String(36, 'SQL_Latin1_General_CP1_CI_AS'))
+    customer_id = Column(String(36, 'SQL_Latin1_General_CP1_CI_AS'))
+    n_charges = Column(BigInteger, nullable=False)
+    total_amount = Column(Float(53), nullable=False)
+    total_tax1 = Column(Float(53), nullable=False)
+    total_tax2 = Column(Float(53), nullable=False)
+    discount = Column(Float(53), nullable=False)
+
+
+class RevenueDaily(Base):
+    """Charges totals per (charge day, account, package, kind), maintained by triggers on Charges (see data.charges)
+    - null keys stored as '' (or -1 for kind) so they can be part of the primary key"""
+    __tablename__ = 'RevenueDaily'
+    __table_args__ = (
+        PrimaryKeyConstraint('charge_day', 'account_id', 'package_id', 'kind', name='PK__RevenueDaily'),
+    )
+
+    charge_day = Column(Date)
+    account_id = Column(String(36, 'SQL_Latin1_General_CP1_CI_AS'))
+    package_id = Column(String(36, 'SQL_Latin1_General_CP1_CI_AS'))
+    kind = Column(BigInteger)
+    n_charges = Column(BigInteger, nullable=False)
+    quantity = Column(BigInteger, nullable=False)
+    total_amount = Column(Float(53), nullable=False)
+    total_tax1 = Column(Float(53), nullable=False)
+    total_tax2 = Column(Float(53), nullable=False)
+    discount = Column(Float(53), nullable=False)
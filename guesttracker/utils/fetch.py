@@ -0,0 +1,198 @@
+import datetime
+import decimal
+import time
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+from guesttracker import getlog
+
+try:
+    import pyarrow as pa
+except ModuleNotFoundError:
+    pa = None
+
+if TYPE_CHECKING:
+    from pyodbc import Cursor
+
+log = getlog(__name__)
+
+"""
+Helpers to read query results from raw dbapi cursors
+- Used for streaming large results in chunks instead of materializing with pd.read_sql
+- backend='arrow' builds each column in a single typed conversion (pyarrow if installed, else numpy)
+    instead of pandas building the frame row by row
+"""
+
+backends = ('pandas', 'arrow')
+
+# pyodbc cursor.description type_code > arrow type
+m_arrow_types = {
+    str: 'string',
+    int: 'int64',
+    float: 'float64',
+    bool: 'bool_',
+    datetime.datetime: 'timestamp',
+    datetime.date: 'date32',
+}
+
+# pyodbc cursor.description type_code > numpy dtype (no nulls, has nulls) for fallback without pyarrow
+# matches pd.read_sql, eg int column is int64 unless it has nulls
+m_np_types = {
+    int: ('int64', 'float64'),
+    float: ('float64', 'float64'),
+    decimal.Decimal: ('float64', 'float64'),
+    bool: ('bool', object),
+    datetime.datetime: ('datetime64[ns]', 'datetime64[ns]'),
+}
+
+
+def check_backend(backend: str) -> None:
+    if not backend in backends:
+        raise ValueError(f'Incorrect fetch backend "{backend}", must be in {backends}')
+
+
+def cursor_cols(cursor: 'Cursor') -> List[str]:
+    """Get column names from executed cursor"""
+    return [c[0] for c in cursor.description]
+
+
+def rows_to_df(rows: List[tuple], cols: List[str]) -> pd.DataFrame:
+    """Convert list of row tuples from cursor to df"""
+    # coerce_float to match pd.read_sql (decimal > float)
+    return pd.DataFrame.from_records([tuple(row) for row in rows], columns=cols, coerce_float=True)
+
+
+def _arrow_type(type_code: type) -> Union['pa.DataType', None]:
+    name = m_arrow_types.get(type_code, None)
+    if name is None:
+        return None  # let arrow infer, eg decimal
+
+    return pa.timestamp('us') if name == 'timestamp' else getattr(pa, name)()
+
+
+def rows_to_df_columnar(rows: List[tuple], description: List[tuple]) -> pd.DataFrame:
+    """Convert rows from cursor to df by transposing once and converting each column to a typed array
+    - String columns use arrow-backed string dtype if pyarrow installed
+
+    Parameters
+    ----------
+    rows : List[tuple]
+    description : List[tuple]
+        cursor.description
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    names = [c[0] for c in description]
+    type_codes = [c[1] for c in description]
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+
+    if not pa is None:
+        arrays = []
+        for values, type_code in zip(columns, type_codes):
+            arr = pa.array(values, type=_arrow_type(type_code), from_pandas=True)
+
+            if pa.types.is_decimal(arr.type):
+                arr = arr.cast(pa.float64())
+
+            arrays.append(arr)
+
+        return pa.Table.from_arrays(arrays, names=names) \
+            .to_pandas(types_mapper={pa.string(): pd.StringDtype('pyarrow')}.get)
+
+    m = {}
+    for name, values, type_code in zip(names, columns, type_codes):
+        dtypes = m_np_types.get(type_code, (object, object))
+        dtype = dtypes[any(v is None for v in values)]
+
+        if dtype == 'float64':
+            values = [np.nan if v is None else v for v in values]
+
+        try:
+            m[name] = np.array(values, dtype=dtype)
+        except (TypeError, ValueError, OverflowError):
+            m[name] = np.array(values, dtype=object)
+
+    return pd.DataFrame(m, columns=names)
+
+
+def iter_cursor(cursor: 'Cursor', chunksize: int = 50000, backend: str = 'pandas') -> Iterator[pd.DataFrame]:
+    """Yield dfs of max chunksize rows from executed cursor with fetchmany
+    - empty result yields a single empty df with result cols
+
+    Parameters
+    ----------
+    cursor : Cursor
+        cursor which has already executed query
+    chunksize : int, optional
+        rows per chunk, default 50000
+    backend : str, optional
+        pandas | arrow, default 'pandas'
+
+    Yields
+    ------
+    Iterator[pd.DataFrame]
+    """
+    check_backend(backend)
+    cols = cursor_cols(cursor)
+    first = True
+
+    while True:
+        rows = cursor.fetchmany(chunksize)
+        if not rows and not first:
+            break
+
+        if backend == 'arrow':
+            yield rows_to_df_columnar(rows=rows, description=cursor.description)
+        else:
+            yield rows_to_df(rows=rows, cols=cols)
+
+        if not rows:
+            break
+
+        first = False
+
+
+def read_cursor(cursor: 'Cursor', backend: str = 'arrow') -> pd.DataFrame:
+    """Read all rows from executed cursor to single df"""
+    check_backend(backend)
+    rows = cursor.fetchall()
+
+    if backend == 'arrow':
+        return rows_to_df_columnar(rows=rows, description=cursor.description)
+
+    return rows_to_df(rows=rows, cols=cursor_cols(cursor))
+
+
+def compare_backends(sql: str, n: int = 3) -> pd.DataFrame:
+    """Time reading sql with pd.read_sql vs arrow backend
+
+    Parameters
+    ----------
+    sql : str
+    n : int, optional
+        repeats per backend, default 3
+
+    Returns
+    -------
+    pd.DataFrame
+        df of min/mean seconds, rows, cols per backend
+    """
+    from guesttracker.database import db
+
+    m = {}
+    for backend in backends:
+        times = []
+        for _ in range(n):
+            start = time.perf_counter()
+            df = db.read_sql(sql=sql, backend=backend)
+            times.append(time.perf_counter() - start)
+
+        m[backend] = dict(min=min(times), mean=np.mean(times), rows=len(df), cols=len(df.columns))
+
+    df = pd.DataFrame.from_dict(m, orient='index')
+    log.info(f'Fetch backends:\n{df}')
+    return df
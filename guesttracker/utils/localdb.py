@@ -0,0 +1,191 @@
+import re
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+from typing import *
+
+import pandas as pd
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.mssql import DATETIME2
+from sqlalchemy.ext.compiler import compiles
+
+from guesttracker import config as cf
+from guesttracker import getlog
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine.base import Engine
+
+log = getlog(__name__)
+
+"""
+Local sqlite stand-in for the mssql database
+- Select with env var GT_DB_BACKEND=sqlite (db path GT_LOCAL_DB, default p_applocal/localdb/guesttracker.db)
+- Schema is built from utils.dbmodel, seed with utils.synthetic
+- MSSQL syntax from MSSQLQuery/raw sql is translated (TOP > LIMIT, ISNULL, COUNT_BIG, DATEDIFF(day, ..)) and
+    common scalar functions are registered on each connection
+- NOTE table-valued functions (eg tblHrsInPeriod, period_range) are not shimmed, queries using them fail on sqlite
+"""
+
+COLLATIONS = ('SQL_Latin1_General_CP1_CI_AS', )
+
+_expr_top = re.compile(r'\bSELECT\s+(DISTINCT\s+)?TOP\s*\(?\s*(\d+)\s*\)?\s+', re.IGNORECASE)
+_expr_hints = re.compile(r'\s+WITH\s*\((NOLOCK|HOLDLOCK)\)', re.IGNORECASE)
+_expr_datepart = re.compile(r'\b(DATEDIFF|DATEPART|DATEADD)\(\s*(\w+)\s*,', re.IGNORECASE)
+
+_replace = (
+    (re.compile(r'\bISNULL\(', re.IGNORECASE), 'IFNULL('),
+    (re.compile(r'\bCOUNT_BIG\(', re.IGNORECASE), 'COUNT('),
+    (re.compile(r'\bGETDATE\(\)', re.IGNORECASE), 'CURRENT_TIMESTAMP'))
+
+
+@compiles(DATETIME2, 'sqlite')
+def _compile_datetime2(type_, compiler, **kw) -> str:
+    return 'DATETIME'
+
+
+def translate_sql(sql: str) -> str:
+    """Translate mssql specific syntax to sqlite
+    - only first TOP is translated, LIMIT is appended to end of statement
+
+    Parameters
+    ----------
+    sql : str
+
+    Returns
+    -------
+    str
+    """
+    match = _expr_top.search(sql)
+    if match:
+        distinct, n = match.groups()
+        sql = _expr_top.sub(f'SELECT {distinct or ""}', sql, count=1).rstrip().rstrip(';') + f' LIMIT {n}'
+
+    sql = _expr_hints.sub('', sql)
+    sql = _expr_datepart.sub(lambda m: f"{m.group(1)}('{m.group(2).lower()}',", sql)
+
+    for expr, repl in _replace:
+        sql = expr.sub(repl, sql)
+
+    return sql
+
+
+def _to_dt(val: Any) -> Union[datetime, None]:
+    if val is None or isinstance(val, datetime):
+        return val
+
+    return datetime.fromisoformat(str(val))
+
+
+def _datediff(part: str, d1: Any, d2: Any) -> Union[int, None]:
+    d1, d2 = _to_dt(d1), _to_dt(d2)
+    if d1 is None or d2 is None:
+        return None
+
+    if part in ('year', 'yy', 'yyyy'):
+        return d2.year - d1.year
+    elif part in ('month', 'mm', 'm'):
+        return (d2.year - d1.year) * 12 + d2.month - d1.month
+    elif part in ('hour', 'hh'):
+        return int((d2 - d1).total_seconds() // 3600)
+    elif part in ('minute', 'mi', 'n'):
+        return int((d2 - d1).total_seconds() // 60)
+    elif part in ('second', 'ss', 's'):
+        return int((d2 - d1).total_seconds())
+
+    return (d2.date() - d1.date()).days
+
+
+def _datepart(part: str, d: Any) -> Union[int, None]:
+    d = _to_dt(d)
+    if d is None:
+        return None
+
+    if part in ('iso_week', 'isowk', 'week', 'wk'):
+        return d.isocalendar()[1]
+
+    return getattr(d, dict(yy='year', mm='month', dd='day', hh='hour').get(part, part))
+
+
+def _isnumeric(val: Any) -> int:
+    try:
+        float(val)
+        return 1
+    except (TypeError, ValueError):
+        return 0
+
+
+def _collate_ci(a: str, b: str) -> int:
+    a, b = a.lower(), b.lower()
+    return (a > b) - (a < b)
+
+
+# name: (n_args, func), n_args=-1 for variadic
+FUNCTIONS = dict(
+    DATEDIFF=(3, _datediff),
+    DATEPART=(2, _datepart),
+    MONTH=(1, lambda d: _datepart('month', d)),
+    YEAR=(1, lambda d: _datepart('year', d)),
+    DAY=(1, lambda d: _datepart('day', d)),
+    DATEFROMPARTS=(3, lambda y, m, d: date(y, m, d).isoformat() if not None in (y, m, d) else None),
+    LEN=(1, lambda s: len(s.rstrip()) if not s is None else None),
+    LEFT=(2, lambda s, n: s[:n] if not s is None else None),
+    ISNUMERIC=(1, _isnumeric),
+    CONCAT=(-1, lambda *args: ''.join('' if a is None else str(a) for a in args)))
+
+
+def _on_connect(conn: sqlite3.Connection, conn_record: Any) -> None:
+    """Register shims + pragmas on each new sqlite connection"""
+    for name in COLLATIONS:
+        conn.create_collation(name, _collate_ci)
+
+    for name, (n_args, func) in FUNCTIONS.items():
+        conn.create_function(name, n_args, func, deterministic=True)
+
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')  # concurrent readers while worker writes
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany) -> Tuple[str, Any]:
+    return translate_sql(statement), parameters
+
+
+# store datetimes as iso strings, convert back when reading DATETIME columns
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(' '))
+sqlite3.register_adapter(pd.Timestamp, lambda d: d.isoformat(' '))  # adapters match exact type only
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_converter('DATETIME', lambda b: datetime.fromisoformat(b.decode()))
+
+
+def create_engine_local(p: Path = None, create_schema: bool = True) -> 'Engine':
+    """Create sqlite engine with mssql shims
+
+    Parameters
+    ----------
+    p : Path, optional
+        db file, default cf.p_localdb
+    create_schema : bool, optional
+        create any missing dbmodel tables, default True
+
+    Returns
+    -------
+    Engine
+    """
+    p = Path(p or cf.p_localdb)
+    p.parent.mkdir(parents=True, exist_ok=True)
+
+    engine = create_engine(
+        f'sqlite:///{p}',
+        connect_args=dict(check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30))
+
+    event.listen(engine, 'connect', _on_connect)
+    event.listen(engine, 'before_cursor_execute', _before_execute, retval=True)
+
+    if create_schema:
+        from guesttracker.utils import dbmodel as dbm
+        dbm.Base.metadata.create_all(engine)
+
+    log.info(f'Using local sqlite db: {p}')
+    return engine
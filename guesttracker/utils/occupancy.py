@@ -0,0 +1,195 @@
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+from guesttracker import getlog
+from guesttracker.utils.availindex import DateLike, days_array, to_day
+
+log = getlog(__name__)
+
+"""
+Units x nights occupancy matrix for calendar views and bulk occupancy stats
+- matrix[i, j] = 1 if unit i is occupied on night j (nights = [arrival day, departure day), same as AvailabilityIndex)
+- built in one vectorised pass: +1 at each stay's first night, -1 after its last, cumsum along dates
+- a full season for a few hundred units is < 100kb as uint8 (or 1/8 of that with `packed`)
+
+Examples
+--------
+>>> from guesttracker.utils.occupancy import OccupancyMatrix
+>>> occ = OccupancyMatrix.from_db(d_lower=dt(2022, 5, 1), d_upper=dt(2022, 10, 1))
+>>> occ.occupancy_rate(by='class')
+>>> occ.gaps(max_nights=2)  # orphan nights between bookings
+"""
+
+
+class OccupancyMatrix():
+    def __init__(
+            self,
+            df_res: pd.DataFrame,
+            df_unit: pd.DataFrame,
+            d_lower: DateLike,
+            d_upper: DateLike):
+        """
+        Parameters
+        ----------
+        df_res : pd.DataFrame
+            non-cancelled reservations, one row per unit, cols unit, arrival_date, departure_date
+        df_unit : pd.DataFrame
+            units to include (rows of matrix), cols abbr, class_name
+        d_lower : DateLike
+            first night
+        d_upper : DateLike
+            end of range (exclusive), eg 2022-10-01 for nights up to 2022-09-30
+        """
+        d0, d1 = to_day(d_lower), to_day(d_upper)
+        if d1 <= d0:
+            raise ValueError(f'd_upper must be after d_lower: {d_lower}, {d_upper}')
+
+        units = df_unit.abbr.to_numpy()
+        classes = df_unit.class_name.to_numpy() if 'class_name' in df_unit.columns else np.full(len(units), None)
+        dates = pd.date_range(pd.Timestamp(d_lower).normalize(), periods=d1 - d0, freq='D')
+
+        self.units, self.classes, self.dates = units, classes, dates
+        self.matrix = self.build_matrix(df_res=df_res, units=units, d0=d0, d1=d1)
+
+    @classmethod
+    def from_db(cls, d_lower: DateLike, d_upper: DateLike, active_only: bool = True, **kw) -> 'OccupancyMatrix':
+        """Build matrix from all non-cancelled reservations and units in db
+
+        Parameters
+        ----------
+        active_only : bool, optional
+            only include active units, default True
+        """
+        from guesttracker.database import db
+        df_unit = db.get_df_unit(active_only=active_only, **kw) \
+            .sort_values(['class_name', 'abbr'])
+
+        return cls(df_res=db.get_df_reservations(**kw), df_unit=df_unit, d_lower=d_lower, d_upper=d_upper)
+
+    @staticmethod
+    def build_matrix(df_res: pd.DataFrame, units: np.ndarray, d0: int, d1: int) -> np.ndarray:
+        """Vectorised units x nights matrix (uint8) from stays, overlapping stays count once"""
+        n_units, n_days = len(units), d1 - d0
+        df = df_res.dropna(subset=['unit', 'arrival_date', 'departure_date'])
+
+        m_unit = pd.Series(np.arange(n_units), index=units)
+        iunit = df.unit.map(m_unit).to_numpy()
+
+        # clip stays to range, drop stays outside range or on units not in matrix
+        start = np.clip(days_array(df.arrival_date) - d0, 0, n_days)
+        end = np.clip(days_array(df.departure_date) - d0, 0, n_days)
+        mask = ~pd.isnull(iunit) & (start < end)
+        iunit, start, end = iunit[mask].astype(np.int64), start[mask], end[mask]
+
+        # +1 at first night, -1 after last night, flattened to 1d for bincount (much faster than np.add.at)
+        width = n_days + 1
+        size = n_units * width
+        diff = np.bincount(iunit * width + start, minlength=size) \
+            - np.bincount(iunit * width + end, minlength=size)
+
+        counts = diff.reshape(n_units, width)[:, :-1].cumsum(axis=1)
+        return (counts > 0).astype(np.uint8)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.matrix.shape
+
+    @property
+    def packed(self) -> np.ndarray:
+        """Matrix packed to bits along dates axis"""
+        return np.packbits(self.matrix, axis=1)
+
+    def to_df(self) -> pd.DataFrame:
+        """Calendar df, index unit, cols dates"""
+        return pd.DataFrame(self.matrix, index=pd.Index(self.units, name='unit'), columns=self.dates)
+
+    def nights_sold(self, by: str = 'class') -> pd.Series:
+        """Occupied nights in range
+
+        Parameters
+        ----------
+        by : str, optional
+            class | unit | date, default 'class'
+
+        Returns
+        -------
+        pd.Series
+        """
+        if by == 'date':
+            return pd.Series(self.matrix.sum(axis=0), index=self.dates, name='nights')
+
+        s = pd.Series(self.matrix.sum(axis=1), index=self.units, name='nights')
+
+        if by == 'unit':
+            return s.rename_axis('unit')
+        elif by == 'class':
+            return s.groupby(self.classes).sum().rename_axis('class_name')
+        else:
+            raise ValueError(f'by must be in (class, unit, date), not "{by}"')
+
+    def occupancy_rate(self, by: str = None) -> Union[float, pd.Series]:
+        """Fraction of available unit nights occupied
+
+        Parameters
+        ----------
+        by : str, optional
+            None (overall) | class | unit | date | pandas offset alias eg 'W', 'M', default None
+
+        Returns
+        -------
+        Union[float, pd.Series]
+        """
+        if self.matrix.size == 0:
+            return np.nan
+
+        if by is None:
+            return float(self.matrix.mean())
+        elif by in ('class', 'unit'):
+            n_units = pd.Series(1, index=self.units).groupby(self.classes).sum() if by == 'class' else 1
+            return (self.nights_sold(by=by) / (n_units * len(self.dates))).rename('occupancy')
+
+        s = pd.Series(self.matrix.mean(axis=0), index=self.dates, name='occupancy')
+        return s if by == 'date' else s.resample(by).mean()
+
+    def gaps(self, min_nights: int = 1, max_nights: int = None, bounded: bool = True) -> pd.DataFrame:
+        """Runs of free nights per unit
+
+        Parameters
+        ----------
+        min_nights : int, optional
+            default 1
+        max_nights : int, optional
+            eg 2 to find hard to sell orphan nights between bookings, default None
+        bounded : bool, optional
+            only gaps with bookings on both sides (not at start/end of range), default True
+
+        Returns
+        -------
+        pd.DataFrame
+            df with cols unit, class_name, start, end (exclusive), nights
+        """
+        free = 1 - self.matrix.astype(np.int8)
+        edges = np.diff(np.pad(free, ((0, 0), (1, 1))), axis=1)
+
+        # row-major order, so starts/ends pair up per unit
+        iunit, istart = np.nonzero(edges == 1)
+        _, iend = np.nonzero(edges == -1)
+        nights = iend - istart
+
+        mask = nights >= min_nights
+        if not max_nights is None:
+            mask &= nights <= max_nights
+        if bounded:
+            mask &= (istart > 0) & (iend < len(self.dates))
+
+        iunit, istart, iend = iunit[mask], istart[mask], iend[mask]
+        dates = self.dates.append(pd.DatetimeIndex([self.dates[-1] + pd.Timedelta(days=1)]))
+
+        return pd.DataFrame(dict(
+            unit=self.units[iunit],
+            class_name=self.classes[iunit],
+            start=dates[istart],
+            end=dates[iend],
+            nights=iend - istart))
@@ -0,0 +1,207 @@
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import *
+
+import pandas as pd
+
+from guesttracker import functions as f
+from guesttracker import getlog
+
+log = getlog(__name__)
+
+"""
+In-process query instrumentation
+- DB records every sql execution (source, sql fingerprint, wall time, rows, bytes, cache hit) in a ring buffer
+- summary() gives count/percentiles per source or fingerprint, dump() writes raw records + summary to csv
+"""
+
+_expr_str = re.compile(r"N?'(?:[^']|'')*'")
+_expr_num = re.compile(r'\b\d+(?:\.\d+)?\b')
+_expr_ws = re.compile(r'\s+')
+_expr_list = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+def normalize_sql(sql: str) -> str:
+    """Replace literals with ? and collapse whitespace so queries with different values group together"""
+    sql = _expr_str.sub('?', sql)
+    sql = _expr_num.sub('?', sql)
+    sql = _expr_list.sub('(?)', sql)  # isin lists of any length
+    return _expr_ws.sub(' ', sql).strip().lower()
+
+
+def fingerprint(sql: str) -> str:
+    """Short stable hash of normalized sql"""
+    return hashlib.md5(normalize_sql(sql).encode()).hexdigest()[:10]
+
+
+def df_bytes(df: Any) -> int:
+    """Shallow memory size of result (deep=True is too slow to run on every query)"""
+    if isinstance(df, pd.DataFrame):
+        return int(df.memory_usage(index=False, deep=False).sum())
+
+    return 0
+
+
+class QueryStats():
+    def __init__(self, maxlen: int = 5000, enabled: bool = True):
+        """Ring buffer of query execution records
+
+        Parameters
+        ----------
+        maxlen : int, optional
+            max records kept, oldest dropped first, default 5000
+        enabled : bool, optional
+            default True
+        """
+        records = deque(maxlen=maxlen)  # type: Deque[Dict[str, Any]]
+        lock = threading.Lock()
+        f.set_self(vars())
+
+    def record(
+            self,
+            source: str,
+            sql: str,
+            secs: float,
+            rows: int = None,
+            nbytes: int = None,
+            cache_hit: bool = False) -> None:
+        """Add single execution record
+
+        Parameters
+        ----------
+        source : str
+            query class or db method
+        sql : str
+        secs : float
+            wall time
+        rows : int, optional
+        nbytes : int, optional
+            result size in bytes
+        cache_hit : bool, optional
+            result served from cache, default False
+        """
+        if not self.enabled:
+            return
+
+        sql = str(sql)
+        m = dict(
+            timestamp=time.time(),
+            source=source,
+            fingerprint=fingerprint(sql),
+            sql=normalize_sql(sql)[:500],
+            secs=secs,
+            rows=rows,
+            bytes=nbytes,
+            cache_hit=cache_hit,
+            thread=threading.current_thread().name)
+
+        with self.lock:
+            self.records.append(m)
+
+    @contextmanager
+    def timer(self, source: str, sql: str, cache_hit: bool = False) -> Iterator[Dict[str, Any]]:
+        """Time block and record, set rows/result in yielded dict
+
+        Examples
+        --------
+        >>> with query_stats.timer(source='Charges', sql=sql) as m:
+                m['result'] = df = read(sql)
+        """
+        m = dict(result=None, rows=None, cache_hit=cache_hit)
+        start = time.perf_counter()
+
+        try:
+            yield m
+        finally:
+            result = m['result']
+            rows = m['rows']
+            if rows is None and isinstance(result, pd.DataFrame):
+                rows = len(result)
+
+            self.record(
+                source=source,
+                sql=sql,
+                secs=time.perf_counter() - start,
+                rows=rows,
+                nbytes=df_bytes(result),
+                cache_hit=m['cache_hit'])
+
+    def to_df(self) -> pd.DataFrame:
+        with self.lock:
+            records = list(self.records)
+
+        df = pd.DataFrame(records, columns=[
+            'timestamp', 'source', 'fingerprint', 'sql', 'secs', 'rows', 'bytes', 'cache_hit', 'thread'])
+
+        return df.assign(timestamp=lambda x: pd.to_datetime(x.timestamp, unit='s'))
+
+    def summary(self, by: Union[str, List[str]] = 'source', percentiles: Tuple[float, ...] = (0.5, 0.9, 0.99)) \
+            -> pd.DataFrame:
+        """Count, total + percentile wall times, rows, bytes, cache hit rate
+
+        Parameters
+        ----------
+        by : Union[str, List[str]], optional
+            group cols eg source | fingerprint | ['source', 'fingerprint'], default 'source'
+        percentiles : Tuple[float, ...], optional
+            default (0.5, 0.9, 0.99)
+
+        Returns
+        -------
+        pd.DataFrame
+            sorted by total secs descending
+        """
+        df = self.to_df()
+        if df.empty:
+            return df
+
+        grp = df.groupby(by)
+        df_sum = grp.agg(
+            count=('secs', 'size'),
+            total_secs=('secs', 'sum'),
+            rows=('rows', 'sum'),
+            bytes=('bytes', 'sum'),
+            cache_hit_rate=('cache_hit', 'mean'))
+
+        df_pct = grp['secs'].quantile(list(percentiles)).unstack()
+        df_pct.columns = [f'p{int(p * 100)}' for p in df_pct.columns]
+
+        return df_sum.join(df_pct).sort_values('total_secs', ascending=False)
+
+    def dump(self, p: Path) -> Tuple[Path, Path]:
+        """Write raw records + summary to csv
+
+        Parameters
+        ----------
+        p : Path
+            folder to write to
+
+        Returns
+        -------
+        Tuple[Path, Path]
+            raw csv, summary csv
+        """
+        p.mkdir(parents=True, exist_ok=True)
+        ts = time.strftime('%Y-%m-%d_%H-%M-%S')
+        p_raw, p_sum = p / f'querystats_{ts}.csv', p / f'querystats_summary_{ts}.csv'
+
+        self.to_df().to_csv(p_raw, index=False)
+        self.summary(by=['source', 'fingerprint']).to_csv(p_sum)
+
+        log.info(f'Dumped {len(self.records)} query records to: {p}')
+        return p_raw, p_sum
+
+    def clear(self) -> None:
+        with self.lock:
+            self.records.clear()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+query_stats = QueryStats()
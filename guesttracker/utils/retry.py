@@ -0,0 +1,253 @@
+import random
+import socket
+import threading
+import time
+from typing import *
+
+from sqlalchemy import exc
+
+from guesttracker import errors as er
+from guesttracker import functions as f
+from guesttracker import getlog
+
+log = getlog(__name__)
+
+"""
+Retry policy + circuit breaker for db operations
+- Errors are classified as transient (connection dropped, timeout, deadlock, azure throttling) or not
+- Transient errors are retried with jittered exponential backoff, others are raised immediately
+- CircuitBreaker opens after repeated transient failures and fails fast (no network wait) until reset_timeout,
+    then lets calls through again to test the connection
+"""
+
+# SQLSTATE classes/codes which are safe to retry
+TRANSIENT_SQLSTATES = {
+    '08001',  # unable to connect
+    '08003',  # connection does not exist
+    '08004',  # server rejected connection
+    '08007',  # connection failure during transaction
+    '08S01',  # communication link failure
+    'HYT00',  # timeout expired
+    'HYT01',  # connection timeout expired
+    '40001',  # deadlock victim
+}
+
+# sql server/azure native error numbers which are transient (throttling, failover)
+TRANSIENT_ERRORS = {'1205', '4060', '4221', '10053', '10054', '10060', '10928', '10929', '40197', '40501',
+                    '40613', '49918', '49919', '49920'}
+
+
+def get_sqlstate(e: Exception) -> Union[str, None]:
+    """Get SQLSTATE from pyodbc error (or sqlalchemy wrapped pyodbc error)"""
+    if isinstance(e, exc.DBAPIError):
+        e = e.orig
+
+    args = getattr(e, 'args', ())
+    if args and isinstance(args[0], str) and len(args[0]) == 5:
+        return args[0]
+
+    return None
+
+
+def is_transient(e: Exception) -> bool:
+    """Check if error is likely temporary (connection/timeout) and safe to retry"""
+    if isinstance(e, (socket.error, ConnectionError, TimeoutError, exc.TimeoutError)):
+        return True
+
+    if isinstance(e, exc.DBAPIError) and e.connection_invalidated:
+        return True
+
+    if isinstance(e, exc.InvalidRequestError) and 'invalid transaction' in str(e):
+        return True  # session needs rollback after previous disconnect
+
+    if get_sqlstate(e) in TRANSIENT_SQLSTATES:
+        return True
+
+    msg = str(e)
+    if 'database is locked' in msg:
+        return True  # local sqlite backend, writer holding lock
+
+    return any(f'({code})' in msg for code in TRANSIENT_ERRORS)
+
+
+class RetryPolicy():
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0):
+        """Exponential backoff with full jitter
+
+        Parameters
+        ----------
+        max_attempts : int, optional
+            total attempts including first call, default 3
+        base_delay : float, optional
+            delay before first retry (before jitter), default 0.25
+        max_delay : float, optional
+            cap on delay between attempts, default 4.0
+        """
+        f.set_self(vars())
+
+    def delay(self, attempt: int) -> float:
+        """Random delay before next attempt, attempt starts at 1"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker():
+    def __init__(self, name: str = 'db', failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """Fail fast while server is unreachable
+
+        Parameters
+        ----------
+        name : str, optional
+            name for logging, default 'db'
+        failure_threshold : int, optional
+            consecutive transient failures before opening, default 3
+        reset_timeout : float, optional
+            seconds to stay open before allowing calls through again, default 30
+        """
+        failures = 0
+        opened = None  # type: float
+        lock = threading.Lock()
+        f.set_self(vars())
+
+    @property
+    def state(self) -> str:
+        """closed | open | half_open"""
+        if self.opened is None:
+            return 'closed'
+
+        return 'open' if self.retry_in > 0 else 'half_open'
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until open breaker allows calls again"""
+        if self.opened is None:
+            return 0.0
+
+        return max(0.0, self.reset_timeout - (time.time() - self.opened))
+
+    def check(self) -> None:
+        """Raise DatabaseUnavailableError if breaker open"""
+        if self.state == 'open':
+            raise er.DatabaseUnavailableError(
+                message=f'Circuit breaker "{self.name}" open.',
+                retry_in=self.retry_in)
+
+    def record_success(self) -> None:
+        with self.lock:
+            if not self.opened is None:
+                log.info(f'Circuit breaker "{self.name}" closed.')
+
+            self.failures, self.opened = 0, None
+
+    def record_failure(self) -> bool:
+        """Record transient failure, return True if breaker is now open"""
+        with self.lock:
+            self.failures += 1
+
+            # half_open trial failed, or too many failures
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    log.warning(f'Circuit breaker "{self.name}" opened after {self.failures} failures.')
+
+                self.opened = time.time()
+                return True
+
+            return False
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+class RetryStats():
+    def __init__(self):
+        """Counters for retried db calls"""
+        calls, retries, recovered, exhausted, fast_fails, non_transient = 0, 0, 0, 0, 0, 0
+        lock = threading.Lock()
+        f.set_self(vars())
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def to_dict(self) -> Dict[str, int]:
+        keys = ('calls', 'retries', 'recovered', 'exhausted', 'fast_fails', 'non_transient')
+        return {k: getattr(self, k) for k in keys}
+
+
+def call_with_retry(
+        func: Callable,
+        policy: RetryPolicy = None,
+        breaker: CircuitBreaker = None,
+        stats: RetryStats = None,
+        on_retry: Callable[[Exception], None] = None,
+        expected_exceptions: Tuple[Type[Exception], ...] = ()) -> Any:
+    """Call func, retrying transient errors with backoff
+
+    Parameters
+    ----------
+    func : Callable
+        func with no args (use functools.partial)
+    policy : RetryPolicy, optional
+        default RetryPolicy()
+    breaker : CircuitBreaker, optional
+        checked before each attempt, default None
+    stats : RetryStats, optional
+        counters to update, default None
+    on_retry : Callable[[Exception], None], optional
+        called before sleeping for retry, eg reset connection/rollback, default None
+    expected_exceptions : Tuple[Type[Exception], ...], optional
+        always re-raised immediately, default ()
+
+    Returns
+    -------
+    Any
+        result of func
+
+    Raises
+    ------
+    er.DatabaseUnavailableError
+        if breaker open
+    """
+    policy = policy or RetryPolicy()
+    stats = stats or RetryStats()
+    stats.incr('calls')
+
+    for attempt in range(1, policy.max_attempts + 1):
+        if not breaker is None:
+            try:
+                breaker.check()
+            except er.DatabaseUnavailableError:
+                stats.incr('fast_fails')
+                raise
+
+        try:
+            result = func()
+        except Exception as e:
+            if isinstance(e, expected_exceptions) or not is_transient(e):
+                # server responded, connection itself is fine
+                stats.incr('non_transient')
+                if not breaker is None:
+                    breaker.record_success()
+                raise
+
+            opened = breaker.record_failure() if not breaker is None else False
+
+            if attempt >= policy.max_attempts or opened:
+                stats.incr('exhausted')
+                raise
+
+            delay = policy.delay(attempt)
+            log.warning(f'Transient db error (attempt {attempt}, retry in {delay:.2f}s): {type(e).__name__}: {e}')
+            stats.incr('retries')
+
+            if not on_retry is None:
+                on_retry(e)
+
+            time.sleep(delay)
+        else:
+            if not breaker is None:
+                breaker.record_success()
+
+            if attempt > 1:
+                stats.incr('recovered')
+
+            return result
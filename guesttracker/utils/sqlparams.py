@@ -0,0 +1,201 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import *
+
+import pandas as pd
+from pypika.terms import ValueWrapper
+
+from guesttracker import getlog
+
+if TYPE_CHECKING:
+    from pyodbc import Connection, Cursor
+    from pypika.queries import QueryBuilder
+
+log = getlog(__name__)
+
+"""
+Parameterised sql from pypika queries
+- Wrap filter values in Param, then render the query inside collect_params() to get sql with "?"
+    placeholders + list of values in the order they appear in the sql
+- Outside collect_params(), Param renders as a normal literal so str(query) is unchanged
+- StatementCache keeps one cursor per sql shape so pyodbc can reuse the prepared statement
+"""
+
+_local = threading.local()
+MAX_LIST_PARAMS = 500
+
+
+class Param(ValueWrapper):
+    """Query value rendered as "?" placeholder while collecting params"""
+
+    def __init__(self, value: Any, alias: Union[str, None] = None):
+        # numpy scalars > python types for pyodbc
+        if hasattr(value, 'item') and not isinstance(value, (list, tuple, str)):
+            value = value.item()
+
+        super().__init__(value, alias=alias)
+
+    def get_value_sql(self, **kw) -> str:
+        params = getattr(_local, 'params', None)
+        if params is None:
+            return super().get_value_sql(**kw)
+
+        params.append(self.value)
+        return '?'
+
+
+def as_param(val: Any) -> Union[Param, List[Param], list]:
+    """Wrap single value or list of values in Param
+    - long lists (eg isin with many units) are left as literals to stay under sql server's 2100 param limit
+    """
+    if isinstance(val, (list, tuple)):
+        if len(val) > MAX_LIST_PARAMS:
+            return list(val)
+
+        return [Param(v) for v in val]
+
+    return Param(val)
+
+
+@contextmanager
+def collect_params() -> Iterator[list]:
+    """Collect Param values rendered inside this context"""
+    _local.params = []
+    try:
+        yield _local.params
+    finally:
+        _local.params = None
+
+
+def literal_sql(term: Any) -> str:
+    """Render query/criterion with literal values even while collecting params (eg for dict keys, saving sql)"""
+    params = getattr(_local, 'params', None)
+    _local.params = None
+    try:
+        return str(term)
+    finally:
+        _local.params = params
+
+
+def get_sql_params(q: Union['QueryBuilder', str]) -> Tuple[str, list]:
+    """Render query to sql with placeholders + list of param values
+
+    Parameters
+    ----------
+    q : Union[QueryBuilder, str]
+        pypika query, or sql string (no params)
+
+    Returns
+    -------
+    Tuple[str, list]
+        sql, params
+    """
+    if isinstance(q, str):
+        return q, []
+
+    with collect_params() as params:
+        sql = q.get_sql()
+
+    return sql, list(params)
+
+
+class StatementCache():
+    """Per-thread LRU of cursors keyed by sql text
+    - pyodbc only re-prepares a statement when a cursor's sql text changes, so keeping one cursor per
+        query shape lets repeated executions with different params reuse the prepared handle
+    - results are always fully read before returning so cursors on the same connection don't block each other
+    """
+
+    def __init__(
+            self,
+            get_conn: Callable[[], 'Connection'],
+            maxsize: int = 32,
+            translate: Callable[[str], str] = None):
+        self.get_conn = get_conn
+        self.translate = translate
+        self.maxsize = maxsize
+        self.hits, self.misses = 0, 0
+        self.generation = 0
+        self.local = threading.local()
+
+    @property
+    def cursors(self) -> 'OrderedDict[str, Cursor]':
+        if getattr(self.local, 'generation', None) != self.generation:
+            self.clear()
+
+        if not hasattr(self.local, 'cursors'):
+            self.local.conn = self.get_conn()
+            self.local.cursors = OrderedDict()
+            self.local.generation = self.generation
+
+        return self.local.cursors
+
+    def cursor(self, sql: str) -> 'Cursor':
+        """Get cached cursor for sql shape or create new"""
+        cursors = self.cursors
+        cursor = cursors.get(sql, None)
+
+        if cursor is None:
+            self.misses += 1
+            cursor = self.local.conn.cursor()
+            cursors[sql] = cursor
+
+            if len(cursors) > self.maxsize:
+                _, old = cursors.popitem(last=False)
+                old.close()
+        else:
+            self.hits += 1
+            cursors.move_to_end(sql)
+
+        return cursor
+
+    def execute(self, sql: str, params: list = None) -> 'Cursor':
+        try:
+            # params passed as single sequence, works for pyodbc and sqlite3
+            sql_exec = self.translate(sql) if not self.translate is None else sql
+            return self.cursor(sql).execute(sql_exec, *([params] if params else []))
+        except Exception:
+            # connection may be dead, drop everything for this thread
+            self.clear()
+            raise
+
+    def fetchval(self, sql: str, params: list = None) -> Any:
+        """Execute and return first value of first row"""
+        cursor = self.execute(sql, params)
+        row = cursor.fetchone()
+        cursor.fetchall()  # discard remaining rows
+        return row[0] if not row is None else None
+
+    def read_df(self, sql: str, params: list = None, backend: str = 'pandas') -> pd.DataFrame:
+        """Execute and read all rows to df"""
+        from guesttracker.utils import fetch
+        cursor = self.execute(sql, params)
+        return fetch.read_cursor(cursor=cursor, backend=backend)
+
+    def clear(self) -> None:
+        """Close all cursors and connection for current thread"""
+        if not hasattr(self.local, 'cursors'):
+            return
+
+        for cursor in self.local.cursors.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+        try:
+            self.local.conn.close()
+        except Exception:
+            pass
+
+        del self.local.cursors
+        del self.local.conn
+
+    def reset(self) -> None:
+        """Force all threads to open new connection on next use (eg after engine reset)"""
+        self.generation += 1
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(hits=self.hits, misses=self.misses)
@@ -0,0 +1,425 @@
+import math
+import uuid
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+from guesttracker import dt
+from guesttracker import functions as f
+from guesttracker import getlog
+
+log = getlog(__name__)
+
+"""
+Deterministic synthetic data for HBA tables (dbmodel), for load testing/benchmarks
+- Same seed + cardinalities always produce identical rows (including uids)
+- Foreign keys are always valid, tables are written parents first
+- Reservations never double book a unit: units are split into groups which each have a sequential timeline,
+    each reservation takes 1-3 units of its group (unit_assignments = "A1, A2")
+- Charges are generated per chunk of reservations so 1M+ rows don't need to be held in memory
+
+Examples
+--------
+>>> from guesttracker.utils.synthetic import SyntheticData
+>>> SyntheticData(seed=0, scale=0.1).write()
+"""
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Chris', 'Karen']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Wilson', 'Anderson',
+              'Taylor', 'Thomas', 'Moore', 'Martin', 'Jackson', 'Thompson', 'White', 'Lee', 'Clark', 'Lewis']
+CITIES = [('Calgary', 'AB', 'Canada'), ('Edmonton', 'AB', 'Canada'), ('Vancouver', 'BC', 'Canada'),
+          ('Toronto', 'ON', 'Canada'), ('Seattle', 'WA', 'USA'), ('Denver', 'CO', 'USA'), ('London', None, 'UK')]
+CLASS_NAMES = ['Cabin', 'Chalet', 'Suite', 'Room', 'Lodge', 'Tent', 'RV Site', 'Cottage']
+CHARGE_ITEMS = [('Firewood', 8.0), ('Breakfast', 18.0), ('Dinner', 42.0), ('Canoe Rental', 35.0),
+                ('Late Checkout', 25.0), ('Pet Fee', 20.0), ('Guided Hike', 60.0), ('Laundry', 6.0)]
+
+# reservation status codes
+STATUS_BOOKED = 0
+STATUS_CANCELLED = 1
+
+# charge kinds
+KIND_ROOM = 0
+KIND_ITEM = 1
+KIND_PAYMENT = 2
+
+# write order respecting foreign keys
+TABLES = ['Accounts', 'Classes', 'Units', 'Customers', 'ChargeItems', 'Packages', 'PackageUnits', 'Reservations',
+          'ReservationUnits', 'Charges']
+
+
+class SyntheticData():
+    def __init__(
+            self,
+            seed: int = 0,
+            scale: float = 1.0,
+            n_customers: int = 20_000,
+            n_units: int = 60,
+            n_reservations: int = 200_000,
+            n_charges: int = 1_000_000,
+            d_lower: dt = dt(2012, 1, 1),
+            d_upper: dt = dt(2025, 12, 31),
+            group_size: int = 3,
+            chunksize: int = 20_000):
+        """
+        Parameters
+        ----------
+        seed : int, optional
+            random seed, default 0
+        scale : float, optional
+            multiplier for customer/reservation/charge counts, default 1.0
+        n_customers : int, optional
+            default 20_000
+        n_units : int, optional
+            min number of units, increased if needed to fit n_reservations without double booking, default 60
+        n_reservations : int, optional
+            default 200_000
+        n_charges : int, optional
+            approximate total charges, default 1_000_000
+        d_lower : dt, optional
+            first arrival date, default 2012-01-01
+        d_upper : dt, optional
+            last departure date, default 2025-12-31
+        group_size : int, optional
+            units per booking group (max units per reservation), default 3
+        chunksize : int, optional
+            reservations per generated charges chunk, default 20_000
+        """
+        n_customers = max(1, int(n_customers * scale))
+        n_reservations = max(1, int(n_reservations * scale))
+        n_charges = int(n_charges * scale)
+        mean_nights = 3.5
+        n_days = (d_upper - d_lower).days
+
+        # each group's timeline must fit its reservations (avg stay + min 1 night gap)
+        n_groups = max(math.ceil(n_units / group_size),
+                       math.ceil(n_reservations * (mean_nights + 1) / (n_days * 0.9)))
+
+        if n_groups * group_size > n_units:
+            log.info(f'Increasing n_units {n_units} > {n_groups * group_size} to fit {n_reservations} reservations')
+            n_units = n_groups * group_size
+
+        dfs = {}  # type: Dict[str, pd.DataFrame]
+        f.set_self(vars())
+
+    def rng(self, *keys: int) -> np.random.Generator:
+        """Independent generator per table/chunk so output doesn't depend on generation order"""
+        return np.random.default_rng([self.seed, *keys])
+
+    def uids(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Deterministic uuid4 strings"""
+        raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+        return np.array([str(uuid.UUID(bytes=row.tobytes(), version=4)) for row in raw])
+
+    def get_df(self, name: str) -> pd.DataFrame:
+        """Get generated table (cached), Charges is generated in chunks with iter_charges"""
+        if not name in self.dfs:
+            self.dfs[name] = getattr(self, f'df_{name.lower()}')()
+
+        return self.dfs[name]
+
+    def df_accounts(self) -> pd.DataFrame:
+        rng = self.rng(1)
+        names = ['Accommodation', 'Food & Beverage', 'Activities', 'Retail', 'Deposits']
+        return pd.DataFrame(dict(
+            uid=self.uids(rng, len(names)),
+            name=names,
+            number=np.arange(4000, 4000 + len(names)),
+            tax_rate=0.05))
+
+    def df_classes(self) -> pd.DataFrame:
+        rng = self.rng(2)
+        return pd.DataFrame(dict(uid=self.uids(rng, len(CLASS_NAMES)), name=CLASS_NAMES))
+
+    def df_units(self) -> pd.DataFrame:
+        rng = self.rng(3)
+        n = self.n_units
+        df_class = self.get_df('Classes')
+
+        # all units in a booking group share class
+        group = np.arange(n) // self.group_size
+        class_idx = rng.integers(0, len(df_class), size=self.n_groups)[group]
+
+        return pd.DataFrame(dict(
+            uid=self.uids(rng, n),
+            name=[f'{CLASS_NAMES[c]} {i + 1}' for i, c in enumerate(class_idx)],
+            abbr=[f'{CLASS_NAMES[c][0]}{i + 1}' for i, c in enumerate(class_idx)],
+            max_persons=rng.choice([2, 4, 6, 8], size=n, p=[0.3, 0.4, 0.2, 0.1]),
+            active=rng.random(n) > 0.03,
+            class_id=df_class.uid.values[class_idx]))
+
+    def df_customers(self) -> pd.DataFrame:
+        rng = self.rng(4)
+        n = self.n_customers
+        first = rng.choice(FIRST_NAMES, size=n)
+        last = rng.choice(LAST_NAMES, size=n)
+        city = rng.integers(0, len(CITIES), size=n)
+        first_contact = self.d_lower + pd.to_timedelta(rng.integers(0, self.n_days, size=n), unit='D')
+
+        return pd.DataFrame(dict(
+            uid=self.uids(rng, n),
+            international=[CITIES[c][2] != 'Canada' for c in city],
+            relationship=rng.integers(0, 3, size=n),
+            company=None,
+            addr1=[f'{i} Main St' for i in rng.integers(1, 9999, size=n)],
+            city=[CITIES[c][0] for c in city],
+            state=[CITIES[c][1] for c in city],
+            zip=[f'T{i:05d}' for i in rng.integers(0, 99999, size=n)],
+            country=[CITIES[c][2] for c in city],
+            addr2=None,
+            home_phone=[f'403-555-{i:04d}' for i in rng.integers(0, 9999, size=n)],
+            work_phone=None,
+            alt_phone=None,
+            email=[f'{a.lower()}.{b.lower()}{i}@example.com' for i, (a, b) in enumerate(zip(first, last))],
+            notes=None,
+            first_contact=first_contact,
+            last_contact=first_contact + pd.to_timedelta(rng.integers(0, 720, size=n), unit='D'),
+            source=rng.choice(['web', 'phone', 'email', 'walk-in'], size=n),
+            name_first=first,
+            name_last=last,
+            name=[f'{a} {b}' for a, b in zip(first, last)]))
+
+    def df_chargeitems(self) -> pd.DataFrame:
+        rng = self.rng(5)
+        df_acct = self.get_df('Accounts')
+        price = np.array([p for _, p in CHARGE_ITEMS])
+
+        return pd.DataFrame(dict(
+            uid=self.uids(rng, len(CHARGE_ITEMS)),
+            name=[name for name, _ in CHARGE_ITEMS],
+            pre_tax_price=price,
+            tax_rate=0.05,
+            post_tax_price=(price * 1.05).round(2),
+            includes_tax=False,
+            account_id=df_acct.uid.values[rng.integers(1, 4, size=len(CHARGE_ITEMS))]))
+
+    def df_packages(self) -> pd.DataFrame:
+        rng = self.rng(6)
+        df_class = self.get_df('Classes')
+        n = len(df_class) * 2
+
+        return pd.DataFrame(dict(
+            uid=self.uids(rng, n),
+            name=[f'{c} {kind}' for c in df_class.name for kind in ('Standard', 'Peak')],
+            description=None,
+            rate=rng.integers(80, 450, size=n).astype(float),
+            account_id=self.get_df('Accounts').uid.values[0]))
+
+    def df_packageunits(self) -> pd.DataFrame:
+        """Each unit gets the Standard + Peak package for its class"""
+        rng = self.rng(7)
+        df_unit = self.get_df('Units')
+        df_pkg = self.get_df('Packages').assign(class_name=lambda x: x.name.str.rsplit(' ', n=1).str[0])
+        df_class = self.get_df('Classes').rename(columns=dict(uid='class_id', name='class_name'))
+
+        df = df_unit[['uid', 'class_id']].rename(columns=dict(uid='unit_id')) \
+            .merge(df_class, on='class_id') \
+            .merge(df_pkg[['uid', 'class_name']].rename(columns=dict(uid='package_id')), on='class_name') \
+            .sort_values(['unit_id', 'package_id'])
+
+        return df[['package_id', 'unit_id']] \
+            .assign(uid=self.uids(rng, len(df)))[['uid', 'package_id', 'unit_id']] \
+            .reset_index(drop=True)
+
+    def df_reservations(self) -> pd.DataFrame:
+        """Non-overlapping stays per unit group, lead time/stay length/cancellations from skewed distributions"""
+        rng = self.rng(8)
+        n, n_groups, size = self.n_reservations, self.n_groups, self.group_size
+        df_unit = self.get_df('Units')
+        abbrs = df_unit.abbr.values.reshape(n_groups, size)
+        max_persons = df_unit.max_persons.values.reshape(n_groups, size)
+
+        # split reservations across groups, each group gets a sequential timeline
+        group = np.sort(rng.integers(0, n_groups, size=n))
+        nights = np.minimum(1 + rng.geometric(1 / (self.mean_nights - 1), size=n), 21)
+
+        arrival = np.empty(n, dtype=np.int64)
+        for g, idx in pd.Series(np.arange(n)).groupby(group).groups.items():
+            idx = idx.values
+            free = max(self.n_days - nights[idx].sum() - len(idx), 0)
+            gaps = 1 + np.floor(free * rng.dirichlet(np.ones(len(idx) + 1))[:-1]).astype(np.int64)
+            arrival[idx] = np.cumsum(gaps + nights[idx]) - nights[idx]
+
+        # number of units per reservation, first k units from random order of group
+        p = np.array([0.75, 0.18, 0.07, 0.0, 0.0, 0.0])[:size]
+        k = rng.choice(np.arange(1, size + 1), size=n, p=p / p.sum())
+        order = np.argsort(rng.random((n, size)), axis=1)
+        unit_assignments = [
+            ', '.join(sorted(abbrs[g, order[i, :k[i]]])) for i, g in enumerate(group)]
+        persons_max = np.array([max_persons[g, order[i, :k[i]]].sum() for i, g in enumerate(group)])
+
+        d_arrival = self.d_lower + pd.to_timedelta(arrival, unit='D') + pd.Timedelta(hours=15)
+        nights_td = pd.to_timedelta(nights, unit='D')
+        lead = pd.to_timedelta(np.minimum(rng.exponential(45, size=n), 365).round(), unit='D')
+        date_made = d_arrival - lead - pd.to_timedelta(rng.integers(0, 86400, size=n), unit='s')
+
+        cancelled = rng.random(n) < 0.08
+        cancel_date = pd.Series(date_made + (lead * rng.random(n)).round('D')).where(cancelled)
+
+        deposit = (rng.integers(80, 450, size=n) * nights * 0.25).round(2)
+
+        df = pd.DataFrame(dict(
+            uid=self.uids(rng, n),
+            cancel_date=cancel_date.values,
+            status=np.where(cancelled, STATUS_CANCELLED, STATUS_BOOKED),
+            date_made=date_made,
+            arrival_date=d_arrival,
+            departure_date=d_arrival + nights_td - pd.Timedelta(hours=4),
+            num_persons=np.maximum(1, (persons_max * rng.uniform(0.4, 1, size=n)).round()).astype(int),
+            deposit_amount=deposit,
+            deposit_date=date_made + pd.Timedelta(days=1),
+            notes=None,
+            requests=None,
+            unit_assignments=unit_assignments,
+            customer_id=self.choose_customers(rng=rng, n=n)))
+
+        return df.sort_values('arrival_date').reset_index(drop=True)
+
+    def df_reservationunits(self) -> pd.DataFrame:
+        """Junction rows for each reservation's unit_assignments"""
+        from guesttracker.data.reservations import explode_units
+        return explode_units(df_res=self.get_df('Reservations'), df_unit=self.get_df('Units'))
+
+    def choose_customers(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Zipf-like repeat guests, small number of customers have many reservations"""
+        uids = self.get_df('Customers').uid.values
+        p = 1 / np.arange(1, len(uids) + 1) ** 0.8
+        return rng.choice(uids, size=n, p=p / p.sum())
+
+    def iter_charges(self) -> Iterator[pd.DataFrame]:
+        """Yield charges for each chunk of reservations
+        - one room charge per night, random item charges during stay, one payment per reservation
+        """
+        df_res = self.get_df('Reservations')
+        df_res = df_res[df_res.cancel_date.isnull()]
+        df_unit = self.get_df('Units')
+        df_item = self.get_df('ChargeItems')
+        df_pkg = self.get_df('Packages')
+        df_pkg_unit = self.get_df('PackageUnits')
+
+        # room charges use each unit's Standard package (units also have Peak)
+        df_pkg_unit = df_pkg_unit[df_pkg_unit.package_id.isin(df_pkg.uid[df_pkg.name.str.endswith(' Standard')])]
+        m_unit = dict(zip(df_unit.abbr, df_unit.uid))
+        m_pkg = dict(zip(df_pkg_unit.unit_id, df_pkg_unit.package_id))
+        m_rate = dict(zip(df_pkg.uid, df_pkg.rate))
+        acct_room, acct_payment = self.get_df('Accounts').uid.values[[0, 4]]
+
+        # scale item charges so total is close to n_charges
+        nights = (df_res.departure_date - df_res.arrival_date).dt.days + 1
+        n_units = df_res.unit_assignments.str.count(',') + 1
+        n_base = (nights * n_units).sum() + len(df_res)
+        lam_items = max(self.n_charges - n_base, 0) / max(len(df_res), 1)
+
+        for i_chunk, i in enumerate(range(0, len(df_res), self.chunksize)):
+            rng = self.rng(9, i_chunk)
+            df = df_res.iloc[i: i + self.chunksize]
+
+            # room charges, one row per unit per night
+            df_room = df[['uid', 'customer_id', 'arrival_date', 'departure_date', 'unit_assignments']] \
+                .assign(unit=lambda x: x.unit_assignments.str.split(', ')) \
+                .explode('unit') \
+                .assign(
+                    night=lambda x: [np.arange(n) for n in (x.departure_date - x.arrival_date).dt.days + 1]) \
+                .explode('night') \
+                .assign(
+                    unit_id=lambda x: x.unit.map(m_unit),
+                    package_id=lambda x: x.unit_id.map(m_pkg),
+                    charge_date=lambda x: x.arrival_date.dt.normalize() + pd.to_timedelta(
+                        x.night.astype(int), unit='D'),
+                    pre_tax_price=lambda x: x.package_id.map(m_rate),
+                    kind=KIND_ROOM,
+                    item='Nightly Rate',
+                    quantity=1,
+                    account_id=acct_room)
+
+            # random extra items during stay
+            n_items = rng.poisson(lam_items, size=len(df))
+            df_items = df.loc[df.index.repeat(n_items), ['uid', 'customer_id', 'arrival_date', 'departure_date',
+                                                         'unit_assignments']]
+            item_idx = rng.integers(0, len(df_item), size=len(df_items))
+            stay = (df_items.departure_date - df_items.arrival_date).values
+            df_items = df_items.assign(
+                unit_id=df_items.unit_assignments.str.split(', ').str[0].map(m_unit).values,
+                package_id=None,
+                charge_date=df_items.arrival_date + stay * rng.random(len(df_items)),
+                pre_tax_price=df_item.pre_tax_price.values[item_idx],
+                kind=KIND_ITEM,
+                item=df_item.name.values[item_idx],
+                quantity=rng.integers(1, 5, size=len(df_items)),
+                account_id=df_item.account_id.values[item_idx])
+
+            df_all = pd.concat([df_room, df_items]) \
+                .assign(
+                    total_amount=lambda x: (x.pre_tax_price * x.quantity).round(2),
+                    tax1_rate=0.05,
+                    tax2_rate=np.where(rng.random(len(df_room) + len(df_items)) < 0.5, 0.04, 0.0))
+
+            # one payment per reservation for total of charges
+            df_pay = df_all.groupby('uid', sort=False) \
+                .agg(customer_id=('customer_id', 'first'),
+                     departure_date=('departure_date', 'first'),
+                     total=('total_amount', 'sum')) \
+                .reset_index() \
+                .assign(
+                    charge_date=lambda x: x.departure_date,
+                    pre_tax_price=lambda x: -(x.total * 1.07).round(2),
+                    total_amount=lambda x: x.pre_tax_price,
+                    kind=KIND_PAYMENT,
+                    item='Payment',
+                    quantity=1,
+                    tax1_rate=0.0,
+                    tax2_rate=0.0,
+                    account_id=acct_payment,
+                    unit_id=None,
+                    package_id=None)
+
+            df_all = pd.concat([df_all, df_pay]) \
+                .rename(columns=dict(uid='reservation_id')) \
+                .assign(
+                    sub_kind=None,
+                    posting_date=lambda x: x.charge_date.dt.normalize() + pd.to_timedelta(
+                        rng.integers(0, 3, size=len(x)), unit='D'),
+                    post_tax_price=lambda x: (x.pre_tax_price * (1 + x.tax1_rate + x.tax2_rate)).round(2),
+                    total_tax1=lambda x: (x.total_amount * x.tax1_rate).round(2),
+                    total_tax2=lambda x: (x.total_amount * x.tax2_rate).round(2),
+                    includes_tax=False,
+                    discount=0.0)
+
+            df_all.insert(0, 'uid', self.uids(rng, len(df_all)))
+            yield df_all[self.charges_cols]
+
+    @property
+    def charges_cols(self) -> List[str]:
+        return ['uid', 'kind', 'sub_kind', 'item', 'charge_date', 'posting_date', 'quantity', 'pre_tax_price',
+                'post_tax_price', 'total_amount', 'tax1_rate', 'tax2_rate', 'total_tax1', 'total_tax2',
+                'includes_tax', 'discount', 'customer_id', 'reservation_id', 'unit_id', 'account_id', 'package_id']
+
+    def write(self, tables: List[str] = None, chunksize: int = 10_000) -> Dict[str, int]:
+        """Write generated tables to db (parents first) with BulkUpsert
+        - existing rows (same primary keys) are ignored, so re-running with same seed is a no-op
+
+        Parameters
+        ----------
+        tables : List[str], optional
+            default all TABLES
+        chunksize : int, optional
+            rows per upsert round trip, default 10_000
+
+        Returns
+        -------
+        Dict[str, int]
+            rows inserted per table
+        """
+        from guesttracker.dbtransaction import BulkUpsert
+
+        tables = f.as_list(tables or TABLES)
+        m = {}
+
+        for name in [t for t in TABLES if t in tables]:
+            data = self.iter_charges() if name == 'Charges' else self.get_df(name)
+            result = BulkUpsert(table=name, chunksize=chunksize).upsert(data=data)
+            m[name] = result['inserted']
+            log.info(f'Synthetic {name}: {result}')
+
+        return m
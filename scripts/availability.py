@@ -0,0 +1,63 @@
+"""
+Command line script to check available units for one or more date ranges
+
+>>> python -m scripts.availability --range 2022-07-01 2022-07-04 --range 2022-07-08 2022-07-10 --persons 4
+>>> python -m scripts.availability --requests requests.csv  # cols arrival_date, departure_date, persons, class_name
+"""
+
+import argparse
+
+import pandas as pd
+
+from guesttracker import getlog
+from guesttracker.utils.availindex import batch_free_units
+
+log = getlog(__name__)
+
+CLI = argparse.ArgumentParser()
+CLI.add_argument(
+    '--range',
+    nargs=2,
+    action='append',
+    metavar=('ARRIVAL', 'DEPARTURE'),
+    default=[],
+    help='Date range to check eg 2022-07-01 2022-07-04, can be passed multiple times')
+
+CLI.add_argument(
+    '--requests',
+    type=str,
+    default=None,
+    help='csv of requests with cols arrival_date, departure_date, [persons], [class_name]')
+
+CLI.add_argument(
+    '--persons',
+    type=int,
+    default=None,
+    help='Min unit max_persons for all --range requests')
+
+CLI.add_argument(
+    '--class_name',
+    type=str,
+    default=None,
+    help='Unit class for all --range requests eg Cabin')
+
+if __name__ == '__main__':
+    a = CLI.parse_args()
+
+    if a.requests:
+        df_req = pd.read_csv(a.requests, parse_dates=['arrival_date', 'departure_date'])
+    elif a.range:
+        df_req = pd.DataFrame(a.range, columns=['arrival_date', 'departure_date']) \
+            .assign(
+                arrival_date=lambda x: pd.to_datetime(x.arrival_date),
+                departure_date=lambda x: pd.to_datetime(x.departure_date),
+                persons=a.persons,
+                class_name=a.class_name)
+    else:
+        CLI.error('Pass at least one --range or --requests csv')
+
+    df = batch_free_units(df_req=df_req) \
+        .assign(units=lambda x: x.units.str.join(', '))
+
+    with pd.option_context('display.max_colwidth', None, 'display.width', 200):
+        print(df.to_string(index=False))
@@ -4,9 +4,9 @@ Command line script to import fault, haul, or fix dls folders
 
 import argparse
 
-import guesttracker.data.internal.plm as plm
 from guesttracker import delta, dt, getlog
-from guesttracker.data.internal.utils import FileProcessor
+from guesttracker.data.internal.utils import FileProcessor, all_units
+from guesttracker.database import db
 
 log = getlog(__name__)
 
@@ -34,13 +34,20 @@ CLI.add_argument(
 CLI.add_argument(  # process units in 5 batches of 10
     '--batch',
     type=int,
-    default=None)
+    default=None,
+    help='Batch number (1-5) of 10 units to process')
 
 CLI.add_argument(
     '--startdate',
     type=str,
     default=None)
 
+CLI.add_argument(
+    '--force',
+    default=False,
+    action='store_true',
+    help='Reprocess plm/fault files already recorded in the import manifest')
+
 CLI.add_argument(
     '--minesite',
     type=str,
@@ -51,6 +58,29 @@ CLI.add_argument(
     type=str,
     default=None)
 
+CLI.add_argument(
+    '--no-resume',
+    dest='resume',
+    default=True,
+    action='store_false',
+    help='Discard plm unit checkpoints left by a failed run and start units from the beginning')
+
+
+def get_units(units: list, rng: list, batch: int, minesite: str = None, model: str = None, batchsize: int = 10) -> list:
+    """Units to process from cli args, default all FH units
+    - batch 1 = first 10 units, batch 2 = next 10 etc"""
+    if not units:
+        if not minesite is None:
+            units = db.unique_units(minesite=minesite, model=model)
+        else:
+            units = all_units(rng=tuple(int(n) for n in rng) if rng else None)
+
+    if batch:
+        units = units[(batch - 1) * batchsize: batch * batchsize]
+
+    return units
+
+
 if __name__ == '__main__':
     a = CLI.parse_args()
     units, ftype, rng, startdate, batch, = a.units, a.ftype, a.range, a.startdate, a.batch
@@ -62,11 +92,13 @@ if __name__ == '__main__':
 
     if ftype == 'dsc':
         # process all units >>> prp scripts.processfiles --ftype dsc --startdate 2021-08-01
-        FileProcessor(ftype=ftype, d_lower=d).process(units=units)
+        FileProcessor(ftype=ftype, d_lower=d, force=a.force).process(units=units)
     elif ftype == 'plm':
-        # TODO need to set up PLM with FileProcessor
-        raise NotImplementedError('PLM not set up yet!')
-        plm.update_plm_all_units(minesite=a.minesite, model=a.model)
+        # import new haulcycle files, resumes units left by a failed run
+        # >>> prp scripts.processfiles --ftype plm --batch 1 --startdate 2021-08-01
+        units = get_units(units=units, rng=rng, batch=batch, minesite=a.minesite, model=a.model)
+        fp = FileProcessor(ftype=ftype, d_lower=d, force=a.force)
+        fp.process_plm(lst=fp.collect_files(units=units), resume=a.resume)
     # else:
     #     log.info(f'ftype: {ftype}, units: {units}, startdate: {d}')
     #     utl.process_files(ftype=ftype, units=units, d_lower=d)
@@ -54,6 +54,32 @@ cli.add_argument(
     help='Update exchange password in db'
 )
 
+cli.add_argument(
+    '--synthetic',
+    type=float,
+    default=None,
+    nargs='?',
+    const=1.0,
+    help='Write synthetic HBA data to db at scale (1.0 = 200k reservations, 1M charges), use with GT_DB_BACKEND=sqlite')
+
+cli.add_argument(
+    '--migrate_reservation_units',
+    default=False,
+    action='store_true',
+    help='Create ReservationUnits table and backfill from Reservations.unit_assignments')
+
+cli.add_argument(
+    '--migrate_charge_summary',
+    default=False,
+    action='store_true',
+    help='Create Charges summary tables + triggers and backfill from existing charges')
+
+cli.add_argument(
+    '--seed',
+    type=int,
+    default=0,
+    help='Random seed for --synthetic')
+
 
 if __name__ == '__main__':
     a = cli.parse_args()
@@ -76,3 +102,15 @@ if __name__ == '__main__':
     elif a.update_exch_pw:
         from guesttracker.utils.credentials import CredentialManager
         CredentialManager('exchange', gui=False).update_password_db(password=a.update_exch_pw)
+
+    elif not a.synthetic is None:
+        from guesttracker.utils.synthetic import SyntheticData
+        SyntheticData(seed=a.seed, scale=a.synthetic).write()
+
+    elif a.migrate_reservation_units:
+        from guesttracker.data import reservations as rs
+        rs.migrate()
+
+    elif a.migrate_charge_summary:
+        from guesttracker.data import charges as chg
+        chg.migrate()
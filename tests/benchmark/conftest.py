@@ -0,0 +1,279 @@
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime as dt
+from datetime import timedelta as delta
+from pathlib import Path
+from typing import *
+
+import numpy as np
+import pytest
+
+"""
+Benchmark suite for data model, queries, imports and reports
+- Run with `make bench`, benchmarks are skipped unless GT_BENCH=1 is set
+- Runs against local sqlite stand-in db seeded with SyntheticData, plus synthetic plm/fault csv files
+- Median of timed rounds is compared to baselines.json, benchmark fails if slower than baseline * threshold
+- benchmarks without a baseline only report timings ('new'), run `make bench-save` on the reference machine to
+    record/update baselines.json
+
+Env vars
+--------
+GT_BENCH : set to 1 to run benchmarks
+GT_BENCH_SAVE : set to 1 to write current timings to baselines.json instead of checking
+GT_BENCH_THRESHOLD : max median / baseline median before failing, default 1.25
+GT_BENCH_SCALE : SyntheticData scale, default 0.01 (2k reservations, 10k charges)
+"""
+
+p_bench = Path(__file__).parent
+p_baselines = p_bench / 'baselines.json'
+
+THRESHOLD = float(os.getenv('GT_BENCH_THRESHOLD', 1.25))
+MIN_DELTA = 0.002  # ignore regressions smaller than this (seconds), timer noise
+SCALE = float(os.getenv('GT_BENCH_SCALE', 0.01))
+
+
+class BaselineStore():
+    """Load/save benchmark baselines and collect results for the session"""
+
+    def __init__(self, p: Path = p_baselines, threshold: float = THRESHOLD, save: bool = False):
+        self.p = p
+        self.threshold = threshold
+        self.save = save
+        self.baselines = json.loads(p.read_text()) if p.exists() else {}
+        self.results = {}  # type: Dict[str, Dict[str, float]]
+        self.regressions = []  # type: List[str]
+
+    def check(self, name: str, times: List[float]) -> Union[str, None]:
+        """Record timings and compare median to baseline
+
+        Returns
+        -------
+        Union[str, None]
+            regression message if slower than baseline * threshold
+        """
+        m = dict(
+            min=round(min(times), 5),
+            median=round(statistics.median(times), 5),
+            rounds=len(times))
+
+        self.results[name] = m
+        base = self.baselines.get(name, None)
+
+        if self.save or base is None:
+            return
+
+        ratio = m['median'] / base['median'] if base['median'] > 0 else 1.0
+        m['ratio'] = round(ratio, 2)
+
+        if ratio > self.threshold and m['median'] - base['median'] > MIN_DELTA:
+            msg = f'{name}: median {m["median"]:.4f}s vs baseline {base["median"]:.4f}s ({ratio:.2f}x)'
+            self.regressions.append(msg)
+            return msg
+
+    def write(self) -> None:
+        """Merge current results into baselines file"""
+        self.baselines |= {k: dict(min=m['min'], median=m['median']) for k, m in self.results.items()}
+        self.p.write_text(json.dumps(dict(sorted(self.baselines.items())), indent=4) + '\n')
+
+
+class Bench():
+    def __init__(self, name: str, store: BaselineStore):
+        self.name, self.store = name, store
+
+    def __call__(
+            self,
+            func: Callable,
+            *args,
+            rounds: int = 5,
+            warmup: int = 1,
+            setup: Callable = None,
+            **kw) -> Any:
+        """Time func over multiple rounds and check against baseline
+
+        Parameters
+        ----------
+        func : Callable
+        rounds : int, optional
+            timed rounds, default 5
+        warmup : int, optional
+            untimed rounds first (fill caches, lazy imports), default 1
+        setup : Callable, optional
+            called untimed before every round, eg to reset state mutated by func, default None
+
+        Returns
+        -------
+        Any
+            result of last call to func
+        """
+        times = []
+
+        for i in range(warmup + rounds):
+            if not setup is None:
+                setup()
+
+            start = time.perf_counter()
+            result = func(*args, **kw)
+
+            if i >= warmup:
+                times.append(time.perf_counter() - start)
+
+        msg = self.store.check(name=self.name, times=times)
+        if not msg is None:
+            pytest.fail(f'Benchmark regression, {msg}', pytrace=False)
+
+        return result
+
+
+def pytest_configure(config):
+    """Point guesttracker at temp local sqlite db, only when benchmarks will run
+    - must be set before guesttracker is imported (config reads backend at import)
+    """
+    if not os.getenv('GT_BENCH'):
+        return
+
+    p_tmp = Path(tempfile.mkdtemp(prefix='gt_bench_'))
+    config.add_cleanup(lambda: shutil.rmtree(p_tmp, ignore_errors=True))
+
+    os.environ.setdefault('GT_DB_BACKEND', 'sqlite')
+    os.environ.setdefault('GT_LOCAL_DB', str(p_tmp / 'bench.db'))
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+def pytest_collection_modifyitems(config, items):
+    skip = None
+
+    if not os.getenv('GT_BENCH'):
+        skip = pytest.mark.skip(reason='set GT_BENCH=1 to run benchmarks')
+    else:
+        from guesttracker import config as cf
+        if not cf.DB_BACKEND == 'sqlite':
+            skip = pytest.mark.skip(reason='benchmarks need sqlite backend, run tests/benchmark in its own session')
+
+    if skip is None:
+        return
+
+    for item in items:
+        if p_bench in Path(item.fspath).parents:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    store = getattr(config, '_gt_bench_store', None)
+    if store is None or not store.results:
+        return
+
+    tr = terminalreporter
+    tr.section('benchmarks')
+
+    for name, m in store.results.items():
+        ratio = f'{m["ratio"]:.2f}x' if 'ratio' in m else 'new'
+        tr.write_line(f'{name:<50} median {m["median"]:>9.4f}s  min {m["min"]:>9.4f}s  {ratio}')
+
+    if store.save:
+        store.write()
+        tr.write_line(f'Saved baselines: {store.p}')
+    elif store.regressions:
+        tr.write_line(f'{len(store.regressions)} regression(s) over {store.threshold}x baseline')
+
+    if not store.save and any(not 'ratio' in m for m in store.results.values()):
+        tr.write_line('Benchmarks marked "new" have no baseline, run `make bench-save` to record them')
+
+
+@pytest.fixture(scope='session')
+def bench_store(pytestconfig) -> BaselineStore:
+    store = BaselineStore(save=bool(os.getenv('GT_BENCH_SAVE')))
+    pytestconfig._gt_bench_store = store
+    return store
+
+
+@pytest.fixture
+def bench(request, bench_store) -> Bench:
+    """Timer named by test module + test, eg 'queries::charges_get_df'"""
+    module = request.module.__name__.split('.')[-1].replace('test_', '')
+    return Bench(name=f'{module}::{request.node.name.replace("test_", "")}', store=bench_store)
+
+
+@pytest.fixture(scope='session')
+def synth():
+    from guesttracker.utils.synthetic import SyntheticData
+    return SyntheticData(seed=0, scale=SCALE)
+
+
+@pytest.fixture(scope='session')
+def localdb(synth):
+    """Local sqlite db seeded with synthetic HBA tables"""
+    from guesttracker.database import db
+    synth.write()
+    return db
+
+
+@pytest.fixture(scope='session')
+def df_charges(localdb):
+    """Charges table as loaded for display"""
+    from guesttracker.queries.hba import Charges
+    return Charges()._get_df()
+
+
+def write_plm(p: Path, n: int, seed: int = 0) -> Path:
+    """Write synthetic plm haulcycle csv (8 header rows, column headers, data, 2 checksum rows)"""
+    rng = np.random.default_rng([seed, n])
+    d = dt(2020, 1, 1) + delta(days=int(rng.integers(0, 365)))
+    secs = np.cumsum(rng.integers(600, 1800, n))
+    cycle = rng.integers(300, 3000, n)
+
+    head = [
+        'Frame_SN:A30001', 'Cust_Unit:F301', 'Truck_Type:980E-4', 'Software_Version:1.0',
+        'Plm_Version:3', 'Date:01/01/20', 'Time:00:00:00', 'Checksum:0']
+    cols = ['Date', 'Time', 'Payload(Net)', 'Swingloads', 'Status Flag', 'Carry Back', 'TotalCycle Time',
+            'L-Haul Distance', 'L-Max Speed', 'E MaxSpeed', 'Max Sprung', 'Truck Type', 'Tare Sprung Weight',
+            'Payload Est.@Shovel(Net)', 'Quick Payload Estimate(Net)', 'Gross Payload']
+
+    lines = head + [','.join(cols)]
+    for i in range(n):
+        t = d + delta(seconds=int(secs[i]))
+        c = int(cycle[i])
+        lines.append(','.join([
+            f'{t:%m/%d/%y}', f'{t:%H:%M:%S}', f'{rng.uniform(250, 400):.1f}', str(rng.integers(3, 6)), '',
+            f'{rng.uniform(0, 5):.1f}', f'{c // 3600:02d}:{c % 3600 // 60:02d}:{c % 60:02d}',
+            f'{rng.uniform(1, 5):.2f}', f'{rng.uniform(20, 60):.1f}', f'{rng.uniform(20, 60):.1f}',
+            f'{rng.uniform(400, 600):.0f}', '980E', f'{rng.uniform(150, 200):.1f}',
+            f'{rng.uniform(250, 400):.1f}', f'{rng.uniform(250, 400):.1f}', f'{rng.uniform(400, 600):.1f}']))
+
+    lines += ['CHECKSUM,0', 'CHECKSUM,0']
+    p.write_text('\n'.join(lines) + '\n')
+    return p
+
+
+def write_fault(p: Path, n: int, seed: int = 0) -> Path:
+    """Write synthetic fault0 csv (28 header rows, then faults with "epoch|tz_offset" times)"""
+    rng = np.random.default_rng([seed, n, 1])
+    t0 = int(dt(2020, 1, 1).timestamp())
+    t_from = t0 + np.cumsum(rng.integers(60, 7200, n))
+    t_to = t_from + rng.integers(1, 600, n)
+    codes = rng.integers(1000, 9999, n)
+
+    lines = ['Fault Data', 'Machine Model,980E', 'Machine Type Minor Variation Code,-4',
+             'Machine Serial No,A30001', 'Engine Serial No,12345']
+    lines += [f'Header {i},' for i in range(len(lines), 28)]
+
+    for i in range(n):
+        lines.append(','.join([
+            'F301', f'#{codes[i]}', 'x', f'{t_from[i]}|-25200', 'x', f'{t_to[i]}|-25200', 'x',
+            str(rng.integers(1, 10)), f'Fault message {codes[i] % 50}']))
+
+    p.write_text('\n'.join(lines) + '\n')
+    return p
+
+
+@pytest.fixture(scope='session')
+def p_files(tmp_path_factory) -> Dict[str, List[Path]]:
+    """Synthetic import files, 20 each of plm haulcycle and fault csvs"""
+    p = tmp_path_factory.mktemp('files')
+
+    return dict(
+        plm=[write_plm(p / f'haulcycle_{i}.csv', n=2000, seed=i) for i in range(20)],
+        fault=[write_fault(p / f'fault0_{i}.csv', n=2000, seed=i) for i in range(20)])
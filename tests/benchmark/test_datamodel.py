@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip('PyQt6')
+
+from PyQt6.QtCore import Qt  # noqa
+
+
+@pytest.fixture(scope='module')
+def model(localdb):
+    from guesttracker.gui import _global as gbl
+    from guesttracker.gui import tables as tbls
+
+    gbl.get_qt_app()
+    table_widget = tbls.HBATableWidget(name='Charges')
+    return table_widget.view.data_model
+
+
+@pytest.fixture(scope='module')
+def df(model, df_charges):
+    model.set_df(df_charges)
+    return df_charges
+
+
+def test_set_df(bench, model, df):
+    bench(model.set_df, df=df)
+    assert model.rowCount() == len(df)
+
+
+def test_sort(bench, model, df):
+    icol = df.columns.get_loc('Total Amount')
+    bench(model.sort, icol, Qt.SortOrder.DescendingOrder)
+    assert model.df['Total Amount'].is_monotonic_decreasing
+
+
+def test_filter(bench, model, df):
+    icol = df.columns.get_loc('Customer Name')
+    bench(model.filter, icol, 'smith', setup=model.reset_filter)
+    assert 0 < len(model.df) < len(df)
+
+
+def test_search(bench, model, df):
+    model.reset_filter()
+    result = bench(model.search, 'smith')
+    assert len(result) > 0
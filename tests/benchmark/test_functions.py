@@ -0,0 +1,21 @@
+import pytest  # noqa
+
+from guesttracker import functions as f
+
+
+def test_df_to_strings(bench, df_charges):
+    from guesttracker.queries.hba import Charges
+    formats = Charges().formats
+
+    df = bench(f.df_to_strings, df=df_charges, formats=formats)
+    assert df.shape == df_charges.shape
+
+
+def test_df_to_color(bench, df_charges):
+    def highlight(val, role):
+        return 'red' if val < 0 else None
+
+    highlight_funcs = {'Total Amount': highlight, 'Quantity': highlight}
+
+    df = bench(f.df_to_color, df=df_charges, highlight_funcs=highlight_funcs, role=None)
+    assert df.shape == df_charges.shape
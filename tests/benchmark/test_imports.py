@@ -0,0 +1,32 @@
+import pytest  # noqa
+
+from guesttracker.data.internal import faults
+from guesttracker.data.internal import plm
+from guesttracker.data.internal import utils as utl
+
+
+@pytest.fixture(autouse=True)
+def unit_from_header(monkeypatch):
+    """Synthetic files' units don't exist in db, skip header unit lookups"""
+    monkeypatch.setattr(plm, 'unit_from_haulcycle', lambda p, **kw: 'F301')
+    monkeypatch.setattr(faults, 'unit_from_fault', lambda p, **kw: 'F301')
+
+
+def test_read_plm(bench, p_files):
+    df = bench(plm.read_plm, p=p_files['plm'][0])
+    assert len(df) == 2000
+
+
+def test_read_fault(bench, p_files):
+    df = bench(faults.read_fault, p=p_files['fault'][0])
+    assert len(df) == 2000
+
+
+def test_combine_csv_plm(bench, p_files):
+    df = bench(utl.combine_csv, lst_csv=p_files['plm'], ftype='plm', rounds=3)
+    assert len(df) > 0
+
+
+def test_combine_csv_fault(bench, p_files):
+    df = bench(utl.combine_csv, lst_csv=p_files['fault'], ftype='fault', rounds=3)
+    assert len(df) > 0
@@ -0,0 +1,37 @@
+from datetime import datetime as dt
+
+import pytest  # noqa
+
+from guesttracker.queries.hba import Charges, FolioTotals, Reservations
+
+
+def test_charges_get_df(bench, localdb, synth):
+    query = Charges()
+    df = bench(query._get_df, result_cache=False)
+    assert len(df) > 0
+
+
+def test_reservations_get_df(bench, localdb, synth):
+    query = Reservations()
+    df = bench(query._get_df, result_cache=False)
+    assert len(df) == synth.n_reservations
+
+
+def test_charges_get_df_filtered(bench, localdb):
+    """Parameterised filter, one year of charges"""
+    query = Charges()
+    query.fltr.add(field='charge_date', val=(dt(2020, 1, 1), dt(2020, 12, 31)), term='between')
+
+    df = bench(query._get_df, result_cache=False)
+    assert len(df) > 0
+
+
+@pytest.mark.parametrize('use_summary', [False, True], ids=['charges', 'summary'])
+def test_folio_totals(bench, localdb, synth, use_summary):
+    """Folio totals per reservation, GROUP BY on Charges vs pre-aggregated FolioSummary"""
+    from guesttracker.data import charges as chg
+    chg.migrate()
+
+    query = FolioTotals(by='reservation', use_summary=use_summary)
+    df = bench(query._get_df, result_cache=False)
+    assert len(df) == synth.n_reservations
@@ -0,0 +1,80 @@
+from datetime import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from guesttracker import config as cf
+
+
+@pytest.fixture(scope='module')
+def df_test_results() -> pd.DataFrame:
+    """Oil samples with nested test_results as downloaded from fluidlife"""
+    rng = np.random.default_rng(0)
+    tests = [f'test_{i}' for i in range(30)]
+    flags = ['', '', '', 'A', 'B']
+
+    test_results = [
+        [dict(testName=t, testResult=f'{rng.uniform(0, 100):.1f}', testFlag=flags[rng.integers(0, 5)])
+         for t in tests] for _ in range(2000)]
+
+    return pd.DataFrame(dict(unit='F301', test_results=test_results)) \
+        .rename_axis('hist_no')
+
+
+def test_flatten_test_results(bench, df_test_results):
+    if not 'Oil Samples' in cf.config['Headers'] or not 'OilSamples' in cf.config['Headers']:
+        pytest.skip('Oil Samples headers not in config')
+
+    from guesttracker.data import oilsamples as oil
+
+    df = bench(oil.flatten_test_results, df=df_test_results, rounds=3)
+    assert len(df) == len(df_test_results)
+
+
+def test_avail_summary_process_df(bench):
+    if not (cf.p_res / 'csv/ma_guarantee.csv').exists():
+        pytest.skip('ma_guarantee.csv not in resources')
+
+    from guesttracker.queries.avail import AvailSummary
+
+    rng = np.random.default_rng(0)
+    periods = pd.period_range('2020-01', '2020-12', freq='M').strftime('%Y-%m')
+    units = [f'F3{i:02d}' for i in range(1, 50)]
+    n = len(periods) * len(units)
+
+    df = pd.DataFrame(dict(
+        period=np.repeat(periods, len(units)),
+        Unit=np.tile(units, len(periods)),
+        Total=rng.uniform(0, 200, n),
+        SMS=rng.uniform(0, 150, n),
+        Suncor=rng.uniform(0, 50, n),
+        Model='980E-4',
+        DeliveryDate=pd.to_datetime('2018-01-01') + pd.to_timedelta(rng.integers(0, 700, n), unit='D'),
+        ExcludeHours_MA=0.0,
+        ExcludeHours_PA=0.0,
+        Operation='Staffed'))
+
+    query = AvailSummary(d_rng=(dt(2020, 1, 1), dt(2020, 12, 31)))
+    result = bench(lambda: query.process_df(df=df.copy()))
+    assert len(result) > 0
+
+
+def test_create_pdf(bench, localdb, tmp_path):
+    pytest.importorskip('weasyprint')
+
+    from guesttracker import reports as rp
+    from guesttracker.queries.hba import Charges
+
+    d_rng = (dt(2020, 1, 1), dt(2020, 1, 31))
+    query = Charges()
+    query.fltr.add(field='charge_date', val=d_rng, term='between')
+
+    report = rp.Report(d_rng=d_rng)
+    report.title = 'Charges Benchmark'
+    sec = rp.Section(title='Charges', report=report)
+    rp.SubSection('Charges', sec).add_df(query=query, caption='Charges in period.')
+    report.load_all_dfs(max_workers=1)
+
+    bench(report.create_pdf, p_base=tmp_path, rounds=3)
+    assert report.p_rep.exists()
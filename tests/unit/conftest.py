@@ -0,0 +1,20 @@
+import importlib
+from types import ModuleType
+from typing import *
+
+import pytest
+
+from guesttracker import config as cf
+from guesttracker.utils import dbmodel as dbm
+
+
+@pytest.fixture
+def legacy(monkeypatch) -> Callable[[str], ModuleType]:
+    """Import guesttracker modules which still reference names missing from this tree
+    - eventfolders imports the EventLog model, data.internal.plm reads EquipPaths config at import
+    - stubs only fill in missing names, existing model/config is left as is
+    """
+    monkeypatch.setattr(dbm, 'EventLog', getattr(dbm, 'EventLog', type('EventLog', (), {})), raising=False)
+    monkeypatch.setitem(cf.config, 'EquipPaths', cf.config.get('EquipPaths', {}))
+
+    return lambda name: importlib.import_module(f'guesttracker.{name}')
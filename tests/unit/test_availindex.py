@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest  # noqa
+
+from guesttracker.utils.availindex import AvailabilityIndex, batch_free_units
+
+
+@pytest.fixture
+def index():
+    df_res = pd.DataFrame(dict(
+        unit=['A1', 'A1', 'A2'],
+        reservation_id=['r1', 'r2', 'r3'],
+        arrival_date=pd.to_datetime(['2022-01-03 15:00', '2022-01-10 15:00', '2022-01-01 15:00']),
+        departure_date=pd.to_datetime(['2022-01-05 11:00', '2022-01-12 11:00', '2022-01-20 11:00'])))
+
+    return AvailabilityIndex(df_res=df_res, units=['A1', 'A2', 'B1'])
+
+
+def test_free_units(index):
+    # stay fully inside requested range is a conflict
+    assert index.free_units('2022-01-01', '2022-01-08') == ['B1']
+
+    # departure and arrival on same day don't conflict
+    assert index.free_units('2022-01-05', '2022-01-10') == ['A1', 'B1']
+
+    df = index.conflicts('2022-01-04', '2022-01-11', units=['A1'])
+    assert df.reservation_id.tolist() == ['r1', 'r2']
+
+
+def test_next_free(index):
+    assert index.next_free('A1', '2022-01-04', nights=3) == (pd.Timestamp('2022-01-05'), pd.Timestamp('2022-01-10'))
+    assert index.next_free('A1', '2022-01-04', nights=6) == (pd.Timestamp('2022-01-12'), None)
+
+
+def test_add_cancel(index):
+    index.add('r4', ['B1', 'A1'], '2022-01-06', '2022-01-08')
+    assert index.free_units('2022-01-07', '2022-01-08') == []
+
+    assert index.cancel('r4') == 2
+    assert index.free_units('2022-01-07', '2022-01-08') == ['A1', 'B1']
+
+
+def test_batch_free_units(index):
+    df_unit = pd.DataFrame(dict(abbr=['A1', 'A2', 'B1'], max_persons=[4, 2, 6], class_name=['A', 'A', 'B']))
+    df_req = pd.DataFrame(dict(
+        arrival_date=pd.to_datetime(['2022-01-05', '2022-01-05', '2022-01-21', '2022-01-21']),
+        departure_date=pd.to_datetime(['2022-01-10', '2022-01-10', '2022-01-22', '2022-01-22']),
+        persons=[None, 5, 2, 2],
+        class_name=[None, None, 'a', None]))
+
+    df = batch_free_units(df_req=df_req, df_unit=df_unit, index=index)
+    assert df.units.tolist() == [['A1', 'B1'], ['B1'], ['A1', 'A2'], ['A1', 'A2', 'B1']]
+
+
+def test_unknown_unit(index):
+    """Unit not in index is never free, same rule for is_free, free_units and free_matrix"""
+    assert not index.is_free('C1', '2022-01-21', '2022-01-22')
+    assert index.is_free('B1', '2022-01-21', '2022-01-22')
+    assert index.free_units('2022-01-21', '2022-01-22', units=['B1', 'C1']) == ['B1']
+    assert index.reserved_units('2022-01-21', '2022-01-22', units=['B1', 'C1']) == []
+
+    free = index.free_matrix(d_lower=['2022-01-21'], d_upper=['2022-01-22'], units=['B1', 'C1'])
+    assert free.tolist() == [[True, False]]
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from guesttracker import dt
+from guesttracker.data.charges import SUMMARIES, sql_backfill, sql_triggers
+from guesttracker.database import db
+from guesttracker.queries.hba import FolioTotals, Revenue
+from guesttracker.utils.localdb import create_engine_local
+
+
+def test_summary_triggers(tmp_path):
+    """Summary rows kept by triggers match a full rebuild after inserts, updates and deletes"""
+    engine = create_engine_local(p=tmp_path / 'test.db')
+
+    with engine.begin() as conn:
+        for sql in sql_triggers(backend='sqlite'):
+            conn.exec_driver_sql(sql)
+
+        conn.exec_driver_sql("INSERT INTO Customers (uid, name) VALUES ('c1', 'Smith'), ('c2', 'Jones')")
+        conn.exec_driver_sql("INSERT INTO Reservations (uid, customer_id) VALUES ('r1', 'c1'), ('r2', 'c2')")
+        conn.exec_driver_sql("""
+            INSERT INTO Charges (
+                uid, kind, charge_date, quantity, total_amount, total_tax1, customer_id, reservation_id)
+            VALUES
+                ('1', 0, '2022-07-01 15:00:00', 2, 200.0, 10.0, 'c1', 'r1'),
+                ('2', 1, '2022-07-02 09:00:00', 1, 15.5, NULL, 'c1', 'r1'),
+                ('3', 2, '2022-07-03 11:00:00', 1, -225.5, NULL, 'c1', 'r1'),
+                ('4', 0, '2022-07-02 15:00:00', 1, 100.0, 5.0, 'c2', 'r2'),
+                ('5', 1, '2022-07-02 18:00:00', 3, 30.0, 1.5, NULL, NULL)""")
+
+        conn.exec_driver_sql("UPDATE Charges SET total_amount = 120.0, charge_date = '2022-07-03' WHERE uid = '4'")
+        conn.exec_driver_sql("DELETE FROM Charges WHERE uid = '2'")
+
+        folio = conn.exec_driver_sql(
+            "SELECT n_charges, total_amount + total_tax1 FROM FolioSummary WHERE reservation_id = 'r1'").one()
+
+        rows = {}
+        for name in SUMMARIES:
+            sql = f'SELECT * FROM {name} ORDER BY 1, 2, 3, 4'
+            rows[name] = conn.exec_driver_sql(sql).all()
+            conn.exec_driver_sql(f'DELETE FROM {name}')
+            conn.exec_driver_sql(sql_backfill(name=name, backend='sqlite'))
+
+            assert conn.exec_driver_sql(sql).all() == rows[name], name
+
+    # r1 overpaid by the deleted item charge
+    assert tuple(folio) == (2, -15.5)
+
+    # null reservation/customer stored as '', updated charge moved to new day
+    assert ('', '', 1, 30.0, 1.5, 0.0, 0.0) in rows['FolioSummary']
+    assert [str(r[0]) for r in rows['RevenueDaily']] == ['2022-07-01', '2022-07-02', '2022-07-03', '2022-07-03']
+
+
+def test_agg_query_init():
+    """Default/tuple by, and gui TableWidget passing name"""
+    assert Revenue().by == ['account', 'package']
+    assert Revenue(by=('kind', 'account')).by == ['kind', 'account']
+    assert FolioTotals(name='FolioTotals', theme='dark').title == 'Folio Totals'
+
+    with pytest.raises(ValueError):
+        Revenue(by='unit')
+
+
+def test_agg_query_refresh(monkeypatch):
+    """Date range + kinds re-applied on every refresh, get_df resets fltr after each call"""
+    calls = []
+
+    def read_sql(sql: str, params: list = None, **kw) -> pd.DataFrame:
+        calls.append((sql, params))
+        return pd.DataFrame(dict(period=[dt(2022, 1, 1)], account_name=['Rooms'], n_charges=[1]))
+
+    monkeypatch.setattr(db, 'read_sql', read_sql)
+    query = Revenue(by='account', kinds=[0], d_rng=(dt(2022, 1, 1), dt(2023, 1, 1)))
+
+    for _ in range(2):
+        query.get_df(result_cache=False)
+
+    assert calls[0] == calls[1]
+    assert calls[1][1] == [dt(2022, 1, 1), dt(2023, 1, 1), 0]
+
+    # grouped by account_id as well as name
+    assert 'account_id' in calls[0][0].split('GROUP BY')[1]
+
+    with pytest.raises(ValueError):
+        FolioTotals(use_summary=True, d_rng=(dt(2022, 1, 1), dt(2023, 1, 1)))
@@ -0,0 +1,99 @@
+import threading
+
+import pytest  # noqa
+
+from guesttracker.utils.dbcache import TableCache
+
+
+def test_cache_revalidate():
+    m = dict(stamp=1)
+    cache = TableCache(probe=lambda tables: m['stamp'], default_ttl=0)
+    cache.register(name='units', tables='Units')
+
+    assert cache.get('units') is None
+    cache.put('units', [1, 2, 3])
+
+    # ttl expired but stamp unchanged, entry still valid
+    assert cache.get('units') == [1, 2, 3]
+
+    # table changed, entry dropped
+    m['stamp'] = 2
+    assert cache.get('units') is None
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 2
+
+
+def test_cache_probe_failed():
+    """Entries kept while db can't be reached (eg offline snapshots), only dropped on stamp mismatch"""
+    m = dict(stamp=1)
+
+    def probe(tables: list) -> int:
+        if m['stamp'] is None:
+            raise ConnectionError('db unreachable')
+
+        return m['stamp']
+
+    cache = TableCache(probe=probe, default_ttl=0)
+    cache.register(name='units', tables='Units')
+    cache.get('units')
+    cache.put('units', [1, 2, 3])
+
+    m['stamp'] = None
+    assert cache.stale_entries() == []
+    assert cache.get('units') == [1, 2, 3]
+
+    m['stamp'] = 2
+    assert cache.stale_entries() == ['units']
+    assert not 'units' in cache
+
+
+def test_cache_evict():
+    cache = TableCache(max_entries=2, default_ttl=None)
+
+    for name in ('a', 'b', 'c'):
+        cache.put(name, name)
+
+    assert not 'a' in cache
+    assert cache.get('c') == 'c'
+    assert cache.stats['evictions'] == 1
+
+
+def test_cache_unregistered_tables():
+    m = dict(stamp=1)
+    cache = TableCache(probe=lambda tables: m['stamp'], default_ttl=0)
+
+    # stamp captured on miss for tables passed to get
+    assert cache.get('select 1', tables='Charges') is None
+    cache.put('select 1', [1], tables='Charges')
+    assert cache.get('select 1', tables='Charges') == [1]
+
+
+def test_cache_pending_tables():
+    cache = TableCache(probe=lambda tables: tuple(tables), default_ttl=None)
+
+    # stamp from get's miss only reused if put stores data for the same tables
+    assert cache.get('q', tables='Charges') is None
+    cache.put('q', [1], tables='Reservations')
+    assert cache.entries['q'].stamp == ('Reservations',)
+
+
+def test_cache_probe_outside_lock():
+    """Slow stamp probe on one entry doesn't block other threads' cache hits"""
+    m, result = dict(check=False), []
+
+    def probe(tables: list) -> int:
+        if m['check']:
+            t = threading.Thread(target=lambda: result.append(cache.get('units')))
+            t.start()
+            t.join(timeout=2)
+
+        return 1
+
+    cache = TableCache(probe=probe, default_ttl=0)
+    cache.put('units', [1], ttl=None)
+    cache.put('charges', [2], tables='Charges')
+
+    # expired entry revalidated while other thread reads 'units'
+    m['check'] = True
+    assert cache.get('charges') == [2]
+    assert result == [[1]]
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from guesttracker import dt
+
+
+@pytest.fixture
+def faults(legacy):
+    return legacy('data.internal.faults')
+
+
+def write_fault(p, times: list, n_header: int = 28):
+    lines = ['Fault Data', 'Machine Model,980E', 'Machine Type Minor Variation Code,-4', 'Machine Serial No,A30001']
+    lines += [f'Header {i},' for i in range(len(lines), n_header)]
+    lines += [f'F301,#{1000 + i},x,{t},x,{t},x,1,Fault message {i}' for i, t in enumerate(times)]
+
+    p.write_text('\n'.join(lines) + '\n')
+    return p
+
+
+def test_read_fault(faults, tmp_path, monkeypatch):
+    assert faults.n_header == 28
+
+    monkeypatch.setattr(faults, 'unit_from_fault', lambda p, **kw: 'F301')
+
+    p = write_fault(tmp_path / 'fault0.csv', ['1609459200|-25200', '1609459260|-25200'])
+    df = faults.read_fault(p)
+    assert list(df.columns) == faults.cols
+    assert df.code.tolist() == ['1000', '1001']
+    assert df.time_to.iloc[1] == dt.fromtimestamp(1609459260) + pd.Timedelta(seconds=-25200)
+
+    p_bad = write_fault(tmp_path / 'fault0_bad.csv', ['1609459200|-25200', '1609459260'])
+    with pytest.raises(faults.FaultReadError) as e:
+        faults.read_fault(p_bad, raise_errors=True)
+
+    assert e.value.stage == 'times'
+
+    df = faults.check_fault_files([p, p_bad, write_fault(tmp_path / 'fault0_empty.csv', [])])
+    assert df.rows.tolist() == [2, 0, 0]
+    assert df.stage.tolist() == [None, 'times', 'body']
@@ -0,0 +1,63 @@
+import datetime
+import decimal
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from guesttracker.utils import fetch
+
+# pyodbc-like cursor.description, (name, type_code)
+description = [('uid', int), ('n', int), ('amount', float), ('price', decimal.Decimal), ('name', str)]
+rows = [
+    (1, 5, 1.5, decimal.Decimal('2.25'), 'a'),
+    (2, None, None, decimal.Decimal('3.50'), None),
+    (3, 7, 2.0, decimal.Decimal('1.00'), 'c')]
+
+
+class FakeCursor():
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.description = description
+
+    def fetchmany(self, n: int) -> list:
+        rows, self.rows = self.rows[:n], self.rows[n:]
+        return rows
+
+
+@pytest.fixture
+def df_sql() -> pd.DataFrame:
+    """Same rows read with pd.read_sql"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE t (uid INTEGER, n INTEGER, amount REAL, price REAL, name TEXT)')
+    conn.executemany('INSERT INTO t VALUES (?, ?, ?, ?, ?)', [(*r[:3], float(r[3]), r[4]) for r in rows])
+
+    try:
+        return pd.read_sql('SELECT * FROM t', conn)
+    finally:
+        conn.close()
+
+
+def test_columnar_dtypes(df_sql, monkeypatch):
+    """numpy fallback (no pyarrow) matches pd.read_sql, int cols stay int64 unless they have nulls"""
+    monkeypatch.setattr(fetch, 'pa', None)
+
+    df = fetch.rows_to_df_columnar(rows=rows, description=description)
+    assert df.dtypes.to_dict() == df_sql.dtypes.to_dict()
+    pd.testing.assert_frame_equal(df, df_sql)
+
+    # chunk with no nulls in n is int64 like read_sql on those rows
+    dfs = list(fetch.iter_cursor(FakeCursor(rows=list(rows)), chunksize=1, backend='arrow'))
+    assert [str(df.n.dtype) for df in dfs] == ['int64', 'float64', 'int64']
+
+    df = fetch.rows_to_df_columnar(
+        rows=[(datetime.datetime(2021, 1, 1), True), (None, False)],
+        description=[('d', datetime.datetime), ('flag', bool)])
+
+    assert df.d.dtype == 'datetime64[ns]' and df.d.isnull().iloc[1]
+    assert df.flag.dtype == bool
+
+
+def test_pandas_backend_dtypes(df_sql):
+    df = pd.concat(fetch.iter_cursor(FakeCursor(rows=list(rows)), chunksize=2), ignore_index=True)
+    assert df.dtypes.to_dict() == df_sql.dtypes.to_dict()
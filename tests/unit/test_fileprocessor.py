@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def utl(legacy):
+    return legacy('data.internal.utils')
+
+
+def test_process_unit_resume(utl, tmp_path, monkeypatch):
+    """Unit failing mid-run resumes after its last committed chunk, checkpoint removed when unit finishes"""
+    lst = [tmp_path / f'haulcycle_{i}.csv' for i in range(5)]
+    read, failed = [], []
+
+    def combine_csv(lst_csv: list, **kw) -> pd.DataFrame:
+        if lst[2] in lst_csv and not failed:
+            failed.append(lst_csv)
+            raise ValueError('network drive disconnected')
+
+        read.extend(lst_csv)
+        return pd.DataFrame(dict(unit='F301', datetime=range(len(lst_csv))))
+
+    monkeypatch.setattr(utl, 'combine_csv', combine_csv)
+    monkeypatch.setattr(utl, 'import_csv_df', lambda df, **kw: len(df))
+
+    fp = utl.FileProcessor(ftype='plm', use_manifest=False, use_cache=False, p_checkpoints=tmp_path / 'ckpt')
+    p_ckpt = tmp_path / 'ckpt/F301.json'
+
+    m = fp.process_unit(unit='F301', lst=lst, chunksize=2)
+    assert (m['files'], m['rowsadded']) == (2, 2)
+    assert 'disconnected' in m['error']
+    assert p_ckpt.exists()
+
+    m = fp.process_unit(unit='F301', lst=lst, chunksize=2)
+    assert (m['files'], m['rowsadded'], m['error']) == (5, 5, None)
+    assert read == lst
+    assert not p_ckpt.exists()
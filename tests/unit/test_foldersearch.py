@@ -0,0 +1,44 @@
+import pytest  # noqa
+
+from guesttracker.data.internal.foldersearch import DirCache, FolderSearch
+
+
+def test_classify():
+    fs = FolderSearch('plm')
+
+    # exclude checked before find, same as re.search on name
+    assert fs.classify('haulcycle.csv') == 'find'
+    assert fs.classify('20210101_haulcycle.csv') == 'exclude'
+    assert fs.classify('vhms') == 'exclude'
+    assert fs.classify('f301 - 2021-01-01 - dls') is None
+
+
+def test_search_cached(tmp_path):
+    p_dls = tmp_path / 'downloads'
+    for name in ('F301 - 2021-01-01 - DLS', 'F302 - 2021-02-01 - DLS'):
+        p = p_dls / '2021' / name / 'plm'
+        p.mkdir(parents=True)
+        (p / 'fault0.csv').write_text('x')
+        (p.parent / 'fault0.csv').write_text('x')
+        (p.parent / 'faults').mkdir()
+
+    def search() -> list:
+        fs = FolderSearch('fault', use_cache=True)
+        fs.cache = DirCache(name='fault', p=tmp_path / 'cache.pkl')
+        return fs.search(p_dls)
+
+    lst = search()
+    assert lst == sorted(p_dls.glob('2021/*/fault0.csv'))
+
+    # unchanged subtrees read from cache, new download folder scanned
+    p_new = p_dls / '2021' / 'F303 - 2021-03-01 - DLS'
+    p_new.mkdir()
+    (p_new / 'fault0.csv').write_text('x')
+
+    assert search() == sorted(lst + [p_new / 'fault0.csv'])
+
+    # file added deeper in existing folder (parent folder mtime unchanged) found by rescanning only changed folder
+    p_deep = p_dls / '2021' / 'F301 - 2021-01-01 - DLS' / 'faults' / 'fault0.csv'
+    p_deep.write_text('x')
+
+    assert search() == sorted(lst + [p_new / 'fault0.csv', p_deep])
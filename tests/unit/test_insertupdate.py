@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest  # noqa
+
+from guesttracker import dbtransaction as dbt
+from guesttracker.database import db
+
+
+class FakeUpsert():
+    """Capture dfs passed to BulkUpsert, raise if any has duplicate keys (MERGE would fail)"""
+    dfs = []
+
+    def __init__(self, table: str, keys: list, **kw):
+        self.keys = keys
+
+    def upsert(self, data) -> dict:
+        dfs = [data] if isinstance(data, pd.DataFrame) else list(data)
+        for df in dfs:
+            if df.duplicated(subset=self.keys).any():
+                raise ValueError('duplicate source keys')
+
+        FakeUpsert.dfs.extend(dfs)
+        return dict(inserted=sum(len(df) for df in dfs), updated=0)
+
+
+def test_insert_update(monkeypatch):
+    monkeypatch.setattr(dbt, 'BulkUpsert', FakeUpsert)
+    kw = dict(a='Classes', join_cols=['uid'], notification=False)
+
+    assert db.insert_update(df=None, **kw) == 0
+    assert db.insert_update(df=pd.DataFrame(), **kw) == 0
+
+    # each streamed df deduped on join_cols
+    dfs = (pd.DataFrame(dict(uid=['1', '1', str(i + 2)], name='x')) for i in range(2))
+    assert db.insert_update(df=dfs, **kw) == 4
+    assert [len(df) for df in FakeUpsert.dfs] == [2, 2]
+
+    # errors logged, None returned
+    assert db.insert_update(df=pd.DataFrame(dict(name=['x'])), **kw) is None
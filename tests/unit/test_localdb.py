@@ -0,0 +1,24 @@
+import pytest  # noqa
+from sqlalchemy import inspect
+
+from guesttracker.utils.localdb import create_engine_local, translate_sql
+
+
+def test_translate_sql():
+    sql = 'SELECT TOP 1 [SMR] FROM [UnitSMR] WHERE ISNULL([SMR], 0) > DATEDIFF(day, [DateSMR], GETDATE())'
+    assert translate_sql(sql) \
+        == "SELECT [SMR] FROM [UnitSMR] WHERE IFNULL([SMR], 0) > DATEDIFF('day', [DateSMR], CURRENT_TIMESTAMP) LIMIT 1"
+
+
+def test_create_schema(tmp_path):
+    engine = create_engine_local(p=tmp_path / 'test.db')
+    tables = inspect(engine).get_table_names()
+
+    assert 'Reservations' in tables
+
+    # mssql collation shimmed as case insensitive
+    with engine.connect() as conn:
+        conn.exec_driver_sql("INSERT INTO Classes (uid, name) VALUES ('1', 'Cabin')")
+        n = conn.exec_driver_sql("SELECT COUNT(*) FROM Classes WHERE name = 'CABIN'").scalar()
+
+    assert n == 1
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest  # noqa
+
+from guesttracker import dt
+from guesttracker.data.internal.manifest import ImportManifest, UnitCheckpoint
+
+
+def test_filter_new(tmp_path):
+    manifest = ImportManifest(p=tmp_path / 'manifest.db')
+    lst = []
+    for i in range(3):
+        p = tmp_path / f'haulcycle_{i}.csv'
+        p.write_text(f'file {i}\n')
+        lst.append(p)
+
+    assert manifest.filter_new(lst=lst, ftype='plm') == lst
+
+    df = pd.DataFrame(dict(unit=['F301', 'F301']))
+    manifest.record_many([
+        manifest.make_record(p=lst[0], ftype='plm', df=df),
+        manifest.make_record(p=lst[1], ftype='plm', df=None),
+        manifest.make_record(p=lst[2], ftype='plm', df=df)])
+
+    # unchanged and failed files skipped, other ftypes don't share records
+    assert manifest.filter_new(lst=lst, ftype='plm') == []
+    assert manifest.filter_new(lst=lst, ftype='fault') == lst
+
+    # hash not stored for new files, first touch reads file again and stores hash
+    st = lst[0].stat()
+    os.utime(lst[0], (st.st_atime, st.st_mtime + 10))
+    assert manifest.filter_new(lst=lst, ftype='plm') == [lst[0]]
+    manifest.record(p=lst[0], ftype='plm', df=df)
+    assert manifest.to_df(ftype='plm').hash.notnull().sum() == 1
+
+    # touched again but same contents skipped, changed contents read again
+    os.utime(lst[0], (st.st_atime, st.st_mtime + 20))
+    lst[2].write_text('file 2 changed\n')
+    assert manifest.filter_new(lst=lst, ftype='plm') == [lst[2]]
+
+    assert manifest.filter_new(lst=lst, ftype='plm', force=True) == lst
+
+    assert manifest.forget(ftype='plm', unit='F301') == 2
+    assert manifest.filter_new(lst=lst, ftype='plm') == [lst[0], lst[2]]
+
+    df = manifest.to_df(ftype='plm')
+    assert df.status.tolist() == ['failed']
+
+
+def test_filter_new_d_lower(tmp_path):
+    """Files recorded with a later d_lower than current run are read again, rows before it were dropped"""
+    p_db = tmp_path / 'manifest.db'
+
+    # manifest created before d_lower was recorded
+    with sqlite3.connect(p_db) as conn:
+        conn.execute('CREATE TABLE ImportManifest (path TEXT PRIMARY KEY, ftype TEXT NOT NULL, size INTEGER, '
+                     + 'mtime REAL, hash TEXT, rows INTEGER, unit TEXT, status TEXT, message TEXT, date_added TEXT)')
+
+    manifest = ImportManifest(p=p_db)
+    p = tmp_path / 'haulcycle.csv'
+    p.write_text('file\n')
+
+    d = dt(2021, 1, 1)
+    assert manifest.filter_new(lst=[p], ftype='plm', d_lower=d) == [p]
+    manifest.record(p=p, ftype='plm', df=pd.DataFrame(dict(unit=['F301'])), d_lower=d)
+
+    assert manifest.filter_new(lst=[p], ftype='plm', d_lower=d) == []
+    assert manifest.filter_new(lst=[p], ftype='plm', d_lower=dt(2021, 6, 1)) == []
+    assert manifest.filter_new(lst=[p], ftype='plm', d_lower=dt(2020, 1, 1)) == [p]
+    assert manifest.filter_new(lst=[p], ftype='plm') == [p]
+
+
+def test_unit_checkpoint(tmp_path):
+    lst = [tmp_path / f'haulcycle_{i}.csv' for i in range(3)]
+    p = tmp_path / 'ckpt/F301.json'
+
+    ckpt = UnitCheckpoint(unit='F301', ftype='plm', p=p)
+    assert ckpt.remaining(lst) == lst
+
+    ckpt.update(lst=lst[:2], rowsadded=10)
+
+    # new run resumes from saved checkpoint
+    ckpt = UnitCheckpoint(unit='F301', ftype='plm', p=p)
+    assert ckpt.remaining(lst) == lst[2:]
+    assert ckpt.rowsadded == 10
+
+    ckpt.clear()
+    assert not p.exists()
+    assert UnitCheckpoint(unit='F301', ftype='plm', p=p).remaining(lst) == lst
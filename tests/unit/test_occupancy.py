@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest  # noqa
+
+from guesttracker.utils.occupancy import OccupancyMatrix
+
+
+def test_occupancy_matrix():
+    df_unit = pd.DataFrame(dict(abbr=['A1', 'A2', 'B1'], class_name=['A', 'A', 'B']))
+    df_res = pd.DataFrame(dict(
+        unit=['A1', 'A1', 'A2', 'X9'],
+        arrival_date=pd.to_datetime(['2022-01-01 15:00', '2022-01-04 15:00', '2021-12-20 15:00', '2022-01-01']),
+        departure_date=pd.to_datetime(['2022-01-03 11:00', '2022-01-06 11:00', '2022-01-02 11:00', '2022-01-05'])))
+
+    occ = OccupancyMatrix(df_res=df_res, df_unit=df_unit, d_lower='2022-01-01', d_upper='2022-01-06')
+
+    assert occ.matrix.tolist() == [
+        [1, 1, 0, 1, 1],
+        [1, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0]]
+
+    assert occ.nights_sold(by='class').to_dict() == dict(A=5, B=0)
+    assert occ.occupancy_rate() == pytest.approx(5 / 15)
+
+    # single orphan night between A1's stays
+    df = occ.gaps()
+    assert df[['unit', 'nights']].values.tolist() == [['A1', 1]]
+    assert df.start.iloc[0] == pd.Timestamp('2022-01-03')
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from guesttracker import delta, dt
+from guesttracker.data.internal import parsers as prs
+
+
+def test_hms_to_seconds():
+    s = pd.Series(['00:00:01', '1:2:3', '23:59:59'])
+    assert prs.hms_to_seconds(s).tolist() == [1, 3723, 86399]
+
+    for val in ('12:61:00', '12:00', None, '1:a:00'):
+        with pytest.raises(ValueError):
+            prs.hms_to_seconds(pd.Series(['00:00:01', val]))
+
+
+def test_parse_cycles():
+    df = pd.DataFrame(dict(
+        date=['01/05/21', '01/05/21', None],
+        time=['06:01:02', '23:59:59', None],
+        cycletime=['00:20:15', '0:9:7', '00:00:00'],
+        carryback=['1.5', '0 .5', '']))
+
+    # blank rows (eg before checksum) dropped before cycletime/carryback converted
+    df = prs.parse_cycles(df, fmt='%m/%d/%y %H:%M:%S')
+    assert df.datetime.tolist() == [pd.Timestamp('2021-01-05 06:01:02'), pd.Timestamp('2021-01-05 23:59:59')]
+    assert df.cycletime.tolist() == [1215, 547]
+    assert df.carryback.tolist() == [1.5, 0.5]
+    assert prs.to_float(pd.Series([1, 2])).dtype == float
+
+
+def test_parse_fault_times():
+    """Same local times as faults.parse_fault_time per row, incl across dst changes"""
+    def parse_fault_time(tstr: str) -> dt:
+        t, tz = (int(x) for x in tstr.split('|'))
+        return dt.fromtimestamp(t) + delta(seconds=tz)
+
+    t0 = int(dt(2021, 3, 13).timestamp())
+    s = pd.Series([f'{t}|-25200' for t in range(t0, t0 + 3 * 86400, 300)] + ['1609459200|0'])
+
+    expected = s.apply(parse_fault_time)
+    assert prs.parse_fault_times(s).equals(expected)
+
+    t = np.arange(t0, int(dt(2021, 12, 1).timestamp()), 3600)
+    assert prs.parse_fault_times(pd.Series([f'{x}|0' for x in t])).equals(
+        pd.Series([dt.fromtimestamp(x) for x in t.tolist()]))
+
+    with pytest.raises(ValueError):
+        prs.parse_fault_times(pd.Series(['1609459200|0', '1609459260']))
+
+
+def test_parse_fault_header():
+    lines = ['Fault Data', 'Machine Model,980E', 'Machine Type Minor Variation Code,-4', 'Machine Serial No, A30001 ']
+    assert prs.parse_fault_header(lines) == dict(serial='A30001', model='980E-4')
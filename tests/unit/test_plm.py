@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+
+cols = [
+    'Date', 'Time', 'Payload(Net)', 'Swingloads', 'Status Flag', 'Carry Back', 'TotalCycle Time', 'L-Haul Distance',
+    'L-Max Speed', 'E MaxSpeed', 'Max Sprung', 'Truck Type', 'Tare Sprung Weight', 'Payload Est.@Shovel(Net)',
+    'Quick Payload Estimate(Net)', 'Gross Payload']
+
+
+def write_haulcycle(p, rows: list, n_checksum: int = 2):
+    head = ['Frame_SN:A30001', 'Cust_Unit:F301', 'Truck_Type:980E-4', 'Software_Version:1.0', 'Plm_Version:3',
+            'Date:01/01/21', 'Time:00:00:00', 'Checksum:0']
+
+    lines = head + [','.join(cols)]
+    for date, time, carryback, cycletime in rows:
+        lines.append(','.join([
+            date, time, '310.5', '4', '', carryback, cycletime, '2.51', '40.2', '55.0', '512', '980E', '180.2',
+            '305.1', '300.4', '490.7']))
+
+    p.write_text('\n'.join(lines + ['CHECKSUM,0'] * n_checksum) + '\n')
+    return p
+
+
+@pytest.fixture
+def plm(legacy):
+    return legacy('data.internal.plm')
+
+
+def test_read_plm_matches_legacy(plm, tmp_path, monkeypatch):
+    monkeypatch.setattr(plm, 'unit_from_haulcycle', lambda p, **kw: 'F301')
+
+    rows = [
+        ('01/05/21', '06:01:02', '1.5', '00:20:15'),
+        ('01/05/21', '06:31:40', '0 .5', '0:9:7'),  # spaces in carryback, single digit time
+        ('01/05/21', '23:59:59', '', '01:02:03')]
+
+    lst = [
+        write_haulcycle(tmp_path / 'haulcycle.csv', rows),
+        write_haulcycle(tmp_path / 'one_checksum.csv', rows, n_checksum=1),
+        write_haulcycle(tmp_path / 'empty.csv', []),
+        write_haulcycle(tmp_path / 'bad_time.csv', rows + [('01/05/21', '12:00:00', '1.0', '24:00:00')])]
+
+    df = plm.verify_read_plm(lst)
+    assert df.match.all()
+    assert df.rows.tolist()[:3] == [3, 2, 0]
+    assert df.error.iloc[3].startswith('ValueError')
+
+    df = plm.read_plm(lst[0])
+    assert list(df.columns) == plm.good_cols
+    assert df.cycletime.tolist() == [1215, 547, 3723]
+    assert df.carryback.tolist()[:2] == [1.5, 0.5]
+    assert df.datetime.iloc[2] == pd.Timestamp('2021-01-05 23:59:59')
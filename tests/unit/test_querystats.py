@@ -0,0 +1,20 @@
+import pytest  # noqa
+
+from guesttracker.utils.querystats import QueryStats, fingerprint
+
+
+def test_fingerprint():
+    # same query shape with different literals groups together
+    assert fingerprint("SELECT * FROM Units WHERE abbr = 'A1' AND uid IN (1, 2)") \
+        == fingerprint("select *  from Units where abbr = 'B22' and uid in (3, 4, 5)")
+
+
+def test_summary():
+    stats = QueryStats(maxlen=3)
+    for secs in (1.0, 2.0, 3.0, 4.0):
+        stats.record(source='Charges', sql='select 1', secs=secs, rows=1)
+
+    df = stats.summary()
+    assert len(stats) == 3
+    assert df.loc['Charges', 'count'] == 3
+    assert df.loc['Charges', 'p50'] == 3.0
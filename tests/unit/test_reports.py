@@ -0,0 +1,50 @@
+import pytest
+
+from guesttracker.queries.hba import Charges, Reservations
+
+
+@pytest.fixture
+def rp(legacy):
+    return legacy('reports')
+
+
+def make_report(rp, dfs: dict):
+    """Report with only dfs set, get_load_plan doesn't need sections/dates"""
+    report = rp.Report.__new__(rp.Report)
+    report.dfs = {name: dict(name=name, func=None, query=None, da={}, depends_on=[]) | m for name, m in dfs.items()}
+    return report
+
+
+def test_load_plan_shared_owners(rp):
+    """dfs sharing a query through query, bound method, closure or da are loaded by one task"""
+    q1, q2, q3 = Charges(), Charges(), Reservations()
+
+    report = make_report(rp, dict(
+        a=dict(query=q1),
+        b=dict(func=q2.get_df),
+        c=dict(func=lambda: q1.get_df()),
+        d=dict(func=len, da=dict(query=q2)),
+        e=dict(query=q3),
+        f=dict(func=len)))
+
+    assert report.get_load_plan() == [[['a', 'c'], ['b', 'd'], ['e'], ['f']]]
+
+    # df using both queries merges their tasks, load order kept
+    report.dfs['g'] = dict(name='g', func=None, query=q1, da=dict(query_f300=q2), depends_on=[])
+    assert report.get_load_plan() == [[['e'], ['f'], ['a', 'b', 'c', 'd', 'g']]]
+
+
+def test_load_plan_waves(rp):
+    q1 = Charges()
+
+    report = make_report(rp, dict(
+        a=dict(query=q1),
+        b=dict(func=len, depends_on=['a']),
+        c=dict(func=len, depends_on=['b'], da=dict(query=q1)),
+        d=dict(func=len)))
+
+    assert report.get_load_plan() == [[['a'], ['d']], [['b']], [['c']]]
+
+    report.dfs['a']['depends_on'] = ['c']
+    with pytest.raises(ValueError):
+        report.get_load_plan()
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest  # noqa
+
+from guesttracker.data import reservations as rs
+from guesttracker.data.reservations import explode_units, split_reservations
+from guesttracker.utils.localdb import create_engine_local
+
+
+def test_explode_units():
+    df_unit = pd.DataFrame(dict(uid=['u1', 'u2', 'u3'], abbr=['A1', 'A2', 'B1']))
+    df_res = pd.DataFrame(dict(
+        uid=['r1', 'r2', 'r3'],
+        unit_assignments=['A1, A2', 'b1,A1,B1', None],
+        arrival_date=pd.to_datetime(['2022-01-01', '2022-01-05', '2022-01-07']),
+        departure_date=pd.to_datetime(['2022-01-03', '2022-01-06', '2022-01-08'])))
+
+    df = explode_units(df_res=df_res, df_unit=df_unit)
+
+    # leading spaces stripped, case insensitive, duplicates dropped, empty skipped
+    assert list(zip(df.reservation_id, df.unit_id)) == [('r1', 'u1'), ('r1', 'u2'), ('r2', 'u3'), ('r2', 'u1')]
+
+
+def test_split_reservations():
+    df_res = pd.DataFrame(dict(
+        uid=['r1', 'r2', 'r3'],
+        unit_assignments=['A1, A2', 'B1', None],
+        arrival_date=pd.to_datetime(['2022-01-01', '2022-01-05', '2022-01-07']),
+        departure_date=pd.to_datetime(['2022-01-03', '2022-01-06', '2022-01-08'])))
+
+    # same cols as ReservationUnits query, leading spaces stripped
+    df = split_reservations(df_res)
+    assert list(df.columns) == ['unit', 'reservation_id', 'arrival_date', 'departure_date']
+    assert list(zip(df.unit, df.reservation_id)) == [('A1', 'r1'), ('A2', 'r1'), ('B1', 'r2')]
+
+
+def test_is_migrated(tmp_path, monkeypatch):
+    """Table missing/empty checked once per ttl, empty table only migrated if nothing to backfill"""
+    engine = create_engine_local(p=tmp_path / 'test.db', create_schema=False)
+    monkeypatch.setattr(rs, 'db', SimpleNamespace(engine=engine))
+    monkeypatch.setattr(rs, '_migrated', dict(val=False, checked=None))
+
+    calls = []
+    check_migrated = rs.check_migrated
+    monkeypatch.setattr(rs, 'check_migrated', lambda: calls.append(1) or check_migrated())
+
+    # table missing, negative result cached
+    assert not rs.is_migrated()
+    assert not rs.is_migrated()
+    assert len(calls) == 1
+
+    rs.dbm.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO Reservations (uid, unit_assignments) VALUES ('r1', 'A1')")
+
+    # table exists but not backfilled
+    monkeypatch.setitem(rs._migrated, 'checked', 0)
+    assert not rs.is_migrated()
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE Reservations SET unit_assignments = NULL")
+
+    # empty table, nothing to backfill, positive result cached without ttl
+    monkeypatch.setitem(rs._migrated, 'checked', 0)
+    assert rs.is_migrated()
+    assert rs.is_migrated()
+    assert len(calls) == 3
@@ -0,0 +1,36 @@
+import pytest
+
+from guesttracker import errors as er
+from guesttracker.utils.retry import (
+    CircuitBreaker, RetryPolicy, RetryStats, call_with_retry, is_transient)
+
+
+class FakeOdbcError(Exception):
+    pass
+
+
+def test_is_transient():
+    assert is_transient(FakeOdbcError('08S01', 'Communication link failure'))
+    assert not is_transient(FakeOdbcError('23000', 'Violation of PRIMARY KEY constraint'))
+
+
+def test_retry_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    stats = RetryStats()
+    policy = RetryPolicy(max_attempts=5, base_delay=0)
+
+    def fail():
+        raise FakeOdbcError('08S01', 'Communication link failure')
+
+    # breaker opens after 2 failures, stops retrying
+    with pytest.raises(FakeOdbcError):
+        call_with_retry(fail, policy=policy, breaker=breaker, stats=stats)
+
+    assert breaker.state == 'open'
+    assert stats.retries == 1
+
+    # fail fast while open
+    with pytest.raises(er.DatabaseUnavailableError):
+        call_with_retry(lambda: 1, policy=policy, breaker=breaker, stats=stats)
+
+    assert stats.fast_fails == 1
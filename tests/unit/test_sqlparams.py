@@ -0,0 +1,19 @@
+import pytest  # noqa
+from pypika import MSSQLQuery as Query
+from pypika import Table as T
+
+from guesttracker.utils.sqlparams import Param, as_param, get_sql_params
+
+
+def test_get_sql_params():
+    a = T('UnitSMR')
+    q = Query.from_(a).select('SMR') \
+        .where(a.Unit == Param('F301')) \
+        .where(a.SMR.isin(as_param([1, 2])))
+
+    sql, params = get_sql_params(q)
+    assert params == ['F301', 1, 2]
+    assert not 'F301' in sql
+
+    # literal sql unchanged outside collector
+    assert "'F301'" in str(q)
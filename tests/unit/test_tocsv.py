@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from guesttracker.database import db
+from guesttracker.errors import SettingsError
+from guesttracker.queries.hba import Charges, Revenue
+from guesttracker.utils import fetch
+
+
+class FakeCursor():
+    """Executed cursor returning rows with fetchmany"""
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.description = [('uid', ), ('total_amount', )]
+
+    def fetchmany(self, n: int) -> list:
+        rows, self.rows = self.rows[:n], self.rows[n:]
+        return rows
+
+
+def fake_iter_sql(rows: list):
+    def iter_sql(sql: str, chunksize: int = 50000, **kw):
+        return fetch.iter_cursor(FakeCursor(rows=list(rows)), chunksize=chunksize)
+
+    return iter_sql
+
+
+def test_iter_cursor_empty():
+    dfs = list(fetch.iter_cursor(FakeCursor(rows=[]), chunksize=2))
+    assert len(dfs) == 1
+    assert list(dfs[0].columns) == ['uid', 'total_amount']
+
+
+def test_to_csv(tmp_path, monkeypatch):
+    """Chunks appended under single header, empty result still writes header"""
+    query = Charges()
+    p = tmp_path / 'charges.csv'
+
+    rows = [(str(i), float(i)) for i in range(5)]
+    monkeypatch.setattr(db, 'iter_sql', fake_iter_sql(rows))
+    assert query.to_csv(p=p, chunksize=2, lower_cols=True) == 5
+
+    df = pd.read_csv(p, dtype=dict(uid=str))
+    assert df.uid.tolist() == [str(i) for i in range(5)]
+
+    monkeypatch.setattr(db, 'iter_sql', fake_iter_sql([]))
+    assert query.to_csv(p=p, chunksize=2, lower_cols=True) == 0
+    assert p.read_text().strip() == 'uid,total_amount'
+
+    # gui export re-runs sql of displayed table
+    with pytest.raises(SettingsError):
+        query.to_csv(p=p, last_loaded=True)
+
+
+def test_can_stream():
+    assert Charges().can_stream
+    assert not Revenue().can_stream
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest  # noqa
+
+from guesttracker.database import UnitIndex
+
+
+@pytest.fixture
+def idx() -> UnitIndex:
+    df = pd.DataFrame(dict(
+        Unit=['F301', ' F302 ', 'F303', 'A01', 'F304'],
+        Serial=['A30001', 'A30002', 'A30002', 'B1', 'A30004'],
+        Model=['980E-4', '980E-5', '930E-4', 'Cabin', '980E-4'],
+        ModelBase=['980E', '980E', '930E', None, '980E'],
+        MineSite=['FortHills', 'FortHills', 'BaseMine', 'Camp', 'FortHills'],
+        active=[1, 1, 1, 1, 0]))
+
+    return UnitIndex(df=df)
+
+
+def test_unit_index_active(idx):
+    """Inactive units dropped, unit names stripped"""
+    assert idx.units == ['F301', 'F302', 'F303', 'A01']
+    assert idx.unit_exists('F302')
+    assert not idx.unit_exists('F304')
+    assert idx.get_row('F303').Model == '930E-4'
+    assert idx.get_row('F304') is None
+
+
+def test_unit_index_minesite(idx):
+    assert idx.units_minesite('FortHills') == ['F301', 'F302']
+    assert idx.units_minesite('FortHills', model='980E-5') == ['F302']
+    assert idx.units_minesite(model='980') == ['F301', 'F302']
+    assert idx.units_minesite('Unknown') == []
+
+
+def test_unit_index_serial(idx):
+    assert idx.unit_from_serial('A30001') == 'F301'
+
+    # duplicate serial only matched once narrowed by model/model_base/minesite
+    assert idx.unit_from_serial('A30002') is None
+    assert idx.unit_from_serial('A30002', model='930') == 'F303'
+    assert idx.unit_from_serial('A30002', model_base='980E') == 'F302'
+    assert idx.unit_from_serial('A30002', minesite='BaseMine') == 'F303'
+
+    # misses
+    assert idx.unit_from_serial('A30004') is None  # inactive
+    assert idx.unit_from_serial('A30001', model='930') is None
+    assert idx.unit_from_serial('A30001', model_base='930E') is None
+    assert idx.unit_from_serial('XXX') is None